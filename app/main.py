@@ -5,9 +5,11 @@ from typing import Any
 import streamlit as st
 
 from chopin.cli.from_queue import from_queue
+from chopin.client.cache import enable_cache, enable_mirror
 from chopin.client.endpoints import get_queue, get_user_playlists
 from chopin.constants import constants
 from chopin.managers.composition import compose_playlist
+from chopin.managers.planning import plan_composition
 from chopin.managers.playlist import create, doppelganger_playlist, fill, shuffle_playlist
 from chopin.managers.selection import SelectionMethod
 from chopin.schemas.composer import ComposerConfig, ComposerConfigItem, ComposerConfigListeningHistory
@@ -23,6 +25,16 @@ def queue_length() -> int:
     return len(queue)
 
 
+@st.cache_resource()
+def enable_local_stores() -> None:
+    """Enable the cache and the library mirror, once per server process.
+
+    Enabling them clears the in-memory indexes of the playlists: they are kept across the reruns of the script.
+    """
+    enable_cache()
+    enable_mirror()
+
+
 def spacing(nb_lines: int = 5):
     """Add space - as streamlit blank lines,  between elements."""
     for _ in range(nb_lines):
@@ -36,8 +48,7 @@ def _compose(composer_config: ComposerConfig):
     st.success(f"Playlist {composer_config.name} succesfully created! {len(tracks)} tracks added")
 
 
-# submit
-def _submit(composer_configuration: ComposerConfig) -> ComposerConfig:
+def _read_session(composer_configuration: ComposerConfig) -> ComposerConfig:
     composer_configuration.playlists = [
         ComposerConfigItem(**playlist) for key, playlist in st.session_state.playlists.items()
     ]
@@ -45,13 +56,25 @@ def _submit(composer_configuration: ComposerConfig) -> ComposerConfig:
     composer_configuration.history = [
         ComposerConfigListeningHistory(**{"time_range": time_range}) for time_range in st.session_state.history
     ]
+    return ComposerConfig.model_validate(composer_configuration.model_dump(exclude={"items"}))
+
+
+def _estimate(composer_configuration: ComposerConfig):
+    plan = plan_composition(_read_session(composer_configuration))
+    st.info(f"About {plan.calls} API calls, {plan.pages} pages, {plan.bytes / 1e6:.1f} MB, {plan.latency:.1f} seconds.")
+    st.dataframe([item.model_dump() for item in plan.items])
+
+
+# submit
+def _submit(composer_configuration: ComposerConfig) -> ComposerConfig:
+    composer_configuration = _read_session(composer_configuration)
     st.write(composer_configuration.model_dump())
-    ComposerConfig.model_validate(composer_configuration)
     _compose(composer_configuration)
     return composer_configuration
 
 
 st.set_page_config(layout="wide")
+enable_local_stores()
 st.header("🎶 Chopin")
 
 user_playlists = get_user_playlists()
@@ -237,6 +260,7 @@ if add_from_playlists:
                     SelectionMethod.POPULARITY.value,
                     SelectionMethod.LATEST.value,
                     SelectionMethod.ORIGINAL.value,
+                    SelectionMethod.WEIGHTED.value,
                 ],
                 index=0,
                 key=f"select-method-{playlist_name}",
@@ -316,6 +340,7 @@ if add_from_uris:
                 SelectionMethod.POPULARITY.value,
                 SelectionMethod.LATEST.value,
                 SelectionMethod.ORIGINAL.value,
+                SelectionMethod.WEIGHTED.value,
             ],
             index=0,
             key=f"select-method-uri-{i}",
@@ -384,6 +409,15 @@ if enable_history:
 st.write("")
 st.write("")
 
+estimate_button = st.button(
+    key="estimate",
+    label="Estimate",
+    help="Estimate the number of API calls and the time needed to create the playlist",
+    type="secondary",
+    width="stretch",
+    on_click=_estimate,
+    args=(composer_config,),
+)
 submit_button = st.button(
     key="submit",
     label="Submit",
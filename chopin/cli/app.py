@@ -1,11 +1,6 @@
 """Command to launch the streamlit app."""
 
-try:
-    import streamlit  # noqa: F401
-
-    streamlit_dep = True
-except ImportError:
-    streamlit_dep = False
+import importlib.util
 
 import click
 
@@ -17,7 +12,7 @@ logger = get_logger(__name__)
 @click.command()
 def app():
     """Launch a streamlit app to use chopin."""
-    if not streamlit_dep:
+    if importlib.util.find_spec("streamlit") is None:
         click.echo(
             "The streamlit dependency was not found, it is needed to build the web app."
             "Make sure you have installed the `app` optional dependency:"
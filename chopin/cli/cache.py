@@ -0,0 +1,43 @@
+"""Inspect and manage the persistent playlist cache."""
+
+from datetime import datetime
+
+import click
+
+from chopin.client.cache import AlbumCache, PlaylistCache
+from chopin.tools.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@click.group()
+def cache():
+    """Inspect, prune or clear the playlist and album caches."""
+    pass
+
+
+@cache.command()
+def info():
+    """Describe the playlists currently cached."""
+    entries = PlaylistCache().entries()
+    for entry in entries:
+        accessed_at = datetime.fromtimestamp(entry.accessed_at).strftime("%Y-%m-%d %H:%M")
+        click.echo(f"{entry.playlist_id}\t{entry.nb_tracks} tracks\t{entry.size / 1024:.0f} KB\t{accessed_at}")
+    click.echo(f"🗃️ {len(entries)} playlists cached, {sum(entry.size for entry in entries) / 1024**2:.1f} MB")
+
+
+@cache.command()
+@click.option("--max-size", type=float, default=None, help="Size limit for the cache, in MB.")
+def prune(max_size: float | None):
+    """Evict the least recently used playlists until the cache fits in its size limit."""
+    max_size_bytes = int(max_size * 1024**2) if max_size is not None else None
+    evicted = PlaylistCache().prune(max_size=max_size_bytes)
+    click.echo(f"🧹 {evicted} playlists evicted from the cache.")
+
+
+@cache.command()
+def clear():
+    """Remove every playlist and album from the cache."""
+    removed_playlists = PlaylistCache().clear()
+    removed_albums = AlbumCache().clear()
+    click.echo(f"🗑️ {removed_playlists} playlists and {removed_albums} albums removed from the cache.")
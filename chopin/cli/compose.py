@@ -4,9 +4,9 @@ from datetime import datetime, timedelta
 from pathlib import Path
 
 import click
-from ruamel.yaml import YAML
 
 from chopin.managers.composition import compose_playlist
+from chopin.managers.planning import plan_composition
 from chopin.managers.playlist import create, fill
 from chopin.schemas.composer import ComposerConfig
 from chopin.tools.logger import get_logger
@@ -16,20 +16,42 @@ LOGGER = get_logger(__name__)
 
 @click.command()
 @click.argument("configuration", type=click.Path(exists=True, path_type=Path))
+@click.option("--dry-run", is_flag=True, help="Estimate the cost of the composition, without creating the playlist.")
+@click.option("--seed", type=int, default=None, help="Seed for the random choices. Overrides the configuration seed.")
+@click.option(
+    "--date",
+    "reference_date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Date the age of the songs is computed at, for the recency weights. Today by default.",
+)
 def compose(
     configuration: Path,
+    dry_run: bool,
+    seed: int | None,
+    reference_date: datetime | None,
 ):
     """Compose a playlist from a composition configuration.
 
     You can use a YAML file to specify playlists and artists should be
     used, and weigh them.
+
+    With `--dry-run`, the number of API calls, pages, bytes and the latency of the composition are estimated
+    for each source, and no playlist is created.
+
+    With `--seed`, or a `seed` in the configuration, the composition is reproducible: the same configuration, seed and
+    cached playlists give the same playlist. Songs weighted by recency also need the same `--date`.
     """
-    click.echo("🤖 Composing . . .")
+    config = ComposerConfig.parse_yaml(configuration)
+    if dry_run:
+        click.echo(plan_composition(config))
+        return
 
-    yaml = YAML(typ="safe", pure=True)
-    config = ComposerConfig.model_validate(yaml.load(open(configuration)))
+    click.echo("🤖 Composing . . .")
 
-    tracks = compose_playlist(composition_config=config)
+    tracks = compose_playlist(
+        composition_config=config, seed=seed, reference_date=reference_date.date() if reference_date else None
+    )
 
     playlist = create(name=config.name, description=config.description, overwrite=True)
     fill(uri=playlist.uri, tracks=tracks)
@@ -45,8 +67,7 @@ def compose_from_new_releases(
         configuration_path: The composition configuration, `confs/recent.yaml` by default.
     """
     LOGGER.info("🆕 Composing with new releases")
-    yaml = YAML(typ="safe", pure=True)
-    config = ComposerConfig.model_validate(yaml.load(open(configuration_path)))
+    config = ComposerConfig.parse_yaml(configuration_path)
     config.release_range = ((datetime.now() - timedelta(days=15)).date(), datetime.now().date())
     tracks = compose_playlist(composition_config=config)
 
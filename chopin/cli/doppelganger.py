@@ -12,8 +12,9 @@ LOGGER = get_logger(__name__)
 @click.command()
 @click.argument("original_playlist", type=str)
 @click.argument("new_playlist", type=str, default=constants.RECOMMENDED_MIX.name)
-def doppelganger(original_playlist, new_playlist):
+@click.option("--seed", type=int, default=None, help="Seed for the choice of the new tracks, to reproduce it.")
+def doppelganger(original_playlist, new_playlist, seed):
     """Create a doppelganger playlist from an existing one."""
     click.echo("👬 Creating doppelganger ...")
-    playlist = doppelganger_playlist(original_playlist, new_playlist)
+    playlist = doppelganger_playlist(original_playlist, new_playlist, seed=seed)
     click.echo(f"Playlist {playlist.name} successfully created.")
@@ -1,32 +1,81 @@
 """Main and common entrypoint for the chopin cli."""
 
+import importlib
+
 import click
 
-from chopin.cli.app import app as webapp
-from chopin.cli.backup import backup
-from chopin.cli.compose import compose
-from chopin.cli.doppelganger import doppelganger
-from chopin.cli.from_queue import from_queue
-from chopin.cli.restore import restore
-from chopin.cli.shuffle import shuffle
 
+class LazyGroup(click.Group):
+    """Click group whose subcommands are only imported when they are used.
+
+    Commands pull the Spotify client, the managers and their dependencies. Importing them lazily keeps the
+    startup of the cli fast.
+
+    Attributes:
+        lazy_subcommands: A mapping from command names to the import path of the command,
+            e.g. `{"backup": "chopin.cli.backup.backup"}`.
+    """
+
+    def __init__(self, *args, lazy_subcommands: dict[str, str] | None = None, **kwargs):
+        """Create the group, with its lazy subcommands."""
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
 
-@click.group(name="chopin")
-def app():
+    def list_commands(self, ctx: click.Context) -> list[str]:  # noqa: D102
+        return sorted([*super().list_commands(ctx), *self.lazy_subcommands])
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:  # noqa: D102
+        if cmd_name in self.lazy_subcommands:
+            module_name, command_name = self.lazy_subcommands[cmd_name].rsplit(".", 1)
+            return getattr(importlib.import_module(module_name), command_name)
+        return super().get_command(ctx, cmd_name)
+
+
+@click.group(
+    name="chopin",
+    cls=LazyGroup,
+    lazy_subcommands={
+        "app": "chopin.cli.app.app",
+        "backup": "chopin.cli.backup.backup",
+        "cache": "chopin.cli.cache.cache",
+        "compose": "chopin.cli.compose.compose",
+        "doppelganger": "chopin.cli.doppelganger.doppelganger",
+        "from-queue": "chopin.cli.from_queue.from_queue",
+        "restore": "chopin.cli.restore.restore",
+        "shuffle": "chopin.cli.shuffle.shuffle",
+        "sync": "chopin.cli.sync.sync",
+    },
+)
+@click.option(
+    "--cache/--no-cache", "use_cache", default=True, help="Reuse playlists cached locally, if they did not change."
+)
+@click.option(
+    "--mirror/--no-mirror",
+    "use_mirror",
+    default=True,
+    help="Read playlists from the library mirror created by `chopin sync`, if it is fresh enough.",
+)
+@click.option(
+    "--max-staleness",
+    type=float,
+    default=24.0,
+    show_default=True,
+    help="Maximum age of the library mirror, in hours.",
+)
+def app(use_cache: bool, use_mirror: bool, max_staleness: float):
     """Manage and compose playlists.
 
     [bold red] ah [/bold red] [dim]
     """
-    pass
+    if use_cache:
+        from chopin.client.cache import enable_cache
+
+        enable_cache()
+    if use_mirror:
+        from chopin.client.cache import enable_mirror
 
+        enable_mirror(max_staleness=max_staleness * 3600)
 
-app.add_command(backup)
-app.add_command(compose)
-app.add_command(from_queue)
-app.add_command(restore)
-app.add_command(shuffle)
-app.add_command(webapp)
-app.add_command(doppelganger)
 
 if __name__ == "__main__":
     app()
@@ -1,6 +1,5 @@
 """Restore entrypoint: create a playlist previously saved."""
 
-import json
 from pathlib import Path
 
 import click
@@ -9,6 +8,7 @@ from chopin import VERSION
 from chopin.managers.playlist import create, fill
 from chopin.schemas.playlist import PlaylistSummary
 from chopin.tools.logger import get_logger
+from chopin.tools.serialization import loads
 
 logger = get_logger(__name__)
 
@@ -29,7 +29,7 @@ def restore(
     !!! Note
         Backups can be created with the `backup` entrypoint.
     """
-    json_summary = json.load(open(path))
+    json_summary = loads(path.read_bytes())
     summary = PlaylistSummary.model_validate(json_summary)
     if json_summary.get("version") != VERSION:
         logger.warning(
@@ -10,10 +10,12 @@ LOGGER = get_logger(__name__)
 
 @click.command()
 @click.argument("name", type=str)
+@click.option("--seed", type=int, default=None, help="Seed for the shuffle, to reproduce it.")
 def shuffle(
     name: str,
+    seed: int | None,
 ):
     """Shuffle an existing playlist."""
     click.echo("🔀 Shuffling ...")
-    playlist = shuffle_playlist(name)
+    playlist = shuffle_playlist(name, seed=seed)
     click.echo(f"Playlist {playlist.name} successfully shuffled.")
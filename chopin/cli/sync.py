@@ -0,0 +1,33 @@
+"""Sync entrypoint: mirror the user library and liked tracks locally."""
+
+import click
+
+from chopin.client.cache import LibraryMirror, LikesStore
+from chopin.client.endpoints import sync_library, sync_likes
+from chopin.tools.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@click.command()
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Fetch every playlist and liked track, even if they did not change since the last sync.",
+)
+def sync(full: bool):
+    """Mirror the user playlists, their tracks, albums and artists, and the user liked tracks, in local databases.
+
+    Only the playlists which changed, and the tracks liked, since the last sync are fetched. Other commands then read
+    the playlists from the mirror instead of the Spotify API, as long as it is fresh enough, and the liked tracks from
+    the cache.
+    """
+    click.echo("🔄 Syncing . . .")
+    mirror = LibraryMirror()
+    synced = sync_library(mirror, full=full)
+    click.echo(
+        f"Library synced: {len(synced)} playlists updated. The mirror holds {mirror.count('playlists')} playlists, "
+        f"{mirror.count('tracks')} tracks, {mirror.count('albums')} albums and {mirror.count('artists')} artists."
+    )
+    likes = sync_likes(LikesStore(), full=full)
+    click.echo(f"Likes synced: {len(likes)} liked tracks.")
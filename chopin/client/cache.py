@@ -0,0 +1,597 @@
+"""Persistent, on-disk cache for the Spotify API results.
+
+Playlists are cached along with their Spotify `snapshot_id`. The snapshot changes every time the playlist content
+changes, so a cached playlist is only valid as long as its snapshot is the same.
+
+Albums are cached by id, as their tracks do not change.
+
+Liked tracks are stored along with the most recent `added_at`, so a synchronization only fetches the newly liked
+tracks.
+
+The library mirror is a local copy of the user playlists and their tracks. It is synchronized with
+`chopin sync`, and answers reads as long as it is fresh enough.
+"""
+
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ClassVar
+
+from pydantic import TypeAdapter
+
+from chopin.client.index import TrackIndexCache
+from chopin.constants import constants
+from chopin.schemas.playlist import PlaylistData
+from chopin.schemas.track import TrackData
+from chopin.tools.logger import get_logger
+
+logger = get_logger(__name__)
+
+_TRACKS_ADAPTER = TypeAdapter(list[TrackData])
+
+
+@dataclass
+class CacheEntry:
+    """Description of a cached playlist.
+
+    Attributes:
+        playlist_id: Id of the cached playlist.
+        snapshot_id: Spotify snapshot of the playlist when it was cached.
+        nb_tracks: Number of cached tracks.
+        size: Size of the entry, in bytes.
+        accessed_at: Timestamp of the last read or write of the entry.
+    """
+
+    playlist_id: str
+    snapshot_id: str
+    nb_tracks: int
+    size: int
+    accessed_at: float
+
+
+class SQLiteStore:
+    """Base class for the stores persisted in the chopin SQLite database.
+
+    Attributes:
+        path: Path to the SQLite database.
+    """
+
+    SCHEMA: ClassVar[str] = ""
+
+    def __init__(self, path: Path = constants.CACHE_PATH):
+        """Open the database, and create the store tables if they do not exist."""
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection for a single transaction.
+
+        A connection is opened for each operation, so the store can be used from several threads.
+        """
+        with closing(sqlite3.connect(self.path, timeout=30)) as connection, connection:
+            yield connection
+
+
+class PlaylistCache(SQLiteStore):
+    """SQLite cache of playlist tracks, keyed by playlist id and snapshot id.
+
+    The cache is bounded in size: when it grows above `max_size` bytes, the least recently accessed playlists
+    are evicted.
+
+    Attributes:
+        path: Path to the SQLite database.
+        max_size: Maximum size of the cached tracks, in bytes.
+    """
+
+    SCHEMA: ClassVar[str] = (
+        "CREATE TABLE IF NOT EXISTS playlists ("
+        "playlist_id TEXT PRIMARY KEY, snapshot_id TEXT NOT NULL, nb_tracks INTEGER NOT NULL,"
+        "tracks BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL);"
+    )
+
+    def __init__(self, path: Path = constants.CACHE_PATH, max_size: int = constants.CACHE_MAX_SIZE_BYTES):
+        """Open the cache database, and create it if it does not exist."""
+        self.max_size = max_size
+        super().__init__(path)
+
+    def get(self, playlist_id: str, snapshot_id: str) -> list[TrackData] | None:
+        """Read the tracks of a playlist, if they are cached for the given snapshot.
+
+        Args:
+            playlist_id: Id of the playlist.
+            snapshot_id: Current snapshot of the playlist.
+
+        Returns:
+            The cached tracks, or None if the playlist is not cached or its snapshot is outdated.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT tracks FROM playlists WHERE playlist_id = ? AND snapshot_id = ?", (playlist_id, snapshot_id)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE playlists SET accessed_at = ? WHERE playlist_id = ?", (time.time(), playlist_id))
+        return _TRACKS_ADAPTER.validate_json(row[0])
+
+    def contains(self, playlist_id: str, snapshot_id: str) -> bool:
+        """Check if the tracks of a playlist are cached for the given snapshot, without reading them.
+
+        Args:
+            playlist_id: Id of the playlist.
+            snapshot_id: Current snapshot of the playlist.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT 1 FROM playlists WHERE playlist_id = ? AND snapshot_id = ?", (playlist_id, snapshot_id)
+            ).fetchone()
+        return row is not None
+
+    def set(self, playlist_id: str, snapshot_id: str, tracks: list[TrackData]) -> None:
+        """Cache the tracks of a playlist, and evict old entries if the cache is full.
+
+        Args:
+            playlist_id: Id of the playlist.
+            snapshot_id: Snapshot of the playlist the tracks were read from.
+            tracks: The playlist tracks.
+        """
+        payload = _TRACKS_ADAPTER.dump_json(tracks)
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO playlists VALUES (?, ?, ?, ?, ?, ?)",
+                (playlist_id, snapshot_id, len(tracks), payload, len(payload), time.time()),
+            )
+        self.prune()
+
+    def entries(self) -> list[CacheEntry]:
+        """List the cached playlists, most recently accessed first."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT playlist_id, snapshot_id, nb_tracks, size, accessed_at FROM playlists ORDER BY accessed_at DESC"
+            ).fetchall()
+        return [CacheEntry(*row) for row in rows]
+
+    def prune(self, max_size: int | None = None) -> int:
+        """Evict the least recently accessed playlists until the cache fits in `max_size` bytes.
+
+        Args:
+            max_size: Size limit for the cache. Defaults to the cache `max_size`.
+
+        Returns:
+            The number of evicted playlists.
+        """
+        max_size = self.max_size if max_size is None else max_size
+        evicted: list[str] = []
+        size = 0
+        for entry in self.entries():
+            size += entry.size
+            if size > max_size:
+                evicted.append(entry.playlist_id)
+        if evicted:
+            with self._connect() as connection:
+                connection.executemany("DELETE FROM playlists WHERE playlist_id = ?", [(id_,) for id_ in evicted])
+            logger.debug(f"Evicted {len(evicted)} playlists from the cache.")
+        return len(evicted)
+
+    def clear(self) -> int:
+        """Remove every cached playlist.
+
+        Returns:
+            The number of removed playlists.
+        """
+        with self._connect() as connection:
+            return connection.execute("DELETE FROM playlists").rowcount
+
+
+class LikesStore(SQLiteStore):
+    """SQLite store of the user liked tracks.
+
+    The store remembers the `added_at` of the most recently liked track (the watermark), and when the library
+    was last fully synchronized.
+
+    Attributes:
+        path: Path to the SQLite database.
+    """
+
+    SCHEMA: ClassVar[str] = (
+        "CREATE TABLE IF NOT EXISTS likes (track_id TEXT PRIMARY KEY, added_at TEXT NOT NULL, track BLOB NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS likes_sync (key TEXT PRIMARY KEY, value);"
+    )
+
+    @property
+    def watermark(self) -> str | None:
+        """The `added_at` timestamp of the most recently liked track in the store."""
+        with self._connect() as connection:
+            return connection.execute("SELECT MAX(added_at) FROM likes").fetchone()[0]
+
+    @property
+    def last_full_sync(self) -> float | None:
+        """Timestamp of the last full synchronization of the store."""
+        with self._connect() as connection:
+            row = connection.execute("SELECT value FROM likes_sync WHERE key = 'last_full_sync'").fetchone()
+        return row[0] if row else None
+
+    def add(self, likes: list[tuple[str, TrackData]]) -> None:
+        """Add or update liked tracks in the store.
+
+        Args:
+            likes: Pairs of `added_at` timestamp, as sent by the Spotify API, and liked track.
+        """
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO likes VALUES (?, ?, ?)",
+                [(track.id, added_at, track.model_dump_json()) for added_at, track in likes],
+            )
+
+    def replace(self, likes: list[tuple[str, TrackData]]) -> None:
+        """Replace the whole content of the store. Tracks which are no longer liked are removed.
+
+        Args:
+            likes: Pairs of `added_at` timestamp, as sent by the Spotify API, and liked track.
+        """
+        with self._connect() as connection:
+            connection.execute("DELETE FROM likes")
+            connection.executemany(
+                "INSERT OR REPLACE INTO likes VALUES (?, ?, ?)",
+                [(track.id, added_at, track.model_dump_json()) for added_at, track in likes],
+            )
+            connection.execute("INSERT OR REPLACE INTO likes_sync VALUES ('last_full_sync', ?)", (time.time(),))
+
+    def tracks(self) -> list[TrackData]:
+        """Read the liked tracks, most recently liked first."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT track FROM likes ORDER BY added_at DESC").fetchall()
+        # The stored tracks are validated at once, as a single JSON array.
+        return _TRACKS_ADAPTER.validate_json(f"[{','.join(row[0] for row in rows)}]")
+
+
+class AlbumCache(SQLiteStore):
+    """SQLite cache of album tracks, keyed by album id.
+
+    The tracks of an album do not change once it is released, so cached albums do not expire.
+
+    Attributes:
+        path: Path to the SQLite database.
+    """
+
+    SCHEMA: ClassVar[str] = "CREATE TABLE IF NOT EXISTS albums (album_id TEXT PRIMARY KEY, tracks BLOB NOT NULL);"
+
+    def get_many(self, album_ids: list[str]) -> dict[str, list[TrackData]]:
+        """Read the tracks of the cached albums among `album_ids`.
+
+        Args:
+            album_ids: Ids of the albums.
+
+        Returns:
+            A mapping from the cached album ids to their tracks.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT album_id, tracks FROM albums WHERE album_id IN ({', '.join('?' * len(album_ids))})",
+                album_ids,
+            ).fetchall()
+        return {album_id: _TRACKS_ADAPTER.validate_json(tracks) for album_id, tracks in rows}
+
+    def set_many(self, albums_tracks: dict[str, list[TrackData]]) -> None:
+        """Cache the tracks of several albums.
+
+        Args:
+            albums_tracks: A mapping from album ids to their tracks.
+        """
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO albums VALUES (?, ?)",
+                [(album_id, _TRACKS_ADAPTER.dump_json(tracks)) for album_id, tracks in albums_tracks.items()],
+            )
+
+    def clear(self) -> int:
+        """Remove every cached album.
+
+        Returns:
+            The number of removed albums.
+        """
+        with self._connect() as connection:
+            return connection.execute("DELETE FROM albums").rowcount
+
+
+class LibraryMirror(SQLiteStore):
+    """SQLite mirror of the user library: playlists and their tracks.
+
+    Playlists are synchronized along with their Spotify `snapshot_id`, so a synchronization only fetches the
+    playlists which changed. Each track is stored once, along with its album and artists, whatever the number of
+    playlists it is in. The mirror only answers reads if it was synchronized less than `max_staleness` seconds
+    ago.
+
+    Attributes:
+        path: Path to the SQLite database.
+        max_staleness: Maximum age of the last synchronization for the mirror to be read, in seconds.
+    """
+
+    SCHEMA: ClassVar[str] = (
+        "CREATE TABLE IF NOT EXISTS mirror_playlists (playlist_id TEXT PRIMARY KEY, name TEXT NOT NULL,"
+        "uri TEXT NOT NULL, snapshot_id TEXT, synced_at REAL);"
+        "CREATE TABLE IF NOT EXISTS mirror_playlist_tracks (playlist_id TEXT NOT NULL, position INTEGER NOT NULL,"
+        "track_id TEXT NOT NULL, added_at TEXT, PRIMARY KEY (playlist_id, position));"
+        "CREATE TABLE IF NOT EXISTS mirror_tracks (track_id TEXT PRIMARY KEY, track BLOB NOT NULL);"
+        # Albums and artists are read from the tracks: earlier mirrors stored them in tables of their own.
+        "DROP TABLE IF EXISTS mirror_albums;"
+        "DROP TABLE IF EXISTS mirror_artists;"
+        "CREATE TABLE IF NOT EXISTS mirror_sync (key TEXT PRIMARY KEY, value);"
+    )
+
+    def __init__(self, path: Path = constants.MIRROR_PATH, max_staleness: float = constants.MIRROR_MAX_STALENESS):
+        """Open the mirror database, and create it if it does not exist."""
+        self.max_staleness = max_staleness
+        super().__init__(path)
+
+    @property
+    def last_sync(self) -> float | None:
+        """Timestamp of the last synchronization of the mirror."""
+        with self._connect() as connection:
+            row = connection.execute("SELECT value FROM mirror_sync WHERE key = 'last_sync'").fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self) -> bool:
+        """Whether the mirror was synchronized less than `max_staleness` seconds ago."""
+        last_sync = self.last_sync
+        return last_sync is not None and time.time() - last_sync <= self.max_staleness
+
+    def playlists(self) -> list[PlaylistData] | None:
+        """Read the user playlists.
+
+        Returns:
+            The mirrored playlists, or None if the mirror is stale.
+        """
+        if not self.is_fresh():
+            return None
+        with self._connect() as connection:
+            rows = connection.execute("SELECT playlist_id, name, uri FROM mirror_playlists ORDER BY rowid").fetchall()
+        return [PlaylistData(id=playlist_id, name=name, uri=uri) for playlist_id, name, uri in rows]
+
+    def snapshots(self) -> dict[str, str]:
+        """Get the snapshot of each synchronized playlist."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT playlist_id, snapshot_id FROM mirror_playlists WHERE synced_at IS NOT NULL"
+            ).fetchall()
+        return dict(rows)
+
+    def synced_at(self, playlist_id: str) -> float | None:
+        """Timestamp of the last synchronization of a playlist.
+
+        Args:
+            playlist_id: Id of the playlist.
+
+        Returns:
+            The timestamp, or None if the mirror is stale or the playlist is not synchronized.
+        """
+        if not self.is_fresh():
+            return None
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT synced_at FROM mirror_playlists WHERE playlist_id = ?", (playlist_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def nb_tracks(self, playlist_id: str) -> int | None:
+        """Count the tracks of a playlist, without reading them.
+
+        Args:
+            playlist_id: Id of the playlist.
+
+        Returns:
+            The number of mirrored tracks, or None if the mirror is stale or the playlist is not synchronized.
+        """
+        if self.synced_at(playlist_id) is None:
+            return None
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT COUNT(*) FROM mirror_playlist_tracks WHERE playlist_id = ?", (playlist_id,)
+            ).fetchone()
+        return row[0]
+
+    def tracks(self, playlist_id: str) -> list[TrackData] | None:
+        """Read the tracks of a playlist, in the playlist order.
+
+        Args:
+            playlist_id: Id of the playlist.
+
+        Returns:
+            The mirrored tracks, or None if the mirror is stale or the playlist is not synchronized.
+        """
+        tracks = self.iter_tracks(playlist_id)
+        return None if tracks is None else list(tracks)
+
+    def iter_tracks(self, playlist_id: str) -> Iterator[TrackData] | None:
+        """Read the tracks of a playlist one chunk at a time, in the playlist order.
+
+        Only a chunk of rows is held in memory at once, so the tracks can be stored as they are read.
+
+        Args:
+            playlist_id: Id of the playlist.
+
+        Returns:
+            An iterator over the mirrored tracks, or None if the mirror is stale or the playlist is not synchronized.
+        """
+        if self.synced_at(playlist_id) is None:
+            return None
+        return self._iter_tracks(playlist_id)
+
+    def _iter_tracks(self, playlist_id: str) -> Iterator[TrackData]:
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "SELECT json_set(track, '$.added_at', added_at) FROM mirror_playlist_tracks "
+                "JOIN mirror_tracks USING (track_id) WHERE playlist_id = ? ORDER BY position",
+                (playlist_id,),
+            )
+            while rows := cursor.fetchmany(constants.MIRROR_READ_CHUNK):
+                yield from _TRACKS_ADAPTER.validate_json(f"[{','.join(row[0] for row in rows)}]")
+
+    def set_playlists(self, playlists: list[PlaylistData]) -> None:
+        """Update the list of user playlists. Playlists which are no longer in the library are removed.
+
+        Args:
+            playlists: The user playlists.
+        """
+        with self._connect() as connection:
+            mirrored = {row[0] for row in connection.execute("SELECT playlist_id FROM mirror_playlists")}
+            removed = [(playlist_id,) for playlist_id in mirrored - {playlist.id for playlist in playlists}]
+            for table in ("mirror_playlists", "mirror_playlist_tracks"):
+                connection.executemany(f"DELETE FROM {table} WHERE playlist_id = ?", removed)
+            connection.executemany(
+                "INSERT INTO mirror_playlists (playlist_id, name, uri) VALUES (?, ?, ?) "
+                "ON CONFLICT (playlist_id) DO UPDATE SET name = excluded.name, uri = excluded.uri",
+                [(playlist.id, playlist.name, playlist.uri) for playlist in playlists],
+            )
+
+    def add_playlist(self, playlist: PlaylistData) -> None:
+        """Add a playlist to the mirror, without its tracks. It will be synchronized at the next synchronization.
+
+        Args:
+            playlist: The playlist, newly added to the user library.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO mirror_playlists (playlist_id, name, uri) VALUES (?, ?, ?)",
+                (playlist.id, playlist.name, playlist.uri),
+            )
+
+    def invalidate(self, playlist_id: str) -> None:
+        """Mark the tracks of a playlist as outdated, until the next synchronization.
+
+        Args:
+            playlist_id: Id of the playlist, whose content changed.
+        """
+        with self._connect() as connection:
+            connection.execute("UPDATE mirror_playlists SET synced_at = NULL WHERE playlist_id = ?", (playlist_id,))
+
+    def set_tracks(self, playlist_id: str, snapshot_id: str, tracks: list[TrackData]) -> None:
+        """Store the tracks of a playlist.
+
+        Args:
+            playlist_id: Id of the playlist.
+            snapshot_id: Snapshot of the playlist the tracks were read from.
+            tracks: The playlist tracks, in the playlist order.
+        """
+        with self._connect() as connection:
+            connection.execute("DELETE FROM mirror_playlist_tracks WHERE playlist_id = ?", (playlist_id,))
+            connection.executemany(
+                "INSERT INTO mirror_playlist_tracks VALUES (?, ?, ?, ?)",
+                [
+                    (playlist_id, position, track.id, track.added_at.isoformat() if track.added_at else None)
+                    for position, track in enumerate(tracks)
+                ],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO mirror_tracks VALUES (?, ?)",
+                [(track.id, track.model_dump_json(exclude={"added_at"})) for track in tracks],
+            )
+            connection.execute(
+                "UPDATE mirror_playlists SET snapshot_id = ?, synced_at = ? WHERE playlist_id = ?",
+                (snapshot_id, time.time(), playlist_id),
+            )
+
+    def mark_synced(self) -> None:
+        """Record a complete synchronization, and remove the tracks no longer in a playlist."""
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM mirror_tracks WHERE track_id NOT IN (SELECT track_id FROM mirror_playlist_tracks)"
+            )
+            connection.execute("INSERT OR REPLACE INTO mirror_sync VALUES ('last_sync', ?)", (time.time(),))
+
+    def count(self, table: str) -> int:
+        """Count the `playlists`, `tracks`, `albums` or `artists` of the mirror.
+
+        Albums and artists are counted from the mirrored tracks.
+        """
+        with self._connect() as connection:
+            return connection.execute(_MIRROR_COUNTS[table]).fetchone()[0]
+
+
+_MIRROR_COUNTS = {
+    "playlists": "SELECT COUNT(*) FROM mirror_playlists",
+    "tracks": "SELECT COUNT(*) FROM mirror_tracks",
+    "albums": "SELECT COUNT(DISTINCT json_extract(track, '$.album.id')) FROM mirror_tracks",
+    "artists": (
+        "SELECT COUNT(DISTINCT json_extract(artist.value, '$.id')) "
+        "FROM mirror_tracks, json_each(track, '$.artists') artist"
+    ),
+}
+
+_PLAYLIST_CACHE: PlaylistCache | None = None
+_ALBUM_CACHE: AlbumCache | None = None
+_LIKES_STORE: LikesStore | None = None
+_LIBRARY_MIRROR: LibraryMirror | None = None
+_TRACK_INDEXES = TrackIndexCache()
+
+
+def enable_cache(path: Path = constants.CACHE_PATH, max_size: int = constants.CACHE_MAX_SIZE_BYTES) -> None:
+    """Enable the persistent playlist, album and likes caches for the endpoints.
+
+    Args:
+        path: Path to the SQLite database.
+        max_size: Maximum size of the playlist cache, in bytes.
+    """
+    global _PLAYLIST_CACHE, _ALBUM_CACHE, _LIKES_STORE
+    _PLAYLIST_CACHE = PlaylistCache(path=path, max_size=max_size)
+    _ALBUM_CACHE = AlbumCache(path=path)
+    _LIKES_STORE = LikesStore(path=path)
+    _TRACK_INDEXES.clear()
+
+
+def disable_cache() -> None:
+    """Disable the persistent caches. Playlists, albums and likes will be fetched from the API."""
+    global _PLAYLIST_CACHE, _ALBUM_CACHE, _LIKES_STORE
+    _PLAYLIST_CACHE = None
+    _ALBUM_CACHE = None
+    _LIKES_STORE = None
+    _TRACK_INDEXES.clear()
+
+
+def get_playlist_cache() -> PlaylistCache | None:
+    """Get the enabled playlist cache, if any."""
+    return _PLAYLIST_CACHE
+
+
+def get_album_cache() -> AlbumCache | None:
+    """Get the enabled album cache, if any."""
+    return _ALBUM_CACHE
+
+
+def get_likes_store() -> LikesStore | None:
+    """Get the enabled store of liked tracks, if any."""
+    return _LIKES_STORE
+
+
+def enable_mirror(path: Path = constants.MIRROR_PATH, max_staleness: float = constants.MIRROR_MAX_STALENESS) -> None:
+    """Read the user playlists and their tracks from the library mirror, when it is fresh enough.
+
+    Args:
+        path: Path to the mirror database.
+        max_staleness: Maximum age of the last synchronization for the mirror to be read, in seconds.
+    """
+    global _LIBRARY_MIRROR
+    _LIBRARY_MIRROR = LibraryMirror(path=path, max_staleness=max_staleness)
+    _TRACK_INDEXES.clear()
+
+
+def disable_mirror() -> None:
+    """Stop reading from the library mirror. Playlists will be fetched from the API."""
+    global _LIBRARY_MIRROR
+    _LIBRARY_MIRROR = None
+    _TRACK_INDEXES.clear()
+
+
+def get_library_mirror() -> LibraryMirror | None:
+    """Get the enabled library mirror, if any."""
+    return _LIBRARY_MIRROR
+
+
+def get_track_indexes() -> TrackIndexCache:
+    """Get the in-memory indexes of the cached and mirrored playlists."""
+    return _TRACK_INDEXES
@@ -1,23 +1,70 @@
 """Spotipy client endpoints."""
 
-import random
-from datetime import datetime
+import itertools
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import date, datetime
 from functools import lru_cache
 from typing import Any, Literal
 
-from pydantic import ValidationError
-
+from pydantic import TypeAdapter, ValidationError
+
+from chopin.client.cache import (
+    LibraryMirror,
+    LikesStore,
+    get_album_cache,
+    get_library_mirror,
+    get_likes_store,
+    get_playlist_cache,
+    get_track_indexes,
+)
+from chopin.client.identity import get_identity_map
+from chopin.client.index import TrackIndex
+from chopin.client.scheduler import SchedulerStats
 from chopin.client.settings import _client
 from chopin.constants import constants
 from chopin.schemas.artist import ArtistData
 from chopin.schemas.playlist import PlaylistData
 from chopin.schemas.track import TrackData
 from chopin.schemas.user import UserData
+from chopin.tools.cache import CoalescingStats, singleflight, ttl_cache
+from chopin.tools.dates import as_date, parse_release_date
 from chopin.tools.logger import get_logger
-from chopin.tools.strings import match_strings, simplify_string
+from chopin.tools.randomness import get_rng
+from chopin.tools.strings import match_strings, playlist_id_from_uri, simplify_string
 
 logger = get_logger(__name__)
 
+_TRACKS_ADAPTER = TypeAdapter(list[TrackData])
+
+
+def get_scheduler_stats() -> SchedulerStats:
+    """Get the counters of the calls sent to the Spotify API: calls, throttled and retried calls."""
+    return _client.scheduler.stats
+
+
+def get_coalescing_stats() -> CoalescingStats:
+    """Get the counters of the coalesced calls to the Spotify API.
+
+    Identical requests sent concurrently, like the same playlist page requested by two composition items, share a
+    single call to the API. Hits count the requests which were saved.
+    """
+    coalesced = [
+        get_user_playlists,
+        _get_playlist_page,
+        get_playlist_snapshot_id,
+        get_playlist_total,
+        _get_saved_tracks_page,
+        _get_album_tracks_page,
+    ]
+    return CoalescingStats(
+        hits=sum(fn.stats.hits for fn in coalesced),
+        misses=sum(fn.stats.misses for fn in coalesced),
+    )
+
 
 def search_artist(artist_name: str) -> ArtistData | None:
     """Search an artist.
@@ -47,7 +94,7 @@ def get_artist_top_tracks(artist: ArtistData, max_tracks: int = 20) -> list[Trac
     """
     response = _client.artist_top_tracks(artist_id=artist.id)
     tracks = response["tracks"]
-    return [TrackData(**track) for track in random.sample(tracks, min(len(tracks), max_tracks))]
+    return [TrackData(**track) for track in get_rng().sample(tracks, min(len(tracks), max_tracks))]
 
 
 def get_currently_playing() -> TrackData | None:
@@ -93,15 +140,48 @@ def get_queue() -> list[TrackData]:
     return [TrackData(**track) for track in response.get("queue")]
 
 
-@lru_cache
+def _get_user_playlists_page(offset: int) -> dict[str, Any]:
+    """Fetch a single page of the current user playlists, starting at `offset`."""
+    return _client.current_user_playlists(limit=constants.SPOTIFY_USER_PLAYLISTS_LIMIT, offset=offset)
+
+
+def _get_user_playlists_items() -> list[dict[str, Any]]:
+    """Fetch the raw playlists of the current user.
+
+    Once the first page gave the number of playlists, the remaining pages are fetched concurrently.
+    """
+    response = _get_user_playlists_page(offset=0)
+    playlists = response.get("items", [])
+    offsets = range(len(playlists), response.get("total", 0), constants.SPOTIFY_USER_PLAYLISTS_LIMIT)
+    with ThreadPoolExecutor(max_workers=constants.MAX_WORKERS) as executor:
+        for page in executor.map(_get_user_playlists_page, offsets):
+            playlists.extend(page.get("items", []))
+    return playlists
+
+
+def _read_playlist(playlist: dict[str, Any]) -> PlaylistData:
+    """Read a raw playlist of the user library."""
+    return PlaylistData(name=simplify_string(playlist["name"]), uri=playlist["uri"], id=playlist["id"])
+
+
+@ttl_cache(ttl=constants.USER_PLAYLISTS_TTL)
+@singleflight
 def get_user_playlists() -> list[PlaylistData]:
     """Retrieve the playlists of the current user.
 
+    If the library mirror is enabled and fresh, the playlists are read from the mirror.
+
+    !!! note
+        The playlists are cached for a few minutes. Use `get_user_playlists.cache_clear()` to invalidate it.
+
     Returns:
         A list of playlist data.
     """
-    playlists = _client.current_user_playlists().get("items", [])
-    return [PlaylistData(name=simplify_string(p["name"]), uri=p["uri"], id=p["id"]) for p in playlists]
+    mirror = get_library_mirror()
+    playlists = mirror.playlists() if mirror else None
+    if playlists is not None:
+        return playlists
+    return [_read_playlist(playlist) for playlist in _get_user_playlists_items()]
 
 
 def get_named_playlist(name: str) -> PlaylistData:
@@ -145,50 +225,467 @@ def _validate_single_track(track: dict[str, Any]) -> TrackData | None:
         logger.warning(f"Error in track validation, the track is ignored: {track} \n Exception raised: {exc}")
 
 
+def _validate_payload(items: list[dict[str, Any]], payload: list[dict[str, Any]]) -> dict[int, TrackData]:
+    """Validate the tracks of items at once, with a type adapter.
+
+    If some of them are invalid, the items are validated one by one instead: the invalid ones are logged and skipped,
+    and each valid one is validated once.
+
+    Returns:
+        The validated tracks, by position of their item.
+    """
+    try:
+        return dict(enumerate(_TRACKS_ADAPTER.validate_python(payload)))
+    except ValidationError:
+        pass
+    validated = map(_validate_single_track, items)
+    return {index: track for index, track in enumerate(validated) if track is not None}
+
+
+def _validate_items(items: list[dict[str, Any]]) -> list[tuple[dict[str, Any], TrackData]]:
+    """Validate the tracks of playlist or library items, in bulk.
+
+    With an identity map in use, the tracks already read are not validated again: their interned track is used.
+
+    Args:
+        items: Items of a playlist or of the user library, as received after the Spotify API call.
+
+    Returns:
+        Pairs of item and validated track, for the items with a valid track.
+    """
+    items = [item for item in items if item.get("track")]
+    payload = [dict(item["track"], added_at=item.get("added_at")) for item in items]
+    identity_map = get_identity_map()
+    if identity_map is None:
+        tracks = _validate_payload(items, payload)
+    else:
+        tracks = {index: track for index, track in enumerate(map(identity_map.lookup, payload)) if track is not None}
+        missing = [index for index in range(len(items)) if index not in tracks]
+        validated = _validate_payload([items[index] for index in missing], [payload[index] for index in missing])
+        for position, track in validated.items():
+            tracks[missing[position]] = identity_map.intern(payload[missing[position]], track)
+    return [(item, tracks[index]) for index, item in enumerate(items) if index in tracks]
+
+
 def _validate_tracks(tracks: list[dict[str, Any]]) -> list[TrackData]:
     """Read and validate track objects from the Spotify response."""
-    response_tracks = [_validate_single_track(track) for track in tracks]
-    return [track for track in response_tracks if track]
+    return [track for _, track in _validate_items(tracks)]
 
 
-def get_playlist_tracks(
-    playlist_id: str, release_date_range: tuple[datetime.date, datetime.date] | None = None
+def _filter_date_ranges(
+    tracks: list[TrackData],
+    release_date_range: tuple[datetime.date, datetime.date] | None = None,
+    added_at_range: tuple[datetime.date, datetime.date] | None = None,
 ) -> list[TrackData]:
-    """Get tracks of a given playlist.
+    """Keep the tracks released, and added to the playlist, within the date ranges, if any.
+
+    Fetched tracks are filtered once, so they are scanned: indexes are only built for the cached and mirrored
+    playlists, which are read again.
+    """
+    if not release_date_range and not added_at_range:
+        return tracks
+    return [track for track in tracks if _in_date_ranges(track, release_date_range, added_at_range)]
+
+
+def _in_date_ranges(
+    track: TrackData,
+    release_date_range: tuple[datetime.date, datetime.date] | None = None,
+    added_at_range: tuple[datetime.date, datetime.date] | None = None,
+) -> bool:
+    """Whether a track was released, and added to the playlist, within the date ranges, if any."""
+    release_date = track.album.release_date if track.album else None
+    return (not release_date_range or _date_in_range(release_date, release_date_range)) and (
+        not added_at_range or _date_in_range(track.added_at, added_at_range)
+    )
+
+
+def _date_in_range(value: Any, date_range: tuple[datetime.date, datetime.date]) -> bool:
+    """Whether a date is within a range. Bounds are included, and values which are not dates are out of range."""
+    return isinstance(value, date) and as_date(date_range[0]) <= value <= as_date(date_range[1])
+
+
+def _raw_date(value: Any, parse: Callable[[str], Any]) -> Any:
+    """Date of a raw item field, None if it is missing or can't be read."""
+    if isinstance(value, str):
+        try:
+            return as_date(parse(value))
+        except ValueError:
+            return None
+    return as_date(value) if value else None
+
+
+def _raw_date_in_range(value: Any, date_range: tuple[datetime.date, datetime.date]) -> bool:
+    """Whether a date read from a raw item is within a range. Bounds are included."""
+    return value is not None and as_date(date_range[0]) <= value <= as_date(date_range[1])
+
+
+def _raw_item_in_date_ranges(
+    item: dict[str, Any],
+    release_date_range: tuple[datetime.date, datetime.date] | None = None,
+    added_at_range: tuple[datetime.date, datetime.date] | None = None,
+) -> bool:
+    """Whether a raw playlist item is within the date ranges, as `_filter_date_ranges` would tell once validated.
+
+    Items whose dates can't be read are left out, as the tracks without a date are.
+    """
+    if release_date_range:
+        album = (item.get("track") or {}).get("album") or {}
+        if not _raw_date_in_range(_raw_date(album.get("release_date"), parse_release_date), release_date_range):
+            return False
+    if added_at_range:
+        return _raw_date_in_range(_raw_date(item.get("added_at"), datetime.fromisoformat), added_at_range)
+    return True
+
+
+@singleflight
+def _get_playlist_page(playlist_id: str, offset: int) -> dict[str, Any]:
+    """Fetch a single page of playlist items, starting at `offset`."""
+    return _client.playlist_items(
+        playlist_id,
+        offset=offset,
+        limit=constants.SPOTIFY_PLAYLIST_ITEMS_LIMIT,
+        fields=constants.TRACK_FIELDS,
+        additional_types=["track"],
+    )
+
+
+def _iter_playlist_pages(playlist_id: str, read_ahead: int = constants.MAX_WORKERS) -> Iterator[list[dict[str, Any]]]:
+    """Iterate over the pages of items of a playlist, in the playlist order.
 
     Args:
         playlist_id: The uri of the playlist.
-        release_date_range: A date range; tracks to retrieve must have been released in this range.
+        read_ahead: Once the first page gave the playlist `total`, number of next pages fetched in the background
+            while a page is consumed. With no read-ahead, or if the `total` is not available, pages are fetched one
+            after the other.
+
+    Yields:
+        The raw items of each page.
+    """
+    response = _get_playlist_page(playlist_id, offset=0)
+    offset = len(response["items"])
+    total = response.get("total")
+    yield response["items"]
+
+    if read_ahead and total is not None:
+        offsets = iter(range(offset, total, constants.SPOTIFY_PLAYLIST_ITEMS_LIMIT))
+        with ThreadPoolExecutor(max_workers=min(read_ahead, constants.MAX_WORKERS)) as executor:
+            pending = deque(
+                executor.submit(_get_playlist_page, playlist_id, page_offset)
+                for page_offset in itertools.islice(offsets, read_ahead)
+            )
+            try:
+                while pending:
+                    page = pending.popleft().result()
+                    pending.extend(
+                        executor.submit(_get_playlist_page, playlist_id, page_offset)
+                        for page_offset in itertools.islice(offsets, 1)
+                    )
+                    yield page["items"]
+            finally:
+                # The iteration may be stopped early: pages which are not fetched yet are not needed.
+                for future in pending:
+                    future.cancel()
+        return
+
+    while response["items"]:
+        response = _get_playlist_page(playlist_id, offset=offset)
+        offset += len(response["items"])
+        yield response["items"]
+
+
+@singleflight
+def get_playlist_total(playlist_id: str) -> tuple[int, str]:
+    """Get the number of items of a playlist, without fetching them.
 
+    Args:
+        playlist_id: The uri of the playlist.
 
     Returns:
-        A list of track uuids.
+        The number of items in the playlist, and its snapshot id.
+    """
+    response = _client.playlist(playlist_id, fields="snapshot_id,tracks.total")
+    return response["tracks"]["total"], response["snapshot_id"]
+
+
+@singleflight
+def get_playlist_snapshot_id(playlist_id: str) -> str:
+    """Get the current snapshot of a playlist.
+
+    The snapshot id changes whenever the playlist content changes. The call is cheap, as no track is fetched.
+
+    Args:
+        playlist_id: The uri of the playlist.
+
+    Returns:
+        The playlist snapshot id.
+    """
+    return _client.playlist(playlist_id, fields="snapshot_id")["snapshot_id"]
+
+
+def _read_cached_playlist(playlist_id: str, use_mirror: bool = True) -> tuple[str | None, TrackIndex | None]:
+    """Read the tracks of a playlist from the library mirror or the playlist cache, if they are enabled.
+
+    A fresh mirror is read without any call to the API. Otherwise, the cached tracks are only read if the playlist
+    snapshot did not change. The tracks are indexed on their dates, and the index is kept in memory until the
+    playlist changes.
+
+    Returns:
+        The current snapshot of the playlist, and the index of its cached tracks if they are still valid.
+    """
+    mirror = get_library_mirror() if use_mirror else None
+    synced_at = mirror.synced_at(playlist_id) if mirror else None
+    if synced_at is not None:
+        index = get_track_indexes().get(playlist_id, synced_at, lambda: mirror.iter_tracks(playlist_id))
+        if index is not None:
+            logger.debug(f"Playlist {playlist_id} read from the library mirror")
+            return None, index
+
+    cache = get_playlist_cache()
+    if cache is None:
+        return None, None
+    snapshot_id = get_playlist_snapshot_id(playlist_id)
+    index = get_track_indexes().get(playlist_id, snapshot_id, lambda: cache.get(playlist_id, snapshot_id))
+    if index is not None:
+        logger.debug(f"Playlist {playlist_id} read from cache, snapshot {snapshot_id}")
+    return snapshot_id, index
+
+
+def iter_playlist_tracks(
+    playlist_id: str,
+    release_date_range: tuple[datetime.date, datetime.date] | None = None,
+    read_ahead: int = constants.MAX_WORKERS,
+    use_mirror: bool = True,
+    added_at_range: tuple[datetime.date, datetime.date] | None = None,
+) -> Iterator[TrackData]:
+    """Iterate over the tracks of a playlist, as its pages are fetched.
+
+    Tracks are validated and yielded as soon as their page arrives, so the caller can start working before the
+    whole playlist is fetched. While a page is consumed, the next pages are fetched in the background.
+
+    If the library mirror is enabled and fresh, the tracks are read from the mirror. If the playlist cache is
+    enabled, the tracks are read from the cache when the playlist snapshot did not change. Otherwise, they are cached
+    once the iteration is complete. Cached tracks are filtered on their dates with a binary search.
+
+    Args:
+        playlist_id: The uri of the playlist.
+        release_date_range: A date range; tracks to retrieve must have been released in this range.
+        read_ahead: Number of pages fetched in advance. With no read-ahead, pages are fetched one after the other.
+        use_mirror: Read the tracks from the library mirror, if it is enabled.
+        added_at_range: A date range; tracks to retrieve must have been added to the playlist in this range.
+
+    Yields:
+        The valid tracks of the playlist, in the playlist order.
+    """
+    playlist_id = playlist_id_from_uri(playlist_id)
+    snapshot_id, index = _read_cached_playlist(playlist_id, use_mirror=use_mirror)
+    if index is not None:
+        yield from index.query(release_date_range, added_at_range)
+        return
+    yield from _fetch_playlist_tracks(playlist_id, snapshot_id, read_ahead, release_date_range, added_at_range)
+
+
+def _fetch_playlist_tracks(
+    playlist_id: str,
+    snapshot_id: str | None,
+    read_ahead: int = constants.MAX_WORKERS,
+    release_date_range: tuple[datetime.date, datetime.date] | None = None,
+    added_at_range: tuple[datetime.date, datetime.date] | None = None,
+) -> Iterator[TrackData]:
+    """Fetch the tracks of a playlist, and cache them under `snapshot_id` once the iteration is complete.
+
+    The tracks are only cached if the playlist cache is enabled and the snapshot is known.
+    """
+    for page in _fetch_playlist_items(playlist_id, snapshot_id, read_ahead):
+        yield from _filter_date_ranges([track for _, track in page], release_date_range, added_at_range)
+
+
+def _fetch_playlist_items(
+    playlist_id: str, snapshot_id: str | None, read_ahead: int = constants.MAX_WORKERS
+) -> Iterator[list[tuple[dict[str, Any], TrackData]]]:
+    """Fetch the pages of a playlist, as pairs of item and validated track.
+
+    The tracks are cached under `snapshot_id` once the iteration is complete, if the playlist cache is enabled.
+    """
+    cache = get_playlist_cache() if snapshot_id else None
+    tracks: list[TrackData] = []
+    for items in _iter_playlist_pages(playlist_id, read_ahead=read_ahead):
+        page = _validate_items(items)
+        if cache:
+            tracks.extend(track for _, track in page)
+        yield page
+    if cache:
+        cache.set(playlist_id, snapshot_id, tracks)
+        get_track_indexes().get(playlist_id, snapshot_id, lambda: tracks)
+
+
+def _validate_preselected_items(
+    items: list[dict[str, Any]],
+    nb_tracks: int,
+    release_date_range: tuple[datetime.date, datetime.date] | None = None,
+    added_at_range: tuple[datetime.date, datetime.date] | None = None,
+) -> list[TrackData]:
+    """Validate the first `nb_tracks` valid tracks of ranked items.
+
+    Items are validated by chunks of the number of missing tracks: when some fail the validation or the date
+    filters, the next ranked items are validated to backfill the selection.
+    """
+    tracks: list[TrackData] = []
+    start = 0
+    while len(tracks) < nb_tracks and start < len(items):
+        chunk = items[start : start + nb_tracks - len(tracks)]
+        start += len(chunk)
+        tracks.extend(_filter_date_ranges(_validate_tracks(chunk), release_date_range, added_at_range))
+    return tracks
+
+
+def _sample_playlist_tracks(
+    playlist_id: str,
+    nb_tracks: int,
+    release_date_range: tuple[datetime.date, datetime.date] | None = None,
+    added_at_range: tuple[datetime.date, datetime.date] | None = None,
+) -> list[TrackData]:
+    """Get `nb_tracks` valid tracks of a playlist, sampled at random.
+
+    The first page gives the playlist `total`. The positions of the tracks are sampled up front, and only the
+    pages containing them are fetched, concurrently. When sampled tracks fail the validation or the date filters,
+    other positions are sampled, among the ones not sampled yet, to top the selection up.
     """
-    offset: int = 0
+    page_size = constants.SPOTIFY_PLAYLIST_ITEMS_LIMIT
+    first_page = _get_playlist_page(playlist_id, offset=0)
+    pages: dict[int, list[dict[str, Any]]] = {0: first_page["items"]}
+    total = first_page.get("total", len(first_page["items"]))
+    rng = get_rng()
+
     tracks: list[TrackData] = []
-    response: dict[str, Any] = {"response": []}
-
-    while response:
-        response = _client.playlist_items(
-            playlist_id,
-            offset=offset,
-            fields=constants.TRACK_FIELDS,
-            additional_types=["track"],
+    sampled: set[int] = set()
+    while len(tracks) < nb_tracks and len(sampled) < total:
+        # Only the missing positions are drawn: the remaining ones are listed for the top-ups only.
+        population = [position for position in range(total) if position not in sampled] if sampled else range(total)
+        wanted = rng.sample(population, min(nb_tracks - len(tracks), len(population)))
+        sampled.update(wanted)
+        offsets = list({position - position % page_size for position in wanted} - pages.keys())
+        with ThreadPoolExecutor(max_workers=constants.MAX_WORKERS) as executor:
+            fetched = executor.map(lambda page_offset: _get_playlist_page(playlist_id, page_offset)["items"], offsets)
+            pages.update(zip(offsets, fetched, strict=True))
+        items = [pages[position - position % page_size][position % page_size :][:1] for position in wanted]
+        tracks.extend(
+            _filter_date_ranges(_validate_tracks(list(itertools.chain(*items))), release_date_range, added_at_range)
         )
-        offset += len(response["items"])
+    return tracks
+
+
+def get_playlist_tracks(
+    playlist_id: str,
+    release_date_range: tuple[datetime.date, datetime.date] | None = None,
+    concurrent: bool = True,
+    limit: int | None = None,
+    sample: bool = False,
+    preselect: Callable[[Iterator[dict[str, Any]]], list[dict[str, Any]]] | None = None,
+    use_mirror: bool = True,
+    added_at_range: tuple[datetime.date, datetime.date] | None = None,
+) -> list[TrackData]:
+    """Get tracks of a given playlist.
+
+    If the library mirror is enabled and fresh, the tracks are read from the mirror. If the playlist cache is
+    enabled, the tracks are only fetched when the playlist snapshot changed since they were cached.
 
-        response_tracks = _validate_tracks(response["items"])
-        if release_date_range:
-            response_tracks = [
-                track
-                for track in response_tracks
-                if release_date_range[0].date() <= track.album.release_date <= release_date_range[1].date()
+    With a `limit`, only the pages needed to collect `limit` tracks are fetched: the first pages of the playlist,
+    or the pages containing the sampled tracks.
+
+    Args:
+        playlist_id: The uri of the playlist.
+        release_date_range: A date range; tracks to retrieve must have been released in this range.
+        concurrent: Fetch the pages of the playlist concurrently, on a bounded pool of workers.
+        limit: An optional maximum number of tracks to retrieve.
+        sample: If a `limit` is given, sample the tracks at random instead of taking the first ones.
+        preselect: If a `limit` is given, a function ranking the raw playlist items, given as the pages arrive.
+            Only the items within the date ranges are ranked, and only the best ranked items are validated. With the
+            playlist cache enabled, the whole playlist is validated and cached, and the items of its valid tracks are
+            ranked. A playlist read from the cache or the mirror has no raw items: it is returned whole.
+        use_mirror: Read the tracks from the library mirror, if it is enabled.
+        added_at_range: A date range; tracks to retrieve must have been added to the playlist in this range.
+
+    Returns:
+        A list of track uuids.
+    """
+    # URIs and ids of a playlist are read from the same cache and mirror entries.
+    playlist_id = playlist_id_from_uri(playlist_id)
+    read_ahead = constants.MAX_WORKERS if concurrent else 0
+    if limit is None:
+        return list(iter_playlist_tracks(playlist_id, release_date_range, read_ahead, use_mirror, added_at_range))
+    if preselect is not None:
+        snapshot_id, index = _read_cached_playlist(playlist_id, use_mirror=use_mirror)
+        if index is not None:
+            return index.query(release_date_range, added_at_range)
+        if snapshot_id is not None:
+            # The whole playlist is validated to be cached, so only the items of valid tracks are ranked.
+            validated = [
+                (item, track)
+                for item, track in itertools.chain.from_iterable(
+                    _fetch_playlist_items(playlist_id, snapshot_id, read_ahead)
+                )
+                if _in_date_ranges(track, release_date_range, added_at_range)
             ]
-        tracks.extend(response_tracks)
+            tracks = {id(item): track for item, track in validated}
+            return [tracks[id(item)] for item in preselect(item for item, _ in validated)[:limit]]
+        with closing(_iter_playlist_pages(playlist_id, read_ahead)) as pages:
+            # Items out of the date ranges are dropped before the ranking, which may keep a bounded number of items.
+            items = preselect(
+                item
+                for item in itertools.chain.from_iterable(pages)
+                if _raw_item_in_date_ranges(item, release_date_range, added_at_range)
+            )
+        return _validate_preselected_items(items, limit, release_date_range, added_at_range)
+    if not sample:
+        # The iteration stops once `limit` tracks are collected, a single page is fetched in advance.
+        tracks = iter_playlist_tracks(playlist_id, release_date_range, min(read_ahead, 1), use_mirror, added_at_range)
+        return list(itertools.islice(tracks, limit))
+
+    _, index = _read_cached_playlist(playlist_id, use_mirror=use_mirror)
+    if index is not None:
+        tracks = index.query(release_date_range, added_at_range)
+        return get_rng().sample(tracks, min(limit, len(tracks)))
+    return _sample_playlist_tracks(playlist_id, limit, release_date_range, added_at_range)
+
+
+def sync_library(mirror: LibraryMirror, full: bool = False) -> list[PlaylistData]:
+    """Synchronize the library mirror with the user playlists.
+
+    Only the playlists whose snapshot changed since their last synchronization are fetched, concurrently. Playlists
+    which are no longer in the library are removed from the mirror. If a playlist can't be fetched, the error is
+    logged, its mirrored tracks are no longer read, and the playlist will be fetched again at the next
+    synchronization.
 
-        if len(response["items"]) == 0:
-            break
-    return tracks
+    Args:
+        mirror: The library mirror to synchronize.
+        full: Fetch every playlist, even if its snapshot did not change.
+
+    Returns:
+        The synchronized playlists.
+    """
+    items = _get_user_playlists_items()
+    mirror.set_playlists([_read_playlist(item) for item in items])
+    snapshots = {} if full else mirror.snapshots()
+    outdated = [
+        item for item in items if not item.get("snapshot_id") or snapshots.get(item["id"]) != item["snapshot_id"]
+    ]
+
+    def _sync(item: dict[str, Any]) -> PlaylistData | None:
+        try:
+            tracks = [track for page in _iter_playlist_pages(item["id"]) for track in _validate_tracks(page)]
+        except Exception as exc:
+            logger.error(f"Couldn't synchronize playlist {item['name']}: {exc}")
+            # The mirrored tracks are outdated: they are not read until the playlist is synchronized.
+            mirror.invalidate(item["id"])
+            return None
+        mirror.set_tracks(item["id"], item.get("snapshot_id"), tracks)
+        return _read_playlist(item)
+
+    with ThreadPoolExecutor(max_workers=constants.MAX_WORKERS) as executor:
+        synced = [playlist for playlist in executor.map(_sync, outdated) if playlist]
+    mirror.mark_synced()
+    get_user_playlists.cache_clear()
+    return synced
 
 
 def create_user_playlist(user_id: str, name: str, description: str = "Playlist created with Chopin") -> PlaylistData:
@@ -202,8 +699,12 @@ def create_user_playlist(user_id: str, name: str, description: str = "Playlist c
     Returns:
         Created playlist data.
     """
-    playlist = _client.user_playlist_create(user=user_id, name=name, description=description)
-    return PlaylistData(name=playlist["name"], uri=playlist["uri"], id=playlist["id"])
+    response = _client.user_playlist_create(user=user_id, name=name, description=description)
+    playlist = PlaylistData(name=response["name"], uri=response["uri"], id=response["id"])
+    if mirror := get_library_mirror():
+        mirror.add_playlist(_read_playlist(response))
+    get_user_playlists.cache_clear()
+    return playlist
 
 
 def add_tracks_to_playlist(playlist_id: str, track_ids: list[str]) -> None:
@@ -216,21 +717,32 @@ def add_tracks_to_playlist(playlist_id: str, track_ids: list[str]) -> None:
     paginated_tracks = [track_ids[i : i + 99] for i in range(0, len(track_ids), 99)]
     for page_tracks in paginated_tracks:
         _client.playlist_add_items(playlist_id, page_tracks)
+    if paginated_tracks and (mirror := get_library_mirror()):
+        mirror.invalidate(playlist_id)
 
 
 def replace_tracks_in_playlist(playlist_id: str, track_ids: list[str]) -> None:
     """Replace tracks in a given playlist.
 
+    The current and target content of the playlist are compared, so that the fewest write calls are made:
+
+    - if the playlist already has the target tracks, nothing is written;
+    - if the target tracks only add tracks at the end of the playlist, the missing tracks are appended;
+    - otherwise, the first 100 target tracks replace the playlist content, and the remaining ones are appended.
+
     Args:
         playlist_id: URI of the target playlist. All of its tracks will be removed!
         track_ids: New tracks to add in the playlist.
     """
-    tracks_to_remove = get_playlist_tracks(playlist_id)
-    tracks_to_remove_ids = [track.id for track in tracks_to_remove]
-    paginated_tracks = [tracks_to_remove_ids[i : i + 99] for i in range(0, len(tracks_to_remove_ids), 99)]
-    for page_tracks in paginated_tracks:
-        _client.playlist_remove_all_occurrences_of_items(playlist_id, page_tracks)
-    add_tracks_to_playlist(playlist_id, track_ids)
+    # The mirror may be outdated: the playlist is compared with its actual content.
+    current_ids = [track.id for track in get_playlist_tracks(playlist_id, use_mirror=False)]
+    if current_ids == track_ids[: len(current_ids)]:
+        add_tracks_to_playlist(playlist_id, track_ids[len(current_ids) :])
+        return
+    _client.playlist_replace_items(playlist_id, track_ids[: constants.SPOTIFY_PLAYLIST_ITEMS_LIMIT])
+    add_tracks_to_playlist(playlist_id, track_ids[constants.SPOTIFY_PLAYLIST_ITEMS_LIMIT :])
+    if mirror := get_library_mirror():
+        mirror.invalidate(playlist_id)
 
 
 def like_tracks(track_uris: list[str]) -> None:
@@ -253,23 +765,81 @@ def get_current_user() -> UserData:
     return UserData(name=user["display_name"], id=user["id"], uri=user["uri"])
 
 
+@singleflight
+def _get_saved_tracks_page(offset: int) -> dict[str, Any]:
+    """Fetch a single page of the user liked tracks, starting at `offset`."""
+    return _client.current_user_saved_tracks(limit=constants.SPOTIFY_SAVED_TRACKS_LIMIT, offset=offset)
+
+
 def get_likes() -> list[TrackData]:
     """Get user liked tracks.
 
+    If the cache is enabled, the liked tracks are read through the likes store: only the tracks liked since the last
+    synchronization are fetched.
+
     Returns:
-        The liked tracks.
+        The liked tracks, most recently liked first.
     """
+    store = get_likes_store()
+    if store is not None:
+        return sync_likes(store)
     offset = 0
     tracks = []
     while True:
-        response = _client.current_user_saved_tracks(limit=20, offset=offset)
+        response = _get_saved_tracks_page(offset)
         tracks.extend(response.get("items"))
-        offset += 20
+        offset += constants.SPOTIFY_SAVED_TRACKS_LIMIT
         if not response.get("next"):
             break
     return [TrackData(**track["track"]) for track in tracks]
 
 
+def _read_likes(items: list[dict[str, Any]]) -> list[tuple[str, TrackData]]:
+    """Validate liked items, and pair each track with the raw `added_at` of the item."""
+    return [(item["added_at"], track) for item, track in _validate_items(items)]
+
+
+def sync_likes(store: LikesStore, full: bool = False) -> list[TrackData]:
+    """Synchronize the user liked tracks with a local store, and get them.
+
+    Spotify sends the liked tracks from the most recently liked one. An incremental synchronization only fetches
+    the pages of tracks liked after the store watermark, the most recent `added_at` it knows of.
+
+    A full synchronization fetches the whole library concurrently, and removes the tracks which are no longer liked.
+    It runs on the first synchronization, and periodically to reconcile the store with the library.
+
+    Args:
+        store: The local store of liked tracks.
+        full: Force a full synchronization.
+
+    Returns:
+        The liked tracks, most recently liked first.
+    """
+    last_full_sync = store.last_full_sync
+    if full or last_full_sync is None or time.time() - last_full_sync > constants.LIKES_RECONCILE_PERIOD:
+        response = _get_saved_tracks_page(offset=0)
+        # Pages are shared by the coalesced calls: they are copied before being extended.
+        items = list(response["items"])
+        offsets = range(len(items), response.get("total", 0), constants.SPOTIFY_SAVED_TRACKS_LIMIT)
+        with ThreadPoolExecutor(max_workers=constants.MAX_WORKERS) as executor:
+            for page in executor.map(_get_saved_tracks_page, offsets):
+                items.extend(page["items"])
+        store.replace(_read_likes(items))
+        return store.tracks()
+
+    watermark = store.watermark or ""
+    offset = 0
+    while True:
+        response = _get_saved_tracks_page(offset)
+        # Tracks liked at the watermark itself are fetched again, and deduplicated by the store.
+        new_items = [item for item in response["items"] if item["added_at"] >= watermark]
+        store.add(_read_likes(new_items))
+        offset += len(response["items"])
+        if len(new_items) < len(response["items"]) or not response.get("next"):
+            break
+    return store.tracks()
+
+
 def get_top_tracks(time_range: Literal["short_term", "medium_term", "long_term"], limit: int) -> list[TrackData]:
     """Get top tracks for the current user.
 
@@ -314,6 +884,22 @@ def get_top_artists(time_range: Literal["short_term", "medium_term", "long_term"
     return [ArtistData(**artist) for artist in response]
 
 
+@singleflight
+def _get_album_tracks_page(album_id: str, offset: int) -> dict[str, Any]:
+    """Fetch a single page of an album tracks, starting at `offset`."""
+    return _client.album_tracks(album_id=album_id, limit=constants.SPOTIFY_ALBUM_TRACKS_LIMIT, offset=offset)
+
+
+def _read_album_tracks(album_id: str, page: dict[str, Any]) -> list[TrackData]:
+    """Read the tracks of an album from its first page, and fetch its remaining pages."""
+    # Pages are shared by the coalesced calls: they are copied before being extended.
+    items = list(page["items"])
+    offsets = range(len(items), page.get("total", 0), constants.SPOTIFY_ALBUM_TRACKS_LIMIT)
+    for offset in offsets:
+        items.extend(_get_album_tracks_page(album_id, offset)["items"])
+    return [TrackData(**track) for track in items]
+
+
 def get_album_tracks(album_id: str) -> list[TrackData]:
     """Get album tracks for the given album.
 
@@ -323,5 +909,39 @@ def get_album_tracks(album_id: str) -> list[TrackData]:
     Returns:
         A list of tracks from said album.
     """
-    response = _client.album_tracks(album_id=album_id)["items"]
-    return [TrackData(**track) for track in response]
+    return _read_album_tracks(album_id, _get_album_tracks_page(album_id, offset=0))
+
+
+def _get_albums_batch(album_ids: list[str]) -> dict[str, list[TrackData]]:
+    """Get the tracks of at most 20 albums, with a single call to the several albums endpoint."""
+    albums = _client.albums(album_ids)["albums"]
+    return {album["id"]: _read_album_tracks(album["id"], album["tracks"]) for album in albums if album}
+
+
+def get_albums_tracks(album_ids: list[str]) -> dict[str, list[TrackData]]:
+    """Get the tracks of several albums.
+
+    Albums are fetched by batches of 20, concurrently. If the album cache is enabled, cached albums are not fetched.
+
+    Args:
+        album_ids: The ids of the albums.
+
+    Returns:
+        A mapping from album ids to their tracks. Albums which were not found are missing.
+    """
+    album_ids = list(dict.fromkeys(album_ids))
+    cache = get_album_cache()
+    albums_tracks = cache.get_many(album_ids) if cache else {}
+
+    missing_ids = [album_id for album_id in album_ids if album_id not in albums_tracks]
+    batches = [
+        missing_ids[i : i + constants.SPOTIFY_ALBUMS_LIMIT]
+        for i in range(0, len(missing_ids), constants.SPOTIFY_ALBUMS_LIMIT)
+    ]
+    fetched_tracks: dict[str, list[TrackData]] = {}
+    with ThreadPoolExecutor(max_workers=constants.MAX_WORKERS) as executor:
+        for batch_tracks in executor.map(_get_albums_batch, batches):
+            fetched_tracks.update(batch_tracks)
+    if cache and fetched_tracks:
+        cache.set_many(fetched_tracks)
+    return albums_tracks | fetched_tracks
@@ -0,0 +1,198 @@
+"""Identity map of the tracks, albums and artists read from the Spotify API.
+
+A composition pulling from overlapping playlists reads the same tracks several times, and the tracks of an album all
+hold the same album and artists. Without an identity map, each of them is validated and allocated again.
+
+An `IdentityMap` interns the validated models by id: a track already read is not validated again, and the tracks
+share a single instance of each album and artist. The date a track was added depends on its playlist: a track read
+from another playlist is a shallow copy of the interned track, with its own `added_at` date.
+
+The map is used during a run, like a composition, with `interning`, or for the whole process with
+`enable_identity_map`.
+
+!!! warning
+    Interned models are shared: they must not be modified.
+"""
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import TypeAdapter
+
+from chopin.schemas.album import AlbumData
+from chopin.schemas.artist import ArtistData
+from chopin.schemas.track import FormattedDate, TrackData
+from chopin.tools.logger import get_logger
+
+logger = get_logger(__name__)
+
+_ADDED_AT_ADAPTER = TypeAdapter(FormattedDate)
+
+
+@dataclass
+class InterningStats:
+    """Counters of an identity map, for a kind of model.
+
+    Attributes:
+        hits: Number of models read which were already interned.
+        misses: Number of models read for the first time.
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of the models read which were already interned."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class IdentityMap:
+    """Tracks, albums and artists, interned by id.
+
+    Attributes:
+        tracks: Counters of the tracks. A hit is a track which was not validated again.
+        albums: Counters of the albums of the validated tracks. A hit is an album which was not allocated again.
+        artists: Counters of the artists of the validated tracks. A hit is an artist which was not allocated again.
+    """
+
+    def __init__(self):
+        """Create an empty map."""
+        self.tracks = InterningStats()
+        self.albums = InterningStats()
+        self.artists = InterningStats()
+        # Interned tracks, with the raw `added_at` date they were read with.
+        self._tracks: dict[str, tuple[Any, TrackData]] = {}
+        self._albums: dict[str, AlbumData] = {}
+        self._artists: dict[str, ArtistData] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of interned tracks."""
+        return len(self._tracks)
+
+    @staticmethod
+    def _with_added_at(payload: dict[str, Any], added_at: Any, track: TrackData) -> TrackData:
+        """The interned track, as read from a playlist it was added to at the payload date."""
+        if payload.get("added_at") == added_at:
+            return track
+        # Only the date is validated: the copy shares the fields of the interned track.
+        return track.model_copy(update={"added_at": _ADDED_AT_ADAPTER.validate_python(payload.get("added_at"))})
+
+    def lookup(self, payload: dict[str, Any]) -> TrackData | None:
+        """Get the interned track of a track payload, if it was already read.
+
+        Args:
+            payload: A track, as received from the Spotify API, with the date it was added to its playlist.
+
+        Returns:
+            The interned track, or a copy of it with the payload `added_at` date if it was added at another date.
+            None if it was not read yet.
+        """
+        with self._lock:
+            interned = self._tracks.get(payload.get("id")) if payload.get("id") else None
+            if interned is None:
+                return None
+            self.tracks.hits += 1
+        return self._with_added_at(payload, *interned)
+
+    def _intern(self, interned: dict, stats: InterningStats, model: AlbumData | ArtistData) -> Any:
+        if model.id in interned:
+            stats.hits += 1
+            return interned[model.id]
+        stats.misses += 1
+        interned[model.id] = model
+        return model
+
+    def intern(self, payload: dict[str, Any], track: TrackData) -> TrackData:
+        """Intern a track validated from its payload, along with its album and artists.
+
+        Args:
+            payload: The track, as received from the Spotify API.
+            track: The track validated from the payload.
+
+        Returns:
+            The interned track. If the track was interned in the meantime, the interned one, with the payload
+            `added_at` date.
+        """
+        with self._lock:
+            track_id = payload.get("id")
+            interned = self._tracks.get(track_id) if track_id else None
+            if interned is None:
+                self.tracks.misses += 1
+                if track.album:
+                    track.album = self._intern(self._albums, self.albums, track.album)
+                if track.artists:
+                    track.artists = [self._intern(self._artists, self.artists, artist) for artist in track.artists]
+                if track_id:
+                    self._tracks[track_id] = (payload.get("added_at"), track)
+                return track
+            self.tracks.hits += 1
+        return self._with_added_at(payload, *interned)
+
+    def report(self) -> str:
+        """Describe the hit rates of the map."""
+        return ", ".join(
+            f"{kind}: {stats.hit_rate:.0%} hits out of {stats.hits + stats.misses} reads"
+            for kind, stats in (("tracks", self.tracks), ("albums", self.albums), ("artists", self.artists))
+        )
+
+    def clear(self) -> None:
+        """Remove every interned model, and reset the counters."""
+        with self._lock:
+            self._tracks.clear()
+            self._albums.clear()
+            self._artists.clear()
+            self.tracks, self.albums, self.artists = InterningStats(), InterningStats(), InterningStats()
+
+
+_IDENTITY_MAP: IdentityMap | None = None
+_RUN_IDENTITY_MAP: ContextVar[IdentityMap | None] = ContextVar("chopin_identity_map", default=None)
+
+
+def enable_identity_map() -> None:
+    """Intern the tracks, albums and artists read by the endpoints, for the whole process."""
+    global _IDENTITY_MAP
+    _IDENTITY_MAP = IdentityMap()
+
+
+def disable_identity_map() -> None:
+    """Stop interning the tracks, albums and artists read by the endpoints, for the whole process."""
+    global _IDENTITY_MAP
+    _IDENTITY_MAP = None
+
+
+def get_identity_map() -> IdentityMap | None:
+    """Get the identity map in use, if any: the map of the running `interning` block, or the process-wide map."""
+    identity_map = _RUN_IDENTITY_MAP.get()
+    return identity_map if identity_map is not None else _IDENTITY_MAP
+
+
+@contextmanager
+def interning() -> Iterator[IdentityMap]:
+    """Run a block of code, like a composition, with an identity map.
+
+    The map is held in a context variable, so runs going on concurrently each use their own map. Worker threads
+    started within the block only share its map if they run in a copy of its context, with
+    `contextvars.copy_context().run`. If the map is enabled for the whole process, or a block is already running, its
+    map is used. Otherwise, a new map is used for the block, and its hit rates are logged at the end of the block.
+
+    Yields:
+        The identity map in use.
+    """
+    identity_map = get_identity_map()
+    if identity_map is not None:
+        yield identity_map
+        return
+    identity_map = IdentityMap()
+    token = _RUN_IDENTITY_MAP.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _RUN_IDENTITY_MAP.reset(token)
+        logger.info(f"Identity map: {identity_map.report()}")
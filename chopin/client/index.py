@@ -0,0 +1,126 @@
+"""In-memory indexes over the tracks of cached and mirrored playlists.
+
+Reading a playlist from the cache or the mirror gives all its tracks, which are then filtered on their release date
+or on the date they were added. A `TrackIndex` keeps the tracks sorted on both dates, so a date range is answered
+with a binary search instead of a scan of the playlist. The tracks are stored in a `TrackTable`, and the index is
+built from its date columns: only the tracks within the ranges are read back as `TrackData`.
+
+Indexes are kept in memory for the most recently read playlists, along with the version of the playlist they were
+built from: the snapshot of a cached playlist, or the synchronization of a mirrored one. A playlist read again at the
+same version is neither read from disk nor validated again.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+
+from chopin.constants import constants
+from chopin.schemas.table import TrackTable
+from chopin.schemas.track import TrackData
+from chopin.tools.dates import ReleaseRange, as_date
+
+
+def _sorted_index(ordinals: array) -> tuple[array, array]:
+    """Sort the positions of the tracks on a date, as a day number. Tracks without a date are left out of the index."""
+    positions = sorted((position for position, ordinal in enumerate(ordinals) if ordinal), key=ordinals.__getitem__)
+    return array("l", [ordinals[position] for position in positions]), array("l", positions)
+
+
+class TrackIndex:
+    """Tracks of a playlist, indexed on their release date and on the date they were added to the playlist.
+
+    Attributes:
+        tracks: The indexed tracks, in the playlist order.
+    """
+
+    def __init__(self, tracks: Iterable[TrackData]):
+        """Store the tracks in a table, and sort them on their release date and on the date they were added."""
+        self.tracks = TrackTable(tracks)
+        self._release_dates, self._release_positions = _sorted_index(self.tracks.release_ordinals())
+        self._added_dates, self._added_positions = _sorted_index(self.tracks.added_ordinals)
+
+    def __len__(self) -> int:
+        """Number of indexed tracks."""
+        return len(self.tracks)
+
+    @staticmethod
+    def _positions(dates: array, positions: array, date_range: ReleaseRange) -> array:
+        start, end = as_date(date_range[0]).toordinal(), as_date(date_range[1]).toordinal()
+        return positions[bisect_left(dates, start) : bisect_right(dates, end)]
+
+    def query(
+        self, release_date_range: ReleaseRange | None = None, added_at_range: ReleaseRange | None = None
+    ) -> list[TrackData]:
+        """Get the tracks within the date ranges. Bounds are included.
+
+        Args:
+            release_date_range: A date range; tracks must have been released in this range.
+            added_at_range: A date range; tracks must have been added to the playlist in this range.
+
+        Returns:
+            The tracks within both ranges, in the playlist order. Without a range, all the tracks.
+        """
+        selected: set[int] | None = None
+        for dates, positions, date_range in (
+            (self._release_dates, self._release_positions, release_date_range),
+            (self._added_dates, self._added_positions, added_at_range),
+        ):
+            if date_range:
+                matched = self._positions(dates, positions, date_range)
+                selected = set(matched) if selected is None else selected.intersection(matched)
+        if selected is None:
+            return self.tracks.to_tracks()
+        return [self.tracks[position] for position in sorted(selected)]
+
+
+class TrackIndexCache:
+    """Least recently used indexes, by playlist and version.
+
+    Attributes:
+        max_size: Maximum number of indexes kept in memory.
+    """
+
+    def __init__(self, max_size: int = constants.TRACK_INDEX_CACHE_SIZE):
+        """Create an empty cache."""
+        self.max_size = max_size
+        self._indexes: OrderedDict[tuple[str, Hashable], TrackIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self, playlist_id: str, version: Hashable, load: Callable[[], Iterable[TrackData] | None]
+    ) -> TrackIndex | None:
+        """Get the index of a playlist at a version, and build it from the loaded tracks if it is not kept yet.
+
+        Args:
+            playlist_id: Id of the playlist.
+            version: Version of the playlist, like its snapshot.
+            load: A function reading the tracks of the playlist at this version, or None if they are not available. The
+                tracks can be read one at a time: they are stored in the index as they are read.
+
+        Returns:
+            The index of the playlist tracks, or None if they are not available.
+        """
+        key = (playlist_id, version)
+        with self._lock:
+            if key in self._indexes:
+                self._indexes.move_to_end(key)
+                return self._indexes[key]
+        tracks = load()
+        if tracks is None:
+            return None
+        index = TrackIndex(tracks)
+        with self._lock:
+            # Older versions of the playlist will not be read again.
+            for stale in [other for other in self._indexes if other[0] == playlist_id]:
+                del self._indexes[stale]
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_size:
+                self._indexes.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        """Remove every index."""
+        with self._lock:
+            self._indexes.clear()
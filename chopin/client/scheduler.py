@@ -0,0 +1,186 @@
+"""Rate-limit aware scheduling of the Spotify API calls.
+
+Every call to the Spotify API goes through a single `RequestScheduler`, shared by all the threads of the process:
+
+- a token bucket limits the rate of requests;
+- a concurrency limit bounds the number of requests in flight. It is halved when Spotify throttles the client,
+  and slowly raised back as calls succeed;
+- throttled calls (HTTP 429) are retried once the `Retry-After` delay sent by Spotify has passed. The delay
+  applies to every call of the process, not only to the throttled one.
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from chopin.constants import constants
+from chopin.tools.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class SchedulerStats:
+    """Counters of the scheduled calls.
+
+    Attributes:
+        calls: Number of calls sent to the Spotify API, retries included.
+        throttled: Number of calls throttled by Spotify (HTTP 429).
+        retried: Number of calls retried after being throttled.
+        concurrency: Current limit of calls in flight.
+    """
+
+    calls: int = 0
+    throttled: int = 0
+    retried: int = 0
+    concurrency: int = 0
+
+
+class RequestScheduler:
+    """Schedule calls to the Spotify API under a rate limit and an adaptive concurrency limit.
+
+    Attributes:
+        rate: Sustained number of calls per second.
+        burst: Maximum number of calls sent at once after an idle period.
+        max_concurrency: Upper bound of the concurrency limit.
+        max_retries: Maximum number of retries of a throttled call.
+    """
+
+    def __init__(
+        self,
+        rate: float = constants.SPOTIFY_RATE_LIMIT,
+        burst: int = constants.SPOTIFY_RATE_LIMIT,
+        max_concurrency: int = constants.MAX_WORKERS,
+        max_retries: int = constants.SPOTIFY_MAX_RETRIES,
+    ):
+        """Create a scheduler, with its token bucket full."""
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._successes = 0
+        self._stats = SchedulerStats(concurrency=max_concurrency)
+
+    @property
+    def stats(self) -> SchedulerStats:
+        """A copy of the current counters."""
+        with self._lock:
+            return SchedulerStats(**vars(self._stats))
+
+    def _acquire_slot(self) -> None:
+        with self._slots:
+            while self._in_flight >= self._stats.concurrency:
+                self._slots.wait()
+            self._in_flight += 1
+
+    def _release_slot(self) -> None:
+        with self._slots:
+            self._in_flight -= 1
+            self._slots.notify_all()
+
+    def _acquire_token(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                wait = max(self._blocked_until - now, 0.0)
+                if not wait and self._tokens >= 1:
+                    self._tokens -= 1
+                    self._stats.calls += 1
+                    return
+                wait = wait or (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def _on_success(self) -> None:
+        with self._slots:
+            self._successes += 1
+            if self._successes >= self._stats.concurrency and self._stats.concurrency < self.max_concurrency:
+                self._successes = 0
+                self._stats.concurrency += 1
+                self._slots.notify_all()
+
+    def _on_throttled(self, retry_after: float) -> None:
+        with self._slots:
+            self._stats.throttled += 1
+            self._successes = 0
+            self._stats.concurrency = max(1, self._stats.concurrency // 2)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Call `fn` once the scheduler allows it, and retry it if Spotify throttles it.
+
+        Args:
+            fn: A function sending a request to the Spotify API.
+            args: Positional arguments for `fn`.
+            kwargs: Keyword arguments for `fn`.
+
+        Returns:
+            The result of `fn`.
+
+        Raises:
+            SpotifyException: if the call failed for another reason than throttling, or was throttled more than
+                `max_retries` times.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._acquire_slot()
+            try:
+                self._acquire_token()
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                # spotipy raises a SpotifyException, with the status and headers of the HTTP response.
+                if getattr(exc, "http_status", None) != 429 or attempt == self.max_retries:
+                    raise
+                retry_after = float((getattr(exc, "headers", None) or {}).get("Retry-After", 1))
+                logger.warning(f"Throttled by the Spotify API, retrying in {retry_after} seconds.")
+                self._on_throttled(retry_after)
+            else:
+                self._on_success()
+                return result
+            finally:
+                self._release_slot()
+            with self._lock:
+                self._stats.retried += 1
+
+
+class ScheduledClient:
+    """Proxy to a spotipy client. Its API calls go through a request scheduler.
+
+    The spotipy client is only created on the first API call.
+
+    Attributes:
+        client_factory: A function creating the spotipy client.
+        scheduler: The scheduler of the client calls.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], scheduler: RequestScheduler):
+        """Wrap the spotipy client created by `client_factory`."""
+        self.client_factory = client_factory
+        self.scheduler = scheduler
+
+    @property
+    def client(self) -> Any:
+        """The spotipy client, created on first access."""
+        return self.client_factory()
+
+    def __getattr__(self, name: str) -> Callable:
+        """Get a method of the spotipy client. Calls to the method are scheduled."""
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def scheduled(*args, **kwargs):
+            return self.scheduler.call(getattr(self.client, name), *args, **kwargs)
+
+        scheduled.__name__ = name
+        return scheduled
@@ -1,9 +1,20 @@
-"""Create the spotipy auth and client."""
+"""Create the spotipy auth and client.
+
+The client is created on the first call to the Spotify API, so chopin can be imported, and its commands described,
+without Spotify credentials.
+"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-import spotipy
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from spotipy.oauth2 import SpotifyOAuth
+
+from chopin.client.scheduler import RequestScheduler, ScheduledClient
+
+if TYPE_CHECKING:
+    import requests
+    import spotipy
 
 
 class SpotifyConfig(BaseSettings):
@@ -19,19 +30,63 @@ class SpotifyConfig(BaseSettings):
     requests_timeout: float = 20.0
 
 
-class Settings(BaseSettings):
-    """Valohai library settings pydantic model."""
+def _requests_session(retries: int = 3, backoff_factor: float = 0.3) -> "requests.Session":
+    """Create the HTTP session of the spotipy client.
+
+    Server errors are retried by the session. Throttled calls (429) are not: urllib3 would retry them when they have a
+    Retry-After header, while holding a slot of the request scheduler, and then raise an error without the header.
+    They are raised to the request scheduler instead, which blocks every call for the Retry-After delay.
+
+    Args:
+        retries: Maximum number of retries of a call failing with a server error.
+        backoff_factor: Backoff factor between the retries, in seconds.
+
+    Returns:
+        The HTTP session.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(500, 502, 503, 504),
+        respect_retry_after_header=False,
+        # The last error response is raised by spotipy with its own status, rather than as a "Max Retries" 429.
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@lru_cache
+def get_spotify_client() -> "spotipy.Spotify":
+    """Read the Spotify settings, and create the spotipy client.
+
+    Returns:
+        The spotipy client.
+    """
+    import spotipy
+    from spotipy.oauth2 import SpotifyOAuth
 
-    config: SpotifyConfig = SpotifyConfig()
-    client: spotipy.Spotify = spotipy.Spotify(
+    config = SpotifyConfig()
+    return spotipy.Spotify(
         auth_manager=SpotifyOAuth(
             client_id=config.client_id.get_secret_value(),
             client_secret=config.client_secret.get_secret_value(),
             redirect_uri=config.redirect_uri,
             scope=config.scope,
-        )
+        ),
+        requests_session=_requests_session(),
     )
 
 
-spotify_settings = Settings()
-_client = spotify_settings.client
+_client = ScheduledClient(get_spotify_client, scheduler=RequestScheduler())
@@ -24,6 +24,8 @@ class ConstantsNamespace:
     """Constants namespace for chopin."""
 
     DEFAULT_DATA_DIR = Path("data/")
+    CACHE_PATH = DEFAULT_DATA_DIR / "cache.sqlite"
+    CACHE_MAX_SIZE_BYTES = 256 * 1024 * 1024
     QUEUED_MIX = PlaylistNamedTuple(
         name="🔮 Musique à suivre",
         description="Auto-generated playlist, from the user's queue.",
@@ -37,6 +39,25 @@ class ConstantsNamespace:
     SPOTIFY_USER_URI = "spotify:user:spotify"
     SPOTIFY_API_HISTORY_LIMIT = 50
     SPOTIFY_RECOMMENDATION_SEED_LIMIT = 5
+    SPOTIFY_PLAYLIST_ITEMS_LIMIT = 100
+    SPOTIFY_USER_PLAYLISTS_LIMIT = 50
+    SPOTIFY_SAVED_TRACKS_LIMIT = 50
+    SPOTIFY_ALBUMS_LIMIT = 20
+    SPOTIFY_ALBUM_TRACKS_LIMIT = 50
+    LIKES_RECONCILE_PERIOD = 7 * 24 * 3600
+    USER_PLAYLISTS_TTL = 300
+    MIRROR_PATH = DEFAULT_DATA_DIR / "library.sqlite"
+    MIRROR_MAX_STALENESS = 24 * 3600
+    MIRROR_READ_CHUNK = 500
+    TRACK_INDEX_CACHE_SIZE = 64
+    COMPOSITION_BACKFILL_RATIO = 0.5
+    PRESELECTION_FACTOR = 2
+    MAX_WORKERS = 8
+    SPOTIFY_RATE_LIMIT = 10
+    SPOTIFY_MAX_RETRIES = 5
+    SPOTIFY_CALL_LATENCY = 0.3
+    SPOTIFY_PLAYLIST_ITEM_BYTES = 800
+    SPOTIFY_TRACK_BYTES = 3000
     MARKET = "fr"
     MAX_RELATED_ARTISTS = 10
     MAX_TOP_TRACKS_ARTISTS = 10
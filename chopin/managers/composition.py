@@ -1,88 +1,204 @@
 """Manage composition."""
 
-import itertools
+import math
 import random
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from datetime import date
 
 from chopin.client.endpoints import (
     get_top_tracks,
     get_user_playlists,
 )
+from chopin.client.identity import interning
+from chopin.constants import constants
 from chopin.managers.playlist import (
     tracks_from_playlist_name,
     tracks_from_playlist_uri,
 )
-from chopin.schemas.composer import ComposerConfig, ComposerConfigItem
+from chopin.managers.selection import track_groups
+from chopin.schemas.composer import ComposerConfig, ComposerConfigItem, ComposerConfigListeningHistory
+from chopin.schemas.selection import SelectionLimits
 from chopin.schemas.track import TrackData
+from chopin.tools.dates import dated, get_reference_date
 from chopin.tools.logger import get_logger
+from chopin.tools.randomness import get_rng, seeded
 
 logger = get_logger(__name__)
 
 
-# todo: logging decorator
-def _add_from_playlists(
-    playlists: list[ComposerConfigItem], release_range: tuple[date] | None = None, **kwargs
-) -> list[TrackData]:
-    """Add tracks from each playlist."""
-    tracks = [
-        tracks_from_playlist_name(
-            playlist_name=playlist.name,
-            nb_tracks=playlist.nb_songs,
-            release_range=release_range,
-            user_playlists=get_user_playlists(),
-            selection_method=playlist.selection_method,
-        )
-        for playlist in playlists
-    ]
-    return list(itertools.chain(*tracks))
-
+def nb_candidates(nb_songs: int) -> int:
+    """Number of candidate tracks retrieved for an item of `nb_songs` tracks.
 
-def _add_from_history(history_ranges: list[ComposerConfigItem], **kwargs) -> list[TrackData]:
-    tracks = [get_top_tracks(time_range=history.time_range, limit=history.nb_songs) for history in history_ranges]
-    return list(itertools.chain(*tracks))
+    Candidates past the item quota backfill the tracks already picked by another item of the composition.
+    """
+    return math.ceil(nb_songs * (1 + constants.COMPOSITION_BACKFILL_RATIO))
 
 
-def _add_from_uris(
-    uris: list[ComposerConfigItem], release_range: tuple[date] | None = None, **kwargs
+def _add_from_playlist(
+    playlist: ComposerConfigItem,
+    nb_tracks: int,
+    release_range: tuple[date] | None = None,
+    added_at_range: tuple[date] | None = None,
 ) -> list[TrackData]:
-    tracks = [
-        tracks_from_playlist_uri(
-            playlist_uri=uri.name,
-            nb_tracks=uri.nb_songs,
-            release_range=release_range,
-            selection_method=uri.selection_method,
-        )
-        for uri in uris
-    ]
-    return list(itertools.chain(*tracks))
+    """Add tracks from a playlist of the user library."""
+    return tracks_from_playlist_name(
+        playlist_name=playlist.name,
+        nb_tracks=nb_tracks,
+        release_range=release_range,
+        added_at_range=added_at_range,
+        user_playlists=get_user_playlists(),
+        selection_method=playlist.selection_method,
+        selection_weights=playlist.selection_weights,
+        selection_limits=playlist.selection_limits,
+    )
+
+
+def _add_from_history(history: ComposerConfigListeningHistory, nb_tracks: int, **kwargs) -> list[TrackData]:
+    """Add tracks from the user listening history."""
+    return get_top_tracks(time_range=history.time_range, limit=min(nb_tracks, constants.SPOTIFY_API_HISTORY_LIMIT))
+
+
+def _add_from_uri(
+    uri: ComposerConfigItem,
+    nb_tracks: int,
+    release_range: tuple[date] | None = None,
+    added_at_range: tuple[date] | None = None,
+) -> list[TrackData]:
+    """Add tracks from a playlist uri."""
+    return tracks_from_playlist_uri(
+        playlist_uri=uri.name,
+        nb_tracks=nb_tracks,
+        release_range=release_range,
+        added_at_range=added_at_range,
+        selection_method=uri.selection_method,
+        selection_weights=uri.selection_weights,
+        selection_limits=uri.selection_limits,
+    )
 
 
 DISPATCHER: dict[str, callable] = {
-    "playlists": _add_from_playlists,
+    "playlists": _add_from_playlist,
     "history": _add_from_history,
-    "uris": _add_from_uris,
+    "uris": _add_from_uri,
 }
 
 
-def compose_playlist(composition_config: ComposerConfig) -> list[TrackData]:
+def _add_from_item(
+    source: str,
+    item: ComposerConfigItem | ComposerConfigListeningHistory,
+    seed: int,
+    release_range: tuple[date] | None = None,
+    added_at_range: tuple[date] | None = None,
+) -> list[TrackData]:
+    """Get the candidate tracks of a single item of the configuration, with its own random generator.
+
+    Errors are isolated: if the tracks of the item can't be retrieved, the error is logged and the item adds no
+    tracks to the composition.
+
+    Returns:
+        The candidate tracks of the item, best candidates first.
+    """
+    with seeded(seed):
+        try:
+            return DISPATCHER[source](
+                item,
+                nb_tracks=nb_candidates(item.nb_songs),
+                release_range=release_range,
+                added_at_range=added_at_range,
+            )
+        except Exception as exc:
+            logger.error(f"Couldn't add tracks from {source} item {getattr(item, 'name', item)}: {exc}")
+            return []
+
+
+def _pick_unique_tracks(
+    items: list[ComposerConfigItem | ComposerConfigListeningHistory],
+    candidates: list[list[TrackData]],
+    limits: SelectionLimits | None = None,
+) -> list[TrackData]:
+    """Pick the tracks of each item, without duplicates across the composition.
+
+    Items are handled in the configuration order. Each item takes its best candidates which were not picked yet: a
+    track already picked by a previous item is replaced by the next candidate of the item, until its quota is met.
+    Each candidate is read once.
+
+    With limits, the counts of tracks per artist and per album are shared by the items: a candidate is skipped when
+    one of its artists, or its album, already has its maximum number of tracks in the composition.
+    """
+    limits = limits.as_dict() if limits else {}
+    counts: dict[tuple[str, str], int] = {}
+    picked_ids: set[str] = set()
+    tracks: list[TrackData] = []
+    for item, item_candidates in zip(items, candidates, strict=True):
+        nb_picked = 0
+        for track in item_candidates:
+            if nb_picked == item.nb_songs:
+                break
+            if track.id in picked_ids:
+                continue
+            groups = {group for group in track_groups(track) if group[0] in limits}
+            if all(counts.get(group, 0) < limits[group[0]] for group in groups):
+                for group in groups:
+                    counts[group] = counts.get(group, 0) + 1
+                picked_ids.add(track.id)
+                tracks.append(track)
+                nb_picked += 1
+        if nb_picked < item.nb_songs:
+            logger.info(f"Only {nb_picked} unique tracks out of {item.nb_songs} for {getattr(item, 'name', item)}")
+    return tracks
+
+
+def compose_playlist(
+    composition_config: ComposerConfig, seed: int | None = None, reference_date: date | None = None
+) -> list[TrackData]:
     """From a composition configuration, compose a playlist.
 
+    The items of the configuration are processed concurrently, on a bounded pool of workers. Each item draws its
+    random choices from its own generator, seeded from `seed`: the composition only depends on the seed, and not
+    on the order in which the items complete. The age of the tracks, weighted by recency, is computed at a single
+    reference date for the whole composition.
+
+    Tracks are unique across the composition: when items share tracks, the quota of an item is backfilled from its
+    other candidates. The same goes for the tracks over the limits of the composition, per artist or per album.
+
     Args:
         composition_config: A configuration, with playlists, artists, and/or features
             that should be used to create the playlist.
+        seed: Seed for the random choices. If None, the seed of the configuration is used and, without one, a seed is
+            drawn at random. The seed is logged, so the composition can be replayed.
+        reference_date: The date the age of the tracks is computed at. If None, today. It is logged along with the
+            seed.
 
     Returns:
-        A list of track data, the tracks to be added to your playlist. The tracks are shuffled.
-
-    Raises:
-        AttributeError: if 'playlists' are in the configuration but user_playlists is not passed.
+        A list of unique track data, the tracks to be added to your playlist. The tracks are shuffled.
     """
-    tracks: list[TrackData] = []
-
-    for source, source_config in composition_config.items:
-        if not source_config:
-            continue
-        source_tracks = DISPATCHER[source](source_config, release_range=composition_config.release_range, tracks=tracks)
-        tracks.extend(source_tracks)
+    if seed is None:
+        seed = composition_config.seed if composition_config.seed is not None else get_rng().getrandbits(64)
+    reference_date = reference_date or get_reference_date()
+    logger.info(f"Composing {composition_config.name} with seed {seed}, on {reference_date.isoformat()}")
+    rng = random.Random(seed)
+    jobs = [
+        (source, item, rng.getrandbits(64))
+        for source, source_config in composition_config.items
+        for item in source_config or []
+    ]
 
-    return random.sample(tracks, len(tracks))
+    # Items pulling from overlapping playlists share the tracks they read.
+    with interning(), dated(reference_date), ThreadPoolExecutor(max_workers=constants.MAX_WORKERS) as executor:
+        # Each job runs in a copy of the context, which holds the identity map and the reference date of the
+        # composition.
+        futures = [
+            executor.submit(
+                copy_context().run,
+                _add_from_item,
+                *job,
+                release_range=composition_config.release_range,
+                added_at_range=composition_config.added_at_range,
+            )
+            for job in jobs
+        ]
+        candidates = [future.result() for future in futures]
+
+    tracks = _pick_unique_tracks([item for _, item, _ in jobs], candidates, composition_config.selection_limits)
+    return rng.sample(tracks, len(tracks))
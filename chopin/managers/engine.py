@@ -0,0 +1,244 @@
+"""Selection engine over pools of candidate tracks.
+
+A `CandidatePool` reads the fields the selection methods rank tracks on once, into compact arrays: popularity and
+release date, as integers. Selections then work on the positions of the candidates:
+
+- the best `nb_tracks` candidates are found with a partial selection: a bounded heap over the raw keys gives the
+  `nb_tracks`-th best key, and a single pass keeps the candidates above it. Only the selected candidates are sorted;
+- random selections sample positions, and only the sampled tracks are read.
+
+Selections can also stream their candidates, as the pages of a source arrive, and only hold `nb_tracks` of them
+at once: a bounded heap for the best candidates, a reservoir for a random sample, and the first candidates, with no
+need to read the next ones.
+"""
+
+import heapq
+import itertools
+import math
+from array import array
+from collections.abc import Callable, Iterable
+from functools import cached_property
+from operator import attrgetter
+from typing import Any, TypeVar
+
+from chopin.schemas.track import TrackData
+from chopin.tools.dates import date_ordinal
+from chopin.tools.randomness import get_rng
+
+T = TypeVar("T")
+
+
+def track_popularity(track: TrackData) -> int:
+    """Popularity of a track, 0 if it is unknown."""
+    return track.popularity or 0
+
+
+def track_release_ordinal(track: TrackData) -> int:
+    """Release date of a track, as a day number. 0 if it is unknown."""
+    return date_ordinal(track.album.release_date) if track.album else 0
+
+
+def _top_positions(keys: array, nb_tracks: int) -> list[int]:
+    """Positions of the `nb_tracks` highest keys, highest first. Equal keys are kept in the position order."""
+    if nb_tracks <= 0 or not keys:
+        return []
+    if nb_tracks < len(keys):
+        best_keys = heapq.nlargest(nb_tracks, keys)
+        threshold = best_keys[-1]
+        nb_ties = nb_tracks - sum(key > threshold for key in best_keys)
+        positions = []
+        for position, key in enumerate(keys):
+            if key > threshold:
+                positions.append(position)
+            elif key == threshold and nb_ties:
+                positions.append(position)
+                nb_ties -= 1
+    else:
+        positions = range(len(keys))
+    return sorted(positions, key=keys.__getitem__, reverse=True)
+
+
+class CandidatePool:
+    """A pool of candidate tracks to select from.
+
+    The arrays of the ranking fields are built on first use, so a pool only reads the fields its selections need.
+
+    Attributes:
+        tracks: The candidate tracks, in the source order.
+    """
+
+    def __init__(self, tracks: list[TrackData]):
+        """Wrap the candidate tracks. No field is read yet."""
+        self.tracks = tracks
+
+    def __len__(self) -> int:
+        """Number of candidates in the pool."""
+        return len(self.tracks)
+
+    @cached_property
+    def popularity(self) -> array:
+        """Popularity of the candidates."""
+        return array("i", [popularity or 0 for popularity in map(attrgetter("popularity"), self.tracks)])
+
+    @cached_property
+    def release_ordinal(self) -> array:
+        """Release date of the candidates, as a day number."""
+        albums = map(attrgetter("album"), self.tracks)
+        return array("l", [date_ordinal(album.release_date) if album else 0 for album in albums])
+
+    def _pick(self, positions: list[int]) -> list[TrackData]:
+        return [self.tracks[position] for position in positions]
+
+    def top(self, keys: array, nb_tracks: int) -> list[TrackData]:
+        """Select the candidates with the highest keys.
+
+        Candidates with the same key are selected in the source order, as a stable sort would.
+
+        Args:
+            keys: An array of keys, one per candidate.
+            nb_tracks: The number of tracks to pick.
+
+        Returns:
+            Selected tracks, highest keys first.
+        """
+        return self._pick(_top_positions(keys, nb_tracks))
+
+    def most_popular(self, nb_tracks: int) -> list[TrackData]:
+        """Select the most popular candidates."""
+        return self.top(self.popularity, nb_tracks)
+
+    def latest(self, nb_tracks: int) -> list[TrackData]:
+        """Select the most recently released candidates."""
+        return self.top(self.release_ordinal, nb_tracks)
+
+    def sample(self, nb_tracks: int) -> list[TrackData]:
+        """Select candidates at random, without replacement."""
+        return self._pick(get_rng().sample(range(len(self.tracks)), min(max(nb_tracks, 0), len(self.tracks))))
+
+    def first(self, nb_tracks: int) -> list[TrackData]:
+        """Select the first candidates, in the source order."""
+        return self.tracks[: max(nb_tracks, 0)]
+
+
+def stream_top(items: Iterable[T], nb_items: int, key: Callable[[T], Any]) -> list[T]:
+    """Select the items with the highest keys, as they arrive.
+
+    At most `nb_items` items are held at once, in a bounded heap. Items with the same key are selected in their
+    arrival order, as a stable sort would.
+
+    Args:
+        items: Candidate items, consumed once.
+        nb_items: The number of items to pick.
+        key: The key of an item.
+
+    Returns:
+        Selected items, highest keys first.
+    """
+    return heapq.nlargest(max(nb_items, 0), items, key=key)
+
+
+def stream_sample(items: Iterable[T], nb_items: int) -> list[T]:
+    """Select items at random, without replacement, as they arrive.
+
+    The items are sampled in a reservoir of `nb_items` items: each item replaces a random item of the reservoir with
+    a probability of `nb_items / seen`, so every item has the same chance to be selected.
+
+    Args:
+        items: Candidate items, consumed once.
+        nb_items: The number of items to pick.
+
+    Returns:
+        Selected items, in a random order.
+    """
+    rng = get_rng()
+    reservoir: list[T] = []
+    for seen, item in enumerate(items):
+        if seen < nb_items:
+            reservoir.append(item)
+        elif (position := rng.randrange(seen + 1)) < nb_items:
+            reservoir[position] = item
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+def stream_weighted_sample(items: Iterable[T], nb_items: int, weight: Callable[[T], float]) -> list[T]:
+    """Select items at random, without replacement, with a probability proportional to their weight.
+
+    Each item draws a random key `log(u) / weight`, with `u` uniform in `(0, 1]`, and the items with the highest
+    keys are selected with a bounded heap, in `O(n log nb_items)` (Efraimidis and Spirakis). Items with no weight
+    are only selected when the other items are not enough.
+
+    Args:
+        items: Candidate items, consumed once.
+        nb_items: The number of items to pick.
+        weight: The weight of an item, positive or null.
+
+    Returns:
+        Selected items.
+    """
+    return stream_top(items, nb_items, key=weighted_key(weight))
+
+
+def weighted_key(weight: Callable[[T], float]) -> Callable[[T], float]:
+    """Random key of an item, for a selection with a probability proportional to the item weight.
+
+    The key is `log(u) / weight`, with `u` uniform in `(0, 1]`: selecting the highest keys samples the items
+    without replacement (Efraimidis and Spirakis). Items with no weight get the lowest key.
+    """
+    rng = get_rng()
+
+    def _key(item: T) -> float:
+        item_weight = weight(item)
+        return math.log(1 - rng.random()) / item_weight if item_weight > 0 else -math.inf
+
+    return _key
+
+
+def select_with_limits(
+    items: Iterable[T],
+    nb_items: int,
+    key: Callable[[T], float],
+    groups: Callable[[T], list[tuple[str, str]]],
+    limits: dict[str, int],
+) -> list[T]:
+    """Select the items with the highest keys, with at most a number of items per group, like an artist.
+
+    The items are heapified in `O(n)`, then popped in the order of their keys: an item is selected, greedily, if
+    none of its groups is full yet. Only the popped items are ordered, in `O(log n)` each, so the pass stops as
+    soon as `nb_items` items are selected. Items with the same key are popped in their arrival order.
+
+    Args:
+        items: Candidate items.
+        nb_items: The number of items to pick.
+        key: The key of an item.
+        groups: The groups of an item, as `(kind, id)` pairs, for example `("artist", artist_id)`.
+        limits: Maximum number of items per group, by kind of group.
+
+    Returns:
+        Selected items, highest keys first.
+    """
+    heap = [(-key(item), position, item) for position, item in enumerate(items)]
+    heapq.heapify(heap)
+    counts: dict[tuple[str, str], int] = {}
+    selected: list[T] = []
+    while heap and len(selected) < nb_items:
+        _, _, item = heapq.heappop(heap)
+        item_groups = {group for group in groups(item) if group[0] in limits}
+        if all(counts.get(group, 0) < limits[group[0]] for group in item_groups):
+            for group in item_groups:
+                counts[group] = counts.get(group, 0) + 1
+            selected.append(item)
+    return selected
+
+
+def stream_first(items: Iterable[T], nb_items: int) -> list[T]:
+    """Select the first items. The next items are not read.
+
+    Args:
+        items: Candidate items.
+        nb_items: The number of items to pick.
+
+    Returns:
+        Selected items, in their arrival order.
+    """
+    return list(itertools.islice(items, max(nb_items, 0)))
@@ -0,0 +1,124 @@
+"""Plan compositions: estimate the cost of a composition before running it.
+
+The planner resolves the playlists of a composition configuration and reads their number of tracks and cache
+state. No playlist item is fetched: the number of pages, calls, bytes and the latency of each item are estimated
+from the way the composition retrieves tracks. Playlists read from a fresh library mirror cost no API call.
+"""
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from chopin.client.cache import LibraryMirror, PlaylistCache, get_library_mirror, get_playlist_cache
+from chopin.client.endpoints import get_playlist_total, get_user_playlists
+from chopin.constants import constants
+from chopin.managers.composition import nb_candidates
+from chopin.managers.selection import SelectionMethod
+from chopin.schemas.composer import ComposerConfig, ComposerConfigItem, ComposerConfigListeningHistory
+from chopin.schemas.plan import CompositionPlan, SourcePlan
+from chopin.tools.logger import get_logger
+from chopin.tools.strings import simplify_string
+
+logger = get_logger(__name__)
+
+
+def _estimate_pages(nb_tracks: int, nb_songs: int, selection_method: SelectionMethod | None) -> int:
+    """Estimate the number of pages of items fetched to select `nb_songs` tracks out of `nb_tracks`."""
+    nb_pages = max(1, math.ceil(nb_tracks / constants.SPOTIFY_PLAYLIST_ITEMS_LIMIT))
+    match selection_method:
+        case SelectionMethod.ORIGINAL:
+            return min(nb_pages, max(1, math.ceil(nb_songs / constants.SPOTIFY_PLAYLIST_ITEMS_LIMIT)))
+        case SelectionMethod.RANDOM | None:
+            # The first page, then the expected number of distinct pages holding the sampled tracks.
+            return min(nb_pages, 1 + math.ceil(nb_pages * (1 - (1 - 1 / nb_pages) ** nb_songs)))
+        case _:
+            return nb_pages
+
+
+def _plan_playlist(
+    source: str,
+    item: ComposerConfigItem,
+    playlist_id: str | None,
+    cache: PlaylistCache | None,
+    mirror: LibraryMirror | None = None,
+) -> SourcePlan:
+    """Estimate the cost of an item picking tracks from a playlist."""
+    plan = SourcePlan(source=source, name=item.name, nb_songs=item.nb_songs)
+    if playlist_id is None:
+        plan.resolved = False
+        return plan
+    # A playlist of a fresh mirror is read without any call to the API, as the composition reads it.
+    nb_mirrored = mirror.nb_tracks(playlist_id) if mirror else None
+    if nb_mirrored is not None:
+        plan.nb_tracks, plan.mirrored = nb_mirrored, True
+        return plan
+    try:
+        plan.nb_tracks, snapshot_id = get_playlist_total(playlist_id)
+    except Exception as exc:
+        logger.warning(f"Couldn't read playlist {item.name}: {exc}")
+        plan.resolved = False
+        return plan
+
+    plan.cached = cache is not None and cache.contains(playlist_id, snapshot_id)
+    plan.pages = (
+        0 if plan.cached else _estimate_pages(plan.nb_tracks, nb_candidates(item.nb_songs), item.selection_method)
+    )
+    # With the cache enabled, the playlist snapshot is read before its tracks.
+    sequential_calls = int(cache is not None)
+    if plan.pages:
+        if item.selection_method == SelectionMethod.ORIGINAL:
+            sequential_calls += plan.pages
+        else:
+            sequential_calls += 1 + math.ceil((plan.pages - 1) / constants.MAX_WORKERS)
+    plan.calls = plan.pages + int(cache is not None)
+    plan.bytes = min(plan.pages * constants.SPOTIFY_PLAYLIST_ITEMS_LIMIT, plan.nb_tracks) * (
+        constants.SPOTIFY_PLAYLIST_ITEM_BYTES
+    )
+    plan.latency = sequential_calls * constants.SPOTIFY_CALL_LATENCY
+    return plan
+
+
+def _plan_history(source: str, item: ComposerConfigListeningHistory) -> SourcePlan:
+    """Estimate the cost of an item picking tracks from the user listening history."""
+    nb_songs = min(nb_candidates(item.nb_songs), constants.SPOTIFY_API_HISTORY_LIMIT)
+    return SourcePlan(
+        source=source,
+        name=item.time_range,
+        nb_songs=item.nb_songs,
+        pages=1,
+        calls=1,
+        bytes=nb_songs * constants.SPOTIFY_TRACK_BYTES,
+        latency=constants.SPOTIFY_CALL_LATENCY,
+    )
+
+
+def plan_composition(composition_config: ComposerConfig) -> CompositionPlan:
+    """Estimate the cost of a composition, without fetching any track.
+
+    Playlist names are resolved against the user playlists, and the number of tracks and the cache state of each
+    playlist are read. Playlists of the library mirror, if it is enabled and fresh, cost no API call. The number of
+    pages and calls of the other items depend on their selection method: random and original selections only fetch
+    some pages, other selections fetch the whole playlist.
+
+    Args:
+        composition_config: A composition configuration.
+
+    Returns:
+        The estimated cost of each item of the composition.
+    """
+    cache = get_playlist_cache()
+    mirror = get_library_mirror()
+    user_playlists = {simplify_string(playlist.name): playlist.id for playlist in get_user_playlists()}
+
+    def _plan(source: str, item: ComposerConfigItem | ComposerConfigListeningHistory) -> SourcePlan:
+        match source:
+            case "playlists":
+                return _plan_playlist(source, item, user_playlists.get(simplify_string(item.name)), cache, mirror)
+            case "uris":
+                return _plan_playlist(source, item, item.name, cache, mirror)
+            case _:
+                return _plan_history(source, item)
+
+    jobs = [(source, item) for source, source_config in composition_config.items for item in source_config or []]
+    with ThreadPoolExecutor(max_workers=constants.MAX_WORKERS) as executor:
+        items = list(executor.map(lambda job: _plan(*job), jobs))
+    return CompositionPlan(items=items, rate_limit=constants.SPOTIFY_RATE_LIMIT)
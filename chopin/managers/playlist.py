@@ -1,12 +1,12 @@
 """Operations on spotify playlists."""
 
-import random
+from contextlib import nullcontext
 from pathlib import Path
 
 from chopin.client.endpoints import (
     add_tracks_to_playlist,
     create_user_playlist,
-    get_album_tracks,
+    get_albums_tracks,
     get_current_user,
     get_named_playlist,
     get_playlist_tracks,
@@ -14,12 +14,15 @@ from chopin.client.endpoints import (
     get_user_playlists,
     replace_tracks_in_playlist,
 )
-from chopin.managers.selection import SelectionMethod, select_tracks
+from chopin.constants import constants
+from chopin.managers.selection import SelectionMethod, preselect_items, select_tracks
 from chopin.managers.track import shuffle_tracks
 from chopin.schemas.playlist import PlaylistData, PlaylistSummary
+from chopin.schemas.selection import SelectionLimits, SelectionWeights
 from chopin.schemas.track import TrackData
 from chopin.tools.dates import ReleaseRange
 from chopin.tools.logger import get_logger
+from chopin.tools.randomness import get_rng, seeded
 from chopin.tools.strings import simplify_string
 
 logger = get_logger(__name__)
@@ -72,21 +75,22 @@ def fill(uri: str, tracks: list[TrackData]):
     """Fill a playlist with tracks.
 
     !!! note
-        Duplicate tracks will be removed.
+        Duplicate tracks will be removed. The order of the tracks is kept.
 
     Args:
         uri: uri of the playlist to fill
         tracks: List of track uuids to add to the playlist
     """
-    track_ids = list(set([track.id for track in tracks]))
+    track_ids = list(dict.fromkeys(track.id for track in tracks))
     add_tracks_to_playlist(uri, track_ids)
 
 
-def shuffle_playlist(name: str) -> PlaylistData:
+def shuffle_playlist(name: str, seed: int | None = None) -> PlaylistData:
     """Fetch a playlist from its name and shuffle_playlist it.
 
     Args:
         name: playlist name.
+        seed: Seed for the shuffle. If None, the shuffle is random.
 
     Returns:
         Shuffled playlist data.
@@ -98,8 +102,10 @@ def shuffle_playlist(name: str) -> PlaylistData:
     if not playlist:
         raise ValueError(f"Playlist {name} not found.")
 
-    tracks = get_playlist_tracks(playlist.id)
-    tracks = shuffle_tracks(tracks)
+    # The tracks are written back: they are read from the API, as a stale mirror would drop the newest ones.
+    tracks = get_playlist_tracks(playlist.id, use_mirror=False)
+    with seeded(seed) if seed is not None else nullcontext():
+        tracks = shuffle_tracks(tracks)
     replace_tracks_in_playlist(playlist.id, track_ids=[track.id for track in tracks])
     return playlist
 
@@ -123,11 +129,62 @@ def create_playlist_from_queue(name: str, description: str = "Mix generated from
     return playlist
 
 
+def _get_tracks_to_select(
+    playlist_id: str,
+    nb_tracks: int,
+    release_range: ReleaseRange | None = None,
+    selection_method: SelectionMethod | None = None,
+    added_at_range: ReleaseRange | None = None,
+    selection_weights: SelectionWeights | None = None,
+    selection_limits: SelectionLimits | None = None,
+) -> list[TrackData]:
+    """Get the tracks of a playlist a selection method needs to pick `nb_tracks` from.
+
+    Random and original selections do not need the whole playlist: only the pages containing the first, or the
+    sampled, `nb_tracks` tracks are fetched. Other selections, and selections with limits, rank the raw playlist
+    items, and only the best ranked items are validated.
+    """
+    limited = bool(selection_limits and selection_limits.as_dict())
+    match selection_method:
+        case SelectionMethod.RANDOM | None if not limited:
+            return get_playlist_tracks(
+                playlist_id=playlist_id,
+                release_date_range=release_range,
+                added_at_range=added_at_range,
+                limit=nb_tracks,
+                sample=True,
+            )
+        case SelectionMethod.ORIGINAL if not limited:
+            return get_playlist_tracks(
+                playlist_id=playlist_id,
+                release_date_range=release_range,
+                added_at_range=added_at_range,
+                limit=nb_tracks,
+            )
+        case _:
+            return get_playlist_tracks(
+                playlist_id=playlist_id,
+                release_date_range=release_range,
+                added_at_range=added_at_range,
+                limit=nb_tracks,
+                preselect=lambda items: preselect_items(
+                    items,
+                    selection_method or SelectionMethod.RANDOM,
+                    nb_items=constants.PRESELECTION_FACTOR * nb_tracks,
+                    weights=selection_weights,
+                    limits=selection_limits,
+                ),
+            )
+
+
 def tracks_from_playlist_uri(
     playlist_uri: str,
     nb_tracks: int,
     release_range: ReleaseRange | None = None,
     selection_method: SelectionMethod | None = None,
+    added_at_range: ReleaseRange | None = None,
+    selection_weights: SelectionWeights | None = None,
+    selection_limits: SelectionLimits | None = None,
 ) -> list[TrackData]:
     """Get tracks from a playlist URI.
 
@@ -140,16 +197,27 @@ def tracks_from_playlist_uri(
         release_range: An optional datetime range for the release date of the tracks.
         selection_method: How tracks are chosen from the retrieved tracks.
             See `SelectionMethod` for available methods. If no method is given, the choice will be random.
+        added_at_range: An optional datetime range for the date the tracks were added to the playlist.
+        selection_weights: For the weighted selection method, how the tracks are weighted.
+        selection_limits: Maximum number of tracks per artist, or per album.
 
     Returns:
         A list of track data from the artist radio.
     """
     try:
-        tracks = get_playlist_tracks(playlist_id=playlist_uri, release_date_range=release_range)
+        tracks = _get_tracks_to_select(
+            playlist_uri,
+            nb_tracks,
+            release_range,
+            selection_method,
+            added_at_range,
+            selection_weights,
+            selection_limits,
+        )
     except Exception:
         logger.warning(f"Couldn't retrieve playlist URI {playlist_uri}")
         return []
-    return select_tracks(tracks, nb_tracks, selection_method)
+    return select_tracks(tracks, nb_tracks, selection_method, weights=selection_weights, limits=selection_limits)
 
 
 def tracks_from_playlist_name(
@@ -158,6 +226,9 @@ def tracks_from_playlist_name(
     user_playlists: list[PlaylistData],
     release_range: ReleaseRange | None = None,
     selection_method: SelectionMethod | None = None,
+    added_at_range: ReleaseRange | None = None,
+    selection_weights: SelectionWeights | None = None,
+    selection_limits: SelectionLimits | None = None,
 ) -> list[TrackData]:
     """Get a number of tracks from a playlist.
 
@@ -168,6 +239,9 @@ def tracks_from_playlist_name(
         release_range: An optional datetime range for the release date of the tracks.
         selection_method: How tracks are chosen from the retrieved tracks.
             See `SelectionMethod` for available methods. If no method is given, the choice will be random.
+        added_at_range: An optional datetime range for the date the tracks were added to the playlist.
+        selection_weights: For the weighted selection method, how the tracks are weighted.
+        selection_limits: Maximum number of tracks per artist, or per album.
 
     Returns:
         A list of track data from the playlists
@@ -178,8 +252,10 @@ def tracks_from_playlist_name(
     if not playlist:
         logger.warning(f"Couldn't retrieve tracks for playlist {playlist_name}")
         return []
-    tracks = get_playlist_tracks(playlist_id=playlist[0].id, release_date_range=release_range)
-    return select_tracks(tracks, nb_tracks, selection_method)
+    tracks = _get_tracks_to_select(
+        playlist[0].id, nb_tracks, release_range, selection_method, added_at_range, selection_weights, selection_limits
+    )
+    return select_tracks(tracks, nb_tracks, selection_method, weights=selection_weights, limits=selection_limits)
 
 
 def summarize_playlist(playlist: PlaylistData) -> PlaylistSummary:
@@ -210,12 +286,13 @@ def dump(playlist: PlaylistSummary, filepath: Path):
         f.write(json_str)
 
 
-def doppelganger_playlist(source_playlist: str, new_playlist: str) -> PlaylistData:
+def doppelganger_playlist(source_playlist: str, new_playlist: str, seed: int | None = None) -> PlaylistData:
     """Create a "doppelganger", a similar playlist from an existing one.
 
     Args:
         source_playlist: The name of the playlist to copy.
         new_playlist: The name of the new playlist.
+        seed: Seed for the choice of the new tracks. If None, the choice is random.
 
     Returns:
         The created playlist.
@@ -223,13 +300,11 @@ def doppelganger_playlist(source_playlist: str, new_playlist: str) -> PlaylistDa
     playlist = get_named_playlist(source_playlist)
     tracks = get_playlist_tracks(playlist.id)
 
-    albums_tracks: dict[str, list[TrackData]] = {}
-    new_tracks: list[TrackData] = []
-    for track in tracks:
-        album_id = track.album.id
-        if album_id not in albums_tracks:
-            albums_tracks[album_id] = get_album_tracks(album_id)
-        new_tracks.append(random.choice(albums_tracks[album_id]))
+    albums_tracks = get_albums_tracks([track.album.id for track in tracks])
+    with seeded(seed) if seed is not None else nullcontext():
+        new_tracks = [
+            get_rng().choice(albums_tracks[track.album.id]) for track in tracks if albums_tracks.get(track.album.id)
+        ]
 
     if new_tracks:
         doppelganger_playlist = create(new_playlist, overwrite=True)
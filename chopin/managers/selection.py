@@ -6,12 +6,32 @@ Available rules:
             [popularity](https://developer.spotify.com/documentation/web-api/reference/get-track#popularity) score.
     - `latest`: the most recently released songs will be picked first.
     - `original`: no rule is applied, and the tracks are picked in the order they appear in the source.
+    - `weighted`: songs are picked randomly, popular (or recent) songs being more likely to be picked. See
+            `SelectionWeights` to configure the weights.
+
+Every rule can be constrained with a maximum number of songs per artist, or per album. See `SelectionLimits`.
 """
 
-import random
+from collections.abc import Callable, Iterable
+from datetime import date
 from enum import Enum
+from typing import Any
 
+from chopin.managers.engine import (
+    CandidatePool,
+    select_with_limits,
+    stream_first,
+    stream_sample,
+    stream_top,
+    stream_weighted_sample,
+    track_popularity,
+    track_release_ordinal,
+    weighted_key,
+)
+from chopin.schemas.selection import SelectionLimits, SelectionWeights
 from chopin.schemas.track import TrackData
+from chopin.tools.dates import get_reference_date
+from chopin.tools.randomness import get_rng
 
 
 class SelectionMethod(str, Enum):
@@ -26,6 +46,7 @@ class SelectionMethod(str, Enum):
     POPULARITY = "popularity"
     LATEST = "latest"
     ORIGINAL = "original"
+    WEIGHTED = "weighted"
 
 
 def _select_random_tracks(tracks: list[TrackData], nb_tracks: int) -> list[TrackData]:
@@ -38,7 +59,7 @@ def _select_random_tracks(tracks: list[TrackData], nb_tracks: int) -> list[Track
     Returns:
         Selected tracks.
     """
-    return random.sample(tracks, min(nb_tracks, len(tracks)))
+    return CandidatePool(tracks).sample(nb_tracks)
 
 
 def _select_original_tracks(tracks: list[TrackData], nb_tracks: int) -> list[TrackData]:
@@ -64,8 +85,7 @@ def _select_popular_tracks(tracks: list[TrackData], nb_tracks: int) -> list[Trac
     Returns:
         Selected tracks.
     """
-    tracks = sorted(tracks, key=lambda x: x.popularity, reverse=True)
-    return tracks[: min(nb_tracks, len(tracks))]
+    return CandidatePool(tracks).most_popular(nb_tracks)
 
 
 def _select_latest_tracks(tracks: list[TrackData], nb_tracks: int) -> list[TrackData]:
@@ -78,8 +98,32 @@ def _select_latest_tracks(tracks: list[TrackData], nb_tracks: int) -> list[Track
     Returns:
         Selected tracks.
     """
-    tracks = sorted(tracks, key=lambda x: x.album.release_date, reverse=True)
-    return tracks[: min(nb_tracks, len(tracks))]
+    return CandidatePool(tracks).latest(nb_tracks)
+
+
+def _track_weight(weights: SelectionWeights | None) -> Callable[[TrackData], float]:
+    """Weight function of the tracks."""
+    weights = weights or SelectionWeights()
+    reference_date = get_reference_date()
+    return lambda track: weights.weight(
+        track.popularity, track.album.release_date if track.album else None, reference_date
+    )
+
+
+def _select_weighted_tracks(
+    tracks: list[TrackData], nb_tracks: int, weights: SelectionWeights | None = None
+) -> list[TrackData]:
+    """Pick nb_tracks out of tracks, randomly, with a probability proportional to their weight.
+
+    Args:
+        tracks: Original source of tracks.
+        nb_tracks: The number of tracks to pick.
+        weights: How the tracks are weighted. By default, by popularity.
+
+    Returns:
+        Selected tracks.
+    """
+    return stream_weighted_sample(tracks, nb_tracks, weight=_track_weight(weights))
 
 
 SELECTION_MAPPER: dict[SelectionMethod, callable] = {
@@ -87,24 +131,165 @@ SELECTION_MAPPER: dict[SelectionMethod, callable] = {
     SelectionMethod.POPULARITY: _select_popular_tracks,
     SelectionMethod.LATEST: _select_latest_tracks,
     SelectionMethod.ORIGINAL: _select_original_tracks,
+    SelectionMethod.WEIGHTED: _select_weighted_tracks,
+}
+
+
+def _options(selection_method: SelectionMethod, weights: SelectionWeights | None) -> dict[str, Any]:
+    """Options of a selection method. Only the weighted selection has some."""
+    return {"weights": weights} if selection_method == SelectionMethod.WEIGHTED and weights else {}
+
+
+def _random_key() -> Callable[[Any], float]:
+    """Random key of an item: ranking items on random keys shuffles them."""
+    rng = get_rng()
+    return lambda _: rng.random()
+
+
+def track_groups(track: TrackData) -> list[tuple[str, str]]:
+    """Artists and album of a track, for the selection limits."""
+    groups = [("artist", artist.id) for artist in track.artists or [] if artist.id]
+    if track.album:
+        groups.append(("album", track.album.id))
+    return groups
+
+
+# Functions giving the ranking key of the tracks, for selections with limits. The best tracks have the highest keys.
+RANKING_KEYS: dict[SelectionMethod, callable] = {
+    SelectionMethod.RANDOM: lambda: _random_key(),
+    SelectionMethod.POPULARITY: lambda: track_popularity,
+    SelectionMethod.LATEST: lambda: track_release_ordinal,
+    SelectionMethod.ORIGINAL: lambda: lambda track: 0,
+    SelectionMethod.WEIGHTED: lambda weights=None: weighted_key(_track_weight(weights)),
 }
 
 
 def select_tracks(
-    tracks: list[TrackData], nb_tracks: int, selection_method: SelectionMethod | None = SelectionMethod.RANDOM
+    tracks: list[TrackData],
+    nb_tracks: int,
+    selection_method: SelectionMethod | None = SelectionMethod.RANDOM,
+    weights: SelectionWeights | None = None,
+    limits: SelectionLimits | None = None,
 ) -> list[TrackData]:
     """Select nb_tracks from a list of tracks, using the given rule.
 
-    See SelectionMethod for the available rules.
+    See SelectionMethod for the available rules. With limits, the tracks are picked greedily in the order of the
+    rule, and a track is skipped when one of its artists, or its album, already has its maximum number of tracks.
 
     Args:
         tracks: Original source of tracks.
         nb_tracks: The number of tracks to pick.
         selection_method: The selection method to use.
+        weights: For the weighted selection method, how the tracks are weighted.
+        limits: Maximum number of tracks per artist, or per album.
 
     Returns:
         Selected tracks.
     """
     if not selection_method:
         selection_method = SelectionMethod.RANDOM
-    return SELECTION_MAPPER[selection_method](tracks=tracks, nb_tracks=nb_tracks)
+    if limits and limits.as_dict():
+        key = RANKING_KEYS[selection_method](**_options(selection_method, weights))
+        return select_with_limits(tracks, nb_tracks, key, track_groups, limits.as_dict())
+    return SELECTION_MAPPER[selection_method](tracks=tracks, nb_tracks=nb_tracks, **_options(selection_method, weights))
+
+
+def _raw_popularity(item: dict[str, Any]) -> int:
+    """Popularity of the track of a raw playlist item."""
+    return item["track"].get("popularity") or 0
+
+
+def _raw_release_date(item: dict[str, Any]) -> str:
+    """Release date of the track of a raw playlist item, as a sortable `YYYY-MM-DD` string.
+
+    Spotify release dates are given with a year, month or day precision. Missing parts are filled the same way
+    `parse_release_date` does, so the order matches the order of the validated tracks.
+    """
+    release_date = ((item["track"].get("album") or {}).get("release_date") or "1970")[:10]
+    return release_date + "-01-01"[len(release_date) - 4 :]
+
+
+def _raw_release_day(item: dict[str, Any]) -> date | None:
+    """Release date of the track of a raw playlist item, if it can be read."""
+    try:
+        return date.fromisoformat(_raw_release_date(item))
+    except ValueError:
+        return None
+
+
+def _raw_release_ordinal(item: dict[str, Any]) -> int:
+    """Release date of the track of a raw playlist item, as a day number. 0 if it can't be read."""
+    release_date = _raw_release_day(item)
+    return release_date.toordinal() if release_date else 0
+
+
+def _raw_weight(weights: SelectionWeights | None) -> Callable[[dict[str, Any]], float]:
+    """Weight function of raw playlist items."""
+    weights = weights or SelectionWeights()
+    reference_date = get_reference_date()
+    return lambda item: weights.weight(item["track"].get("popularity"), _raw_release_day(item), reference_date)
+
+
+def _raw_groups(item: dict[str, Any]) -> list[tuple[str, str]]:
+    """Artists and album of the track of a raw playlist item, for the selection limits."""
+    track = item["track"]
+    groups = [("artist", artist["id"]) for artist in track.get("artists") or [] if artist.get("id")]
+    if (track.get("album") or {}).get("id"):
+        groups.append(("album", track["album"]["id"]))
+    return groups
+
+
+RAW_RANKING_KEYS: dict[SelectionMethod, callable] = {
+    SelectionMethod.RANDOM: lambda: _random_key(),
+    SelectionMethod.POPULARITY: lambda: _raw_popularity,
+    SelectionMethod.LATEST: lambda: _raw_release_ordinal,
+    SelectionMethod.ORIGINAL: lambda: lambda item: 0,
+    SelectionMethod.WEIGHTED: lambda weights=None: weighted_key(_raw_weight(weights)),
+}
+
+PRESELECTION_MAPPER: dict[SelectionMethod, callable] = {
+    SelectionMethod.RANDOM: stream_sample,
+    SelectionMethod.POPULARITY: lambda items, nb_items: stream_top(items, nb_items, key=_raw_popularity),
+    SelectionMethod.LATEST: lambda items, nb_items: stream_top(items, nb_items, key=_raw_release_date),
+    SelectionMethod.ORIGINAL: stream_first,
+    SelectionMethod.WEIGHTED: lambda items, nb_items, weights=None: stream_weighted_sample(
+        items, nb_items, weight=_raw_weight(weights)
+    ),
+}
+
+
+def preselect_items(
+    items: Iterable[dict[str, Any]],
+    selection_method: SelectionMethod | None = SelectionMethod.RANDOM,
+    nb_items: int | None = None,
+    weights: SelectionWeights | None = None,
+    limits: SelectionLimits | None = None,
+) -> list[dict[str, Any]]:
+    """Rank raw playlist items, as sent by the Spotify API, in the order a selection method would pick them.
+
+    Only the raw fields the selection method needs are read, so the items can be ranked before they are validated:
+    validating the first items of the ranking is enough to select tracks. Items without a track are dropped.
+
+    Items are ranked as they arrive: with `nb_items`, only the `nb_items` best candidates are held at once. With
+    limits, items are ranked once they all arrived, and the items over the limits are dropped.
+
+    Args:
+        items: Raw playlist items, consumed once.
+        selection_method: The selection method to use.
+        nb_items: The number of ranked items to keep. If None, all the items are ranked.
+        weights: For the weighted selection method, how the items are weighted.
+        limits: Maximum number of items per artist, or per album.
+
+    Returns:
+        The items, best candidates first.
+    """
+    if not selection_method:
+        selection_method = SelectionMethod.RANDOM
+    items = (item for item in items if item.get("track"))
+    if nb_items is None or (limits and limits.as_dict()):
+        items = list(items)
+        nb_items = len(items) if nb_items is None else nb_items
+    if limits and limits.as_dict():
+        key = RAW_RANKING_KEYS[selection_method](**_options(selection_method, weights))
+        return select_with_limits(items, nb_items, key, _raw_groups, limits.as_dict())
+    return PRESELECTION_MAPPER[selection_method](items, nb_items, **_options(selection_method, weights))
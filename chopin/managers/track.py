@@ -1,10 +1,9 @@
 """Operations on spotify tracks."""
 
-import random
-
 from chopin.client.endpoints import like_tracks
 from chopin.schemas.track import TrackData
 from chopin.tools.logger import get_logger
+from chopin.tools.randomness import get_rng
 
 logger = get_logger(__name__)
 
@@ -28,4 +27,4 @@ def shuffle_tracks(tracks: list[TrackData]) -> list[TrackData]:
     Returns:
         Updated list of tracks
     """
-    return random.sample(tracks, len(tracks))
+    return get_rng().sample(tracks, len(tracks))
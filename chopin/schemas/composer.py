@@ -5,9 +5,9 @@ from pathlib import Path
 from typing import Annotated, Literal, Self
 
 from pydantic import AfterValidator, BaseModel, Field, computed_field, field_validator, model_validator
-from ruamel.yaml import YAML
 
 from chopin.managers.selection import SelectionMethod
+from chopin.schemas.selection import SelectionLimits, SelectionWeights
 from chopin.tools.dates import read_date
 from chopin.tools.logger import get_logger
 from chopin.tools.strings import extract_uri_from_playlist_link
@@ -26,12 +26,24 @@ class ComposerConfigItem(BaseModel):
     Attributes:
         name: Name of the item. It should respect the simplify_string nomenclature
         weight: Weight of the input in the final composition
+        selection_method: How tracks are chosen from the item.
+        selection_weights: For the `weighted` selection method, how the tracks are weighted.
+        max_per_artist: Maximum number of tracks of a same artist picked from the item.
+        max_per_album: Maximum number of tracks of a same album picked from the item.
     """
 
     name: Annotated[str, extract_uri_from_playlist_link]
     weight: Annotated[float, Field(ge=0)] = 1.0
     nb_songs: int | None = 0
     selection_method: SelectionMethod | None = SelectionMethod.RANDOM
+    selection_weights: SelectionWeights | None = None
+    max_per_artist: Annotated[int, Field(gt=0)] | None = None
+    max_per_album: Annotated[int, Field(gt=0)] | None = None
+
+    @property
+    def selection_limits(self) -> SelectionLimits:
+        """Limits of the tracks picked from the item."""
+        return SelectionLimits(max_per_artist=self.max_per_artist, max_per_album=self.max_per_album)
 
     @field_validator("name", mode="before")
     def extract_uri_from_link(cls, v: str):
@@ -72,18 +84,33 @@ class ComposerConfig(BaseModel):
         name: Name of the playlist you wish to create
         description: Description for your playlist
         nb_songs: Target number of songs for the playlist.
+        release_range: An optional date range for the release date of the tracks.
+        added_at_range: An optional date range for the date the tracks were added to their playlist.
         playlists: A list of playlist names and their weight.
         uris: A list of spotify playlist URIs to pick from directly.
         history: Include past listening habits and most listened songs.
+        max_per_artist: Maximum number of tracks of a same artist in the playlist. It also caps the limit of each item.
+        max_per_album: Maximum number of tracks of a same album in the playlist. It also caps the limit of each item.
+        seed: Seed for the random choices of the composition. With the same configuration, seed and cached
+            playlists, the composition is the same.
     """
 
     name: str = "🤖 Robot Mix"
     description: str = "Randomly generated mix"
     nb_songs: Annotated[int, Field(gt=0)]
     release_range: Annotated[tuple[str | None, str | None] | None, AfterValidator(read_date)] | None = None
+    added_at_range: Annotated[tuple[str | None, str | None] | None, AfterValidator(read_date)] | None = None
     playlists: list[ComposerConfigItem] | None = []
     history: Annotated[list[ComposerConfigListeningHistory], Field(max_length=3)] | None = []
     uris: list[ComposerConfigItem] | None = []
+    max_per_artist: Annotated[int, Field(gt=0)] | None = None
+    max_per_album: Annotated[int, Field(gt=0)] | None = None
+    seed: int | None = None
+
+    @property
+    def selection_limits(self) -> SelectionLimits:
+        """Limits of the tracks of the whole composition."""
+        return SelectionLimits(max_per_artist=self.max_per_artist, max_per_album=self.max_per_album)
 
     @field_validator("history")
     def history_field_ranges_must_be_unique(cls, v):
@@ -110,6 +137,21 @@ class ComposerConfig(BaseModel):
         logger.info(f"With the composer configuration parsed, {total_nb_songs} songs will be added.")
         return self
 
+    @model_validator(mode="after")
+    def cap_item_limits(self) -> "ComposerConfig":
+        """Cap the limits of each item with the limits of the composition.
+
+        An item can't pick more tracks of an artist, or of an album, than the whole playlist can hold.
+        """
+        for field in ("max_per_artist", "max_per_album"):
+            limit = getattr(self, field)
+            if limit is None:
+                continue
+            for item in [*self.playlists, *self.uris]:
+                item_limit = getattr(item, field)
+                setattr(item, field, limit if item_limit is None else min(item_limit, limit))
+        return self
+
     @computed_field
     def items(self) -> list[list[ComposerConfigItem]]:  # noqa: D102
         return {source: getattr(self, source) for source in SOURCES}.items()
@@ -124,6 +166,8 @@ class ComposerConfig(BaseModel):
         Returns:
             A valid composer configuration model.
         """
+        from ruamel.yaml import YAML
+
         yaml = YAML(typ="safe", pure=True)
         with open(file_path) as f:
             data = yaml.load(f)
@@ -0,0 +1,79 @@
+"""Schemas for composition plans: the estimated cost of a composition."""
+
+from pydantic import BaseModel, computed_field
+
+
+class SourcePlan(BaseModel):
+    """Estimated cost of a composition item.
+
+    Attributes:
+        source: The source of the item: `playlists`, `history` or `uris`.
+        name: Name of the item.
+        nb_songs: Number of songs to pick from the item.
+        nb_tracks: Number of tracks available in the item, if known.
+        resolved: Whether the item was found. Unresolved items add no tracks to the composition.
+        cached: Whether the item tracks are read from the playlist cache.
+        mirrored: Whether the item tracks are read from the library mirror, without any API call.
+        pages: Estimated number of pages of items to fetch.
+        calls: Estimated number of Spotify API calls, pages included.
+        bytes: Estimated size of the API responses, in bytes.
+        latency: Estimated time to retrieve the item tracks, in seconds.
+    """
+
+    source: str
+    name: str
+    nb_songs: int
+    nb_tracks: int | None = None
+    resolved: bool = True
+    cached: bool = False
+    mirrored: bool = False
+    pages: int = 0
+    calls: int = 0
+    bytes: int = 0
+    latency: float = 0.0
+
+
+class CompositionPlan(BaseModel):
+    """Estimated cost of a composition, item by item.
+
+    Items are processed concurrently, so the composition latency is the one of its slowest item, unless the
+    Spotify rate limit is reached first.
+
+    Attributes:
+        items: The plan of each item of the composition.
+        rate_limit: Number of calls per second allowed by the request scheduler.
+    """
+
+    items: list[SourcePlan]
+    rate_limit: float
+
+    @computed_field
+    def pages(self) -> int:  # noqa: D102
+        return sum(item.pages for item in self.items)
+
+    @computed_field
+    def calls(self) -> int:  # noqa: D102
+        return sum(item.calls for item in self.items)
+
+    @computed_field
+    def bytes(self) -> int:  # noqa: D102
+        return sum(item.bytes for item in self.items)
+
+    @computed_field
+    def latency(self) -> float:  # noqa: D102
+        return max([self.calls / self.rate_limit, *(item.latency for item in self.items)])
+
+    def __str__(self):
+        """Represent a composition plan, as a table."""
+        lines = [f"{'source':<10} {'name':<32} {'songs':>6} {'tracks':>7} {'pages':>6} {'calls':>6} {'kB':>7} {'s':>6}"]
+        for item in self.items:
+            status = "mirrored" if item.mirrored else "cached" if item.cached else "" if item.resolved else "not found"
+            lines.append(
+                f"{item.source:<10} {item.name[:32]:<32} {item.nb_songs:>6} {item.nb_tracks or '-':>7} "
+                f"{item.pages:>6} {item.calls:>6} {item.bytes / 1000:>7.0f} {item.latency:>6.1f} {status}"
+            )
+        lines.append(
+            f"{'total':<10} {'':<32} {'':>6} {'':>7} {self.pages:>6} {self.calls:>6} "
+            f"{self.bytes / 1000:>7.0f} {self.latency:>6.1f}"
+        )
+        return "\n".join(lines)
@@ -0,0 +1,60 @@
+"""Schemas for the selection of tracks."""
+
+from datetime import date
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field
+
+
+class SelectionWeights(BaseModel):
+    """Weights of the tracks, for the `weighted` selection method.
+
+    Tracks are sampled with a probability proportional to their weight:
+
+    - by `popularity`, a track weighs `(1 + popularity) ** exponent`;
+    - by `recency`, a track released `age` years before the reference date weighs `(1 + age) ** -exponent`.
+
+    With an exponent of 0, every track weighs the same and the selection is random. The higher the exponent, the
+    closer the selection gets to the `popularity` or `latest` selection methods.
+
+    Attributes:
+        by: The track attribute the weights are computed from.
+        exponent: How strongly the weights favor popular, or recent, tracks.
+    """
+
+    by: Literal["popularity", "recency"] = "popularity"
+    exponent: Annotated[float, Field(ge=0)] = 1.0
+
+    def weight(self, popularity: int | None, release_date: date | None, reference_date: date) -> float:
+        """Weight of a track.
+
+        Args:
+            popularity: The track popularity.
+            release_date: The release date of the track.
+            reference_date: The date the age of the track is computed at. It is fixed for a whole composition, so a
+                seeded composition gives the same tracks whatever the day it runs.
+
+        Returns:
+            The weight of the track, relative to the other tracks.
+        """
+        if self.by == "popularity":
+            return (1 + (popularity or 0)) ** self.exponent
+        age = max((reference_date - release_date).days, 0) / 365.25 if release_date else 100
+        return (1 + age) ** -self.exponent
+
+
+class SelectionLimits(BaseModel):
+    """Maximum number of tracks of a same artist, or of a same album, in a selection.
+
+    Attributes:
+        max_per_artist: Maximum number of tracks per artist. A track counts for each of its artists.
+        max_per_album: Maximum number of tracks per album.
+    """
+
+    max_per_artist: Annotated[int, Field(gt=0)] | None = None
+    max_per_album: Annotated[int, Field(gt=0)] | None = None
+
+    def as_dict(self) -> dict[str, int]:
+        """The limits which are set, by kind of group: `artist` or `album`."""
+        limits = {"artist": self.max_per_artist, "album": self.max_per_album}
+        return {kind: limit for kind, limit in limits.items() if limit is not None}
@@ -0,0 +1,153 @@
+"""Compact, columnar representation of many tracks.
+
+A list of `TrackData` holds one pydantic model per track, album and artist: an album shared by ten tracks is stored
+ten times. A `TrackTable` stores the tracks column by column instead:
+
+- numbers (duration, popularity, dates) are stored in arrays of machine integers;
+- albums and artists are stored once, in tables indexed by their id, and tracks only hold their positions;
+- track URIs are derived from the track ids, and names are interned.
+
+Tracks are read back as `TrackData` on demand. The indexes of the cached and mirrored playlists, kept in memory
+between reads, store their tracks in a table, and are built from its date columns.
+"""
+
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import date
+from typing import overload
+
+from chopin.schemas.album import AlbumData
+from chopin.schemas.artist import ArtistData
+from chopin.schemas.track import TrackData
+from chopin.tools.dates import date_ordinal
+
+_TRACK_URI_PREFIX = "spotify:track:"
+
+
+class TrackTable:
+    """Tracks stored column by column, with a single copy of each album and artist.
+
+    Tracks without artists are read back with an empty list of artists, and tracks without popularity with a
+    popularity of 0, as the selection methods rank them.
+
+    Attributes:
+        albums: The albums of the tracks, each stored once.
+        artists: The artists of the tracks, each stored once.
+    """
+
+    def __init__(self, tracks: Iterable[TrackData] = ()):
+        """Store the tracks. They can be given one at a time, like the rows of a database, and are not kept."""
+        self.albums: list[AlbumData] = []
+        self.artists: list[ArtistData] = []
+        self._album_positions: dict[str, int] = {}
+        self._artist_positions: dict[str, int] = {}
+        self._album_release_ordinals = array("l")
+
+        self._names: list[str] = []
+        self._ids: list[str] = []
+        # Only the URIs which can't be derived from the track id are stored.
+        self._uris: dict[int, str] = {}
+        self._durations = array("q")
+        self._popularities = array("h")
+        self._added_ordinals = array("l")
+        self._albums = array("l")
+        # The artists of the track at `position` are `_track_artists[_artist_offsets[position]:][:nb_artists]`.
+        self._artist_offsets = array("l", [0])
+        self._track_artists = array("l")
+        self.extend(tracks)
+
+    def __len__(self) -> int:
+        """Number of tracks in the table."""
+        return len(self._ids)
+
+    def _album_position(self, album: AlbumData | None) -> int:
+        if album is None:
+            return -1
+        position = self._album_positions.get(album.id)
+        if position is None:
+            position = self._album_positions[album.id] = len(self.albums)
+            self.albums.append(album)
+            self._album_release_ordinals.append(date_ordinal(album.release_date))
+        return position
+
+    def _artist_position(self, artist: ArtistData) -> int:
+        position = self._artist_positions.get(artist.id)
+        if position is None:
+            position = self._artist_positions[artist.id] = len(self.artists)
+            self.artists.append(artist)
+        return position
+
+    def append(self, track: TrackData) -> None:
+        """Add a track at the end of the table.
+
+        Albums and artists are stored the first time their id is seen: the next tracks only refer to them.
+        """
+        position = len(self._ids)
+        self._names.append(sys.intern(track.name))
+        self._ids.append(track.id)
+        if track.uri != f"{_TRACK_URI_PREFIX}{track.id}":
+            self._uris[position] = track.uri
+        self._durations.append(track.duration_ms)
+        self._popularities.append(track.popularity or 0)
+        self._added_ordinals.append(date_ordinal(track.added_at))
+        self._albums.append(self._album_position(track.album))
+        self._track_artists.extend(self._artist_position(artist) for artist in track.artists or [])
+        self._artist_offsets.append(len(self._track_artists))
+
+    def extend(self, tracks: Iterable[TrackData]) -> None:
+        """Add tracks at the end of the table."""
+        for track in tracks:
+            self.append(track)
+
+    def _track(self, position: int) -> TrackData:
+        album = self._albums[position]
+        added_at = self._added_ordinals[position]
+        artists = self._track_artists[self._artist_offsets[position] : self._artist_offsets[position + 1]]
+        track_id = self._ids[position]
+        # Fields were validated when the track was added.
+        return TrackData.model_construct(
+            name=self._names[position],
+            id=track_id,
+            uri=self._uris.get(position, f"{_TRACK_URI_PREFIX}{track_id}"),
+            duration_ms=self._durations[position],
+            popularity=self._popularities[position],
+            added_at=date.fromordinal(added_at) if added_at else None,
+            album=self.albums[album] if album >= 0 else None,
+            artists=[self.artists[artist] for artist in artists],
+        )
+
+    @overload
+    def __getitem__(self, index: int) -> TrackData: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[TrackData]: ...
+
+    def __getitem__(self, index: int | slice) -> TrackData | list[TrackData]:
+        """Read a track, or a slice of tracks, as `TrackData`. Albums and artists are shared by the tracks read."""
+        if isinstance(index, slice):
+            return [self._track(position) for position in range(len(self))[index]]
+        return self._track(range(len(self))[index])
+
+    def __iter__(self) -> Iterator[TrackData]:
+        """Read the tracks, in the table order."""
+        return map(self._track, range(len(self)))
+
+    def to_tracks(self) -> list[TrackData]:
+        """Read all the tracks, as `TrackData`."""
+        return list(self)
+
+    @property
+    def popularities(self) -> array:
+        """Popularity of the tracks."""
+        return self._popularities
+
+    @property
+    def added_ordinals(self) -> array:
+        """Date the tracks were added to their source, as a day number. 0 if it is unknown."""
+        return self._added_ordinals
+
+    def release_ordinals(self) -> array:
+        """Release date of the tracks, as a day number. 0 if it is unknown."""
+        ordinals = self._album_release_ordinals
+        return array("l", [ordinals[album] if album >= 0 else 0 for album in self._albums])
@@ -0,0 +1,122 @@
+"""Utilities to cache function results in memory."""
+
+import functools
+import inspect
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any
+
+
+def ttl_cache(ttl: float) -> Callable:
+    """Decorator to cache the results of a function for `ttl` seconds.
+
+    Unlike `functools.lru_cache`, cached results expire, so long-running processes eventually see fresh data.
+    The decorated function exposes a `cache_clear` method to invalidate the cache before it expires.
+
+    Args:
+        ttl: Time to live of a cached result, in seconds.
+
+    Usage:
+        ```py
+        @ttl_cache(ttl=300)
+        def get_user_playlists():
+            ...
+
+        get_user_playlists.cache_clear()
+        ```
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        results: dict[Any, tuple[float, Any]] = {}
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            with lock:
+                cached = results.get(key)
+            if cached and time.monotonic() - cached[0] < ttl:
+                return cached[1]
+            result = fn(*args, **kwargs)
+            with lock:
+                results[key] = (time.monotonic(), result)
+            return result
+
+        def cache_clear() -> None:
+            with lock:
+                results.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+@dataclass
+class CoalescingStats:
+    """Counters of the calls to functions decorated with `singleflight`.
+
+    Attributes:
+        hits: Number of calls which shared the result of an identical call in flight.
+        misses: Number of calls which executed the function.
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+
+def singleflight(fn: Callable) -> Callable:
+    """Decorator to coalesce concurrent identical calls of a function.
+
+    While a call is in flight, identical calls (with the same arguments) wait for it and share its result, or its
+    exception, instead of executing the function again. Results are not kept once the call completes: combine with
+    `ttl_cache` for that. The result is shared by the coalesced calls: it must be copied before being modified.
+
+    The decorated function exposes its counters in a `stats` attribute.
+
+    Usage:
+        ```py
+        @singleflight
+        def get_playlist_page(playlist_id, offset):
+            ...
+
+        get_playlist_page.stats.hits
+        ```
+    """
+    signature = inspect.signature(fn)
+    in_flight: dict[Any, Future] = {}
+    lock = threading.Lock()
+    stats = CoalescingStats()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = tuple(bound.arguments.items())
+        with lock:
+            future = in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                stats.misses += 1
+                future = in_flight[key] = Future()
+            else:
+                stats.hits += 1
+        if not is_leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with lock:
+                del in_flight[key]
+
+    wrapper.stats = stats
+    return wrapper
@@ -1,10 +1,15 @@
 """Date range utilitaries."""
 
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import date, datetime
 from typing import TypeAlias
 
 ReleaseRange: TypeAlias = tuple[datetime, datetime]
 
+_REFERENCE_DATE: ContextVar[date | None] = ContextVar("chopin_reference_date", default=None)
+
 
 def read_date(date: tuple[str | None, str | None] | None) -> ReleaseRange | None:
     """Read a date from  a string tuple.
@@ -56,3 +61,45 @@ def parse_release_date(date: str) -> date:
         case _:
             raise ValueError(f"Bad release date format: {date}")
     return datetime.strptime(date, _format).date()
+
+
+def as_date(value: date | datetime) -> date:
+    """Get the date of a date or a datetime.
+
+    Args:
+        value: A date, or a datetime.
+
+    Returns:
+        The date, without its time if it is a datetime.
+    """
+    return value.date() if isinstance(value, datetime) else value
+
+
+def date_ordinal(value: date | str | None) -> int:
+    """Day number of a date, 0 if there is no date."""
+    return value.toordinal() if isinstance(value, date) else 0
+
+
+def get_reference_date() -> date:
+    """Get the date the age of the tracks is computed at, in the current context.
+
+    Outside of a `dated` block, this is today.
+    """
+    return _REFERENCE_DATE.get() or date.today()
+
+
+@contextmanager
+def dated(reference_date: date) -> Iterator[date]:
+    """Run a block of code with a fixed reference date, so its selections do not depend on the day they run.
+
+    Args:
+        reference_date: The date the age of the tracks is computed at.
+
+    Yields:
+        The reference date, also returned by `get_reference_date` within the block.
+    """
+    token = _REFERENCE_DATE.set(reference_date)
+    try:
+        yield reference_date
+    finally:
+        _REFERENCE_DATE.reset(token)
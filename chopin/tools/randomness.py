@@ -0,0 +1,40 @@
+"""Random number generation.
+
+Random choices of chopin (selections, samples, shuffles) are drawn from the generator returned by `get_rng`. The
+generator is held in a context variable: `seeded` runs a block of code with its own seeded generator, so tasks
+running concurrently are each reproducible, whatever the order they run in.
+"""
+
+import random
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_RNG: ContextVar[random.Random | None] = ContextVar("chopin_rng", default=None)
+
+
+def get_rng() -> random.Random:
+    """Get the random generator of the current context.
+
+    Outside of a `seeded` block, this is the generator of the `random` module, seeded with `random.seed`.
+    """
+    # The functions of the `random` module are the methods of a hidden `random.Random` instance.
+    return _RNG.get() or random
+
+
+@contextmanager
+def seeded(seed: int | None) -> Iterator[random.Random]:
+    """Run a block of code with a new random generator.
+
+    Args:
+        seed: Seed of the generator. If None, the generator is seeded from the system entropy.
+
+    Yields:
+        The generator, also returned by `get_rng` within the block.
+    """
+    rng = random.Random(seed)
+    token = _RNG.set(rng)
+    try:
+        yield rng
+    finally:
+        _RNG.reset(token)
@@ -0,0 +1,27 @@
+"""JSON decoding, with a fast decoder when it is available.
+
+[orjson](https://github.com/ijl/orjson) is used if it is installed (`pip install chopin[fast]`), otherwise the
+standard library decoder is used.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode a JSON document.
+
+    Args:
+        data: The JSON document, as raw bytes or string.
+
+    Returns:
+        The decoded document.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
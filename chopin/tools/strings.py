@@ -3,13 +3,13 @@
 import re
 import unicodedata
 
-import emoji
-
 BASE62 = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
 
 
 def simplify_string(text: str) -> str:
     """Simplify a string: lowercase, and no emojis."""
+    import emoji
+
     text = emoji.replace_emoji(text)
     text = text.lower()
     text = text.rstrip(" ")
@@ -60,6 +60,21 @@ def extract_uri_from_playlist_link(playlist_link: str) -> str:
     return ""
 
 
+def playlist_id_from_uri(playlist_uri: str) -> str:
+    """Get the id of a playlist from its URI. The playlists are cached and mirrored by id.
+
+    ??? example
+        `spotify:playlist:37i9dQZF1DWWv8B5EWK7bn` becomes `37i9dQZF1DWWv8B5EWK7bn`; an id is returned as is.
+
+    Args:
+        playlist_uri: URI, or id, of a Spotify playlist.
+
+    Returns:
+        The playlist id.
+    """
+    return playlist_uri.rsplit(":", 1)[-1]
+
+
 def decode(encoded_string, alphabet=BASE62) -> str:
     """Decode a Base X encoded string into the number.
 
@@ -0,0 +1,107 @@
+"""Benchmark the identity map, on playlists sharing tracks, as the items of a composition do.
+
+Each playlist adds its tracks at its own date, as real playlists do: a shared track is read with another `added_at`
+date from each playlist. The hit rates of the tracks, albums and artists are reported separately.
+
+Usage:
+    python scripts/benchmark_interning.py --nb-playlists 8 --playlist-size 2000 --overlap 0.5
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from collections.abc import Callable
+from contextlib import AbstractContextManager, nullcontext
+from datetime import datetime, timedelta
+
+from chopin.client.endpoints import _validate_tracks
+from chopin.client.identity import interning
+
+
+def _playlists(nb_playlists: int, playlist_size: int, overlap: float) -> list[list[dict]]:
+    """Build the items of playlists drawing a share `overlap` of their tracks from a common pool."""
+    rng = random.Random(0)
+    pool_size = max(int(playlist_size / max(overlap, 1e-9)), playlist_size) if overlap else 0
+    next_id = pool_size
+    playlists = []
+    for playlist in range(nb_playlists):
+        nb_shared = int(playlist_size * overlap)
+        ids = rng.sample(range(pool_size), nb_shared) + list(range(next_id, next_id + playlist_size - nb_shared))
+        next_id += playlist_size - nb_shared
+        added_at = (datetime(2024, 1, 1) + timedelta(days=playlist)).isoformat() + "Z"
+        playlists.append([_item(track_id, added_at) for track_id in ids])
+    return playlists
+
+
+def _item(track_id: int, added_at: str) -> dict:
+    """A playlist item, as the Spotify API sends it. Tracks of an album share their album and artist."""
+    album_id, artist_id = track_id // 10, track_id // 20
+    return {
+        "added_at": added_at,
+        "track": {
+            "name": f"track_{track_id}",
+            "id": f"{track_id:022d}",
+            "uri": f"spotify:track:{track_id:022d}",
+            "duration_ms": 200_000,
+            "popularity": track_id % 100,
+            "album": {
+                "name": f"album_{album_id}",
+                "id": f"{album_id:022d}",
+                "uri": f"spotify:album:{album_id:022d}",
+                "release_date": "2020-01-01",
+            },
+            "artists": [
+                {"name": f"artist_{artist_id}", "id": f"{artist_id:022d}", "uri": f"spotify:artist:{artist_id}"}
+            ],
+        },
+    }
+
+
+def _read(playlists: list[list[dict]]) -> list[list]:
+    """Validate the playlists, page by page."""
+    return [
+        _validate_tracks(playlist[offset : offset + 100])
+        for playlist in playlists
+        for offset in range(0, len(playlist), 100)
+    ]
+
+
+def _measure(playlists: list[list[dict]], scope: Callable[[], AbstractContextManager]) -> tuple[float, int]:
+    """Measure the time taken to read the playlists, and the memory held by their tracks, each within a new scope."""
+    with scope():
+        start = time.perf_counter()
+        _read(playlists)
+        elapsed = time.perf_counter() - start
+    with scope():
+        tracemalloc.start()
+        tracks = _read(playlists)  # noqa: F841
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nb-playlists", type=int, default=8)
+    parser.add_argument("--playlist-size", type=int, default=2000)
+    parser.add_argument("--overlap", type=float, default=0.5)
+    args = parser.parse_args()
+
+    playlists = _playlists(args.nb_playlists, args.playlist_size, args.overlap)
+    # The same playlists, without shared tracks: the identity map only shares their albums and artists.
+    unshared = _playlists(args.nb_playlists, args.playlist_size, 0)
+    plain_time, plain_size = _measure(playlists, nullcontext)
+    unshared_time, unshared_size = _measure(unshared, interning)
+    interned_time, interned_size = _measure(playlists, interning)
+    with interning() as identity_map:
+        _read(playlists)
+
+    print(f"Reading {args.nb_playlists} playlists of {args.playlist_size} tracks, {args.overlap:.0%} of them shared")
+    print(f"{'':<24}{'time (ms)':>12}{'memory (MB)':>14}")
+    print(f"{'validation':<24}{plain_time * 1000:>12.1f}{plain_size / 1e6:>14.1f}")
+    print(f"{'albums and artists':<24}{unshared_time * 1000:>12.1f}{unshared_size / 1e6:>14.1f}")
+    print(f"{'albums, artists, tracks':<24}{interned_time * 1000:>12.1f}{interned_size / 1e6:>14.1f}")
+    print(f"Memory saved by sharing albums and artists: {1 - unshared_size / plain_size:.0%}")
+    print(f"Memory saved by sharing the tracks too: {1 - interned_size / plain_size:.0%}")
+    print(identity_map.report())
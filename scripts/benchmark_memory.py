@@ -0,0 +1,67 @@
+"""Benchmark the memory of a library of tracks, as a list of `TrackData` and as a `TrackTable`.
+
+Usage:
+    python scripts/benchmark_memory.py --nb-tracks 100000 --tracks-per-album 10
+"""
+
+import argparse
+import random
+import tracemalloc
+from datetime import date
+
+from chopin.schemas.table import TrackTable
+from chopin.schemas.track import TrackData
+
+
+def _track_payloads(nb_tracks: int, tracks_per_album: int) -> list[dict]:
+    """Build the payloads of `nb_tracks` tracks, as the Spotify API sends them."""
+    rng = random.Random(0)
+    payloads = []
+    for i in range(nb_tracks):
+        album_id, artist_id = i // tracks_per_album, i // (2 * tracks_per_album)
+        payloads.append(
+            {
+                "name": f"track_{i}",
+                "id": f"{i:022d}",
+                "uri": f"spotify:track:{i:022d}",
+                "duration_ms": rng.randint(60_000, 600_000),
+                "popularity": rng.randint(0, 100),
+                "added_at": date(2024, 1, 1),
+                "album": {
+                    "name": f"album_{album_id}",
+                    "id": f"a{album_id:021d}",
+                    "uri": f"spotify:album:a{album_id:021d}",
+                    "release_date": date.fromordinal(730_000 + album_id % 9000).isoformat(),
+                },
+                "artists": [
+                    {"name": f"artist_{artist_id}", "id": f"b{artist_id:021d}", "uri": f"spotify:artist:b{artist_id}"}
+                ],
+            }
+        )
+    return payloads
+
+
+def _allocated(build) -> tuple[object, int]:
+    """Build an object, and measure the memory it holds, in bytes."""
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nb-tracks", type=int, default=100_000)
+    parser.add_argument("--tracks-per-album", type=int, default=10)
+    args = parser.parse_args()
+
+    payloads = _track_payloads(args.nb_tracks, args.tracks_per_album)
+    tracks, tracks_size = _allocated(lambda: [TrackData.model_validate(payload) for payload in payloads])
+    table, table_size = _allocated(lambda: TrackTable(TrackData.model_validate(payload) for payload in payloads))
+
+    print(f"Holding {args.nb_tracks} tracks, {args.tracks_per_album} tracks per album")
+    print(f"{'representation':<16}{'memory (MB)':>14}")
+    print(f"{'TrackData':<16}{tracks_size / 1e6:>14.1f}")
+    print(f"{'TrackTable':<16}{table_size / 1e6:>14.1f}")
+    print(f"Saved {1 - table_size / tracks_size:.0%}")
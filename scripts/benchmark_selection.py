@@ -0,0 +1,69 @@
+"""Benchmark the selection engine against full sorts, on large pools of candidate tracks.
+
+Usage:
+    python scripts/benchmark_selection.py --pool-size 100000 --nb-tracks 50
+"""
+
+import argparse
+import random
+import timeit
+from datetime import date
+
+from chopin.managers.engine import CandidatePool
+from chopin.schemas.album import AlbumData
+from chopin.schemas.track import TrackData
+
+
+def _make_pool(size: int) -> list[TrackData]:
+    """Build `size` candidate tracks, with random popularity and release dates."""
+    rng = random.Random(0)
+    return [
+        TrackData.model_construct(
+            name=f"track_{i}",
+            id=f"{i}",
+            uri=f"spotify:track:{i}",
+            duration_ms=1000,
+            popularity=rng.randint(0, 100),
+            added_at=None,
+            album=AlbumData.model_construct(
+                name=f"album_{i}",
+                id=f"{i}",
+                uri=f"spotify:album:{i}",
+                release_date=date.fromordinal(rng.randint(1, 739_000)),
+            ),
+            artists=[],
+        )
+        for i in range(size)
+    ]
+
+
+# Selections with a full sort of the candidates, as the selection methods used to pick tracks.
+SORTED_SELECTIONS = {
+    "random": lambda tracks, nb_tracks: random.sample(tracks, min(nb_tracks, len(tracks))),
+    "popularity": lambda tracks, nb_tracks: sorted(tracks, key=lambda x: x.popularity, reverse=True)[:nb_tracks],
+    "latest": lambda tracks, nb_tracks: sorted(tracks, key=lambda x: x.album.release_date, reverse=True)[:nb_tracks],
+}
+
+ENGINE_SELECTIONS = {
+    "random": lambda tracks, nb_tracks: CandidatePool(tracks).sample(nb_tracks),
+    "popularity": lambda tracks, nb_tracks: CandidatePool(tracks).most_popular(nb_tracks),
+    "latest": lambda tracks, nb_tracks: CandidatePool(tracks).latest(nb_tracks),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-size", type=int, default=100_000)
+    parser.add_argument("--nb-tracks", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tracks = _make_pool(args.pool_size)
+    print(f"Selecting {args.nb_tracks} tracks out of {args.pool_size} candidates, best of {args.repeat} runs")
+    print(f"{'method':<12}{'sort (ms)':>12}{'engine (ms)':>14}{'speedup':>10}")
+    for method in SORTED_SELECTIONS:
+        timings = [
+            min(timeit.repeat(lambda fn=fn: fn(tracks, args.nb_tracks), number=1, repeat=args.repeat)) * 1000
+            for fn in (SORTED_SELECTIONS[method], ENGINE_SELECTIONS[method])
+        ]
+        print(f"{method:<12}{timings[0]:>12.1f}{timings[1]:>14.1f}{timings[0] / timings[1]:>9.1f}x")
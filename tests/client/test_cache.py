@@ -0,0 +1,127 @@
+"""Tests for chopin.client.cache."""
+
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from chopin.client.cache import LibraryMirror, LikesStore, PlaylistCache
+from chopin.constants import constants
+from tests.conftest import track_data
+
+
+@pytest.fixture
+def playlist_cache(tmp_path):
+    return PlaylistCache(path=tmp_path / "cache.sqlite")
+
+
+def test_playlist_cache_miss(playlist_cache):
+    assert playlist_cache.get("playlist_id", "snapshot") is None
+
+
+def test_playlist_cache_hit(playlist_cache, playlist_1_tracks):
+    playlist_cache.set("playlist_id", "snapshot", playlist_1_tracks)
+    assert playlist_cache.get("playlist_id", "snapshot") == playlist_1_tracks
+
+
+def test_playlist_cache_outdated_snapshot(playlist_cache, playlist_1_tracks):
+    playlist_cache.set("playlist_id", "old_snapshot", playlist_1_tracks)
+    assert playlist_cache.get("playlist_id", "new_snapshot") is None
+
+
+def test_playlist_cache_evicts_least_recently_used(tmp_path):
+    tracks = [track_data(str(i)) for i in range(10)]
+    playlist_cache = PlaylistCache(path=tmp_path / "cache.sqlite")
+    playlist_cache.set("first", "snapshot", tracks)
+    playlist_cache.set("second", "snapshot", tracks)
+    playlist_cache.get("first", "snapshot")
+
+    evicted = playlist_cache.prune(max_size=playlist_cache.entries()[0].size)
+    assert evicted == 1
+    assert [entry.playlist_id for entry in playlist_cache.entries()] == ["first"]
+
+
+def test_playlist_cache_clear(playlist_cache, playlist_1_tracks):
+    playlist_cache.set("playlist_id", "snapshot", playlist_1_tracks)
+    assert playlist_cache.clear() == 1
+    assert playlist_cache.entries() == []
+
+
+def test_likes_store(tmp_path):
+    store = LikesStore(path=tmp_path / "cache.sqlite")
+    assert store.watermark is None
+    assert store.last_full_sync is None
+
+    store.replace([("2024-01-01T00:00:00Z", track_data("old"))])
+    store.add([("2024-02-01T00:00:00Z", track_data("new"))])
+    assert store.watermark == "2024-02-01T00:00:00Z"
+    assert store.last_full_sync is not None
+    assert [track.id for track in store.tracks()] == ["new", "old"]
+
+    store.replace([("2024-02-01T00:00:00Z", track_data("new"))])
+    assert [track.id for track in store.tracks()] == ["new"]
+
+
+@pytest.fixture
+def library_mirror(tmp_path):
+    return LibraryMirror(path=tmp_path / "library.sqlite", max_staleness=3600)
+
+
+def test_library_mirror_is_stale_until_synced(library_mirror, playlist_1, playlist_1_tracks):
+    library_mirror.set_playlists([playlist_1])
+    library_mirror.set_tracks(playlist_1.id, "snapshot", playlist_1_tracks)
+    assert library_mirror.playlists() is None
+    assert library_mirror.tracks(playlist_1.id) is None
+    assert library_mirror.nb_tracks(playlist_1.id) is None
+
+    library_mirror.mark_synced()
+    assert library_mirror.playlists() == [playlist_1]
+    assert library_mirror.tracks(playlist_1.id) == playlist_1_tracks
+    assert library_mirror.nb_tracks(playlist_1.id) == len(playlist_1_tracks)
+    assert library_mirror.snapshots() == {playlist_1.id: "snapshot"}
+
+    with patch("chopin.client.cache.time.time", return_value=library_mirror.last_sync + 7200):
+        assert library_mirror.playlists() is None
+
+
+def test_library_mirror_keeps_playlist_order_and_added_at(library_mirror, playlist_1):
+    tracks = [track_data("b"), track_data("a"), track_data("b")]
+    tracks[1].added_at = date(2024, 1, 2)
+    library_mirror.set_playlists([playlist_1])
+    library_mirror.set_tracks(playlist_1.id, "snapshot", tracks)
+    library_mirror.mark_synced()
+    assert library_mirror.tracks(playlist_1.id) == tracks
+    assert (library_mirror.count("tracks"), library_mirror.count("albums"), library_mirror.count("artists")) == (
+        2,
+        2,
+        2,
+    )
+
+
+def test_library_mirror_removes_deleted_playlists(library_mirror, playlist_1, playlist_2, playlist_1_tracks):
+    library_mirror.set_playlists([playlist_1, playlist_2])
+    library_mirror.set_tracks(playlist_1.id, "snapshot", playlist_1_tracks)
+    library_mirror.set_playlists([playlist_2])
+    library_mirror.mark_synced()
+    assert library_mirror.playlists() == [playlist_2]
+    assert library_mirror.tracks(playlist_1.id) is None
+    assert library_mirror.count("tracks") == library_mirror.count("albums") == library_mirror.count("artists") == 0
+
+
+def test_library_mirror_invalidate(library_mirror, playlist_1, playlist_1_tracks):
+    library_mirror.set_playlists([playlist_1])
+    library_mirror.set_tracks(playlist_1.id, "snapshot", playlist_1_tracks)
+    library_mirror.mark_synced()
+    library_mirror.invalidate(playlist_1.id)
+    assert library_mirror.tracks(playlist_1.id) is None
+    assert library_mirror.snapshots() == {}
+
+
+def test_library_mirror_reads_tracks_in_chunks(library_mirror, playlist_1):
+    tracks = [track_data(str(i)) for i in range(5)]
+    library_mirror.set_playlists([playlist_1])
+    library_mirror.set_tracks(playlist_1.id, "snapshot", tracks)
+    library_mirror.mark_synced()
+    with patch.object(type(constants), "MIRROR_READ_CHUNK", 2):
+        assert list(library_mirror.iter_tracks(playlist_1.id)) == tracks
+    assert library_mirror.iter_tracks("unknown") is None
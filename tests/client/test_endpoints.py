@@ -1,18 +1,27 @@
 """Tests for chopin.client.endpoints."""
 
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from unittest.mock import patch
 
 import pytest
 
+from chopin.client.cache import LibraryMirror, LikesStore, disable_cache, disable_mirror, enable_cache, enable_mirror
 from chopin.client.endpoints import (
+    _TRACKS_ADAPTER,
     _validate_single_track,
     _validate_tracks,
     add_to_queue,
     add_tracks_to_playlist,
     create_user_playlist,
     get_album_tracks,
+    get_albums_tracks,
     get_artist_top_tracks,
+    get_coalescing_stats,
     get_current_user,
     get_currently_playing,
     get_likes,
@@ -22,10 +31,14 @@ from chopin.client.endpoints import (
     get_top_artists,
     get_top_tracks,
     get_user_playlists,
+    iter_playlist_tracks,
     like_tracks,
     replace_tracks_in_playlist,
     search_artist,
+    sync_library,
+    sync_likes,
 )
+from chopin.client.identity import interning
 from chopin.schemas.artist import ArtistData
 from chopin.schemas.playlist import PlaylistData
 from chopin.schemas.track import TrackData
@@ -267,6 +280,34 @@ def test_validate_tracks_keeps_valid(valid_track):
     assert isinstance(result[0], TrackData)
 
 
+def test_validate_tracks_skips_invalid_tracks_individually(caplog, valid_track, invalid_track):
+    valid_tracks = [{"track": dict(valid_track["track"], id=f"{i}")} for i in range(3)]
+    with (
+        patch("chopin.client.endpoints._TRACKS_ADAPTER", wraps=_TRACKS_ADAPTER) as mock_adapter,
+        patch("chopin.client.endpoints._validate_single_track", wraps=_validate_single_track) as mock_single,
+    ):
+        result = _validate_tracks([valid_tracks[0], invalid_track, {}, valid_tracks[1], invalid_track, valid_tracks[2]])
+    assert [track.id for track in result] == ["0", "1", "2"]
+    assert caplog.text.count("Error in track validation") == 2
+    # After the bulk validation failed, each item is validated once.
+    assert mock_adapter.validate_python.call_count == 1
+    assert mock_single.call_count == 5
+
+
+def test_validate_tracks_with_an_identity_map(valid_track, invalid_track):
+    items = [{"track": dict(valid_track["track"], id=f"{i}")} for i in range(3)]
+    with interning() as identity_map:
+        first = _validate_tracks([*items, invalid_track])
+        with patch("chopin.client.endpoints._TRACKS_ADAPTER", wraps=_TRACKS_ADAPTER) as mock_adapter:
+            second = _validate_tracks([items[2], items[0], invalid_track])
+    assert [track.id for track in first] == ["0", "1", "2"]
+    assert second[0] is first[2] and second[1] is first[0]
+    assert all(track.album is first[0].album for track in first)
+    # Only the invalid track is validated again.
+    assert [len(call.args[0]) for call in mock_adapter.validate_python.call_args_list] == [1]
+    assert identity_map.tracks.hits == 2
+
+
 # ---------------------------------------------------------------------------
 # User playlists
 # ---------------------------------------------------------------------------
@@ -292,6 +333,19 @@ def test_get_user_playlists(api_response, expected):
         assert get_user_playlists() == expected
 
 
+def test_get_user_playlists_paginates():
+    def _page(limit, offset):
+        items = [{"name": f"p{offset + i}", "id": f"{offset + i}", "uri": "uri"} for i in range(limit)]
+        return {"items": items[: 120 - offset], "total": 120}
+
+    get_user_playlists.cache_clear()
+    with patch("chopin.client.endpoints._client.current_user_playlists", side_effect=_page) as mock_playlists:
+        playlists = get_user_playlists()
+        get_user_playlists()
+    assert mock_playlists.call_count == 3
+    assert [playlist.id for playlist in playlists] == [str(i) for i in range(120)]
+
+
 @pytest.mark.parametrize("name, found", [("p", True), ("unknown", False)])
 def test_get_named_playlist(name, found, playlist_1, playlist_2):
     with patch("chopin.client.endpoints.get_user_playlists", return_value=[playlist_1, playlist_2]):
@@ -332,6 +386,310 @@ def test_get_playlist_tracks_with_release_date_range(spotify_track, release_date
     assert len(result) == expected_count
 
 
+def test_get_playlist_tracks_concurrent_keeps_playlist_order(spotify_track):
+    def _page(playlist_id, offset, **kwargs):
+        items = [{"added_at": None, "track": dict(spotify_track, id=f"{offset + i}")} for i in range(100)]
+        return {"items": items[: 250 - offset], "total": 250}
+
+    with patch("chopin.client.endpoints._client.playlist_items", side_effect=_page) as mock_items:
+        result = get_playlist_tracks("playlist_id", concurrent=True)
+    assert mock_items.call_count == 3
+    assert [track.id for track in result] == [str(i) for i in range(250)]
+
+
+def test_get_playlist_tracks_serial(spotify_track):
+    response = {"items": [{"added_at": None, "track": spotify_track}], "total": 1}
+    with patch("chopin.client.endpoints._client.playlist_items", side_effect=[response, {"items": []}]) as mock_items:
+        result = get_playlist_tracks("playlist_id", concurrent=False)
+    assert mock_items.call_count == 2
+    assert len(result) == 1
+
+
+def test_get_playlist_tracks_from_cache(tmp_path, spotify_track):
+    response = {"items": [{"added_at": None, "track": spotify_track}], "total": 1}
+    enable_cache(path=tmp_path / "cache.sqlite")
+    try:
+        with (
+            patch("chopin.client.endpoints._client.playlist", return_value={"snapshot_id": "snapshot"}),
+            patch("chopin.client.endpoints._client.playlist_items", return_value=response) as mock_items,
+        ):
+            first = get_playlist_tracks("playlist_id")
+            second = get_playlist_tracks("playlist_id")
+    finally:
+        disable_cache()
+    assert mock_items.call_count == 1
+    assert first == second
+
+
+@pytest.mark.parametrize(
+    "added_at_range, expected_count",
+    [
+        ((datetime(2023, 12, 1), datetime(2023, 12, 31)), 1),
+        ((datetime(2024, 1, 1), datetime.now()), 0),
+    ],
+)
+def test_get_playlist_tracks_with_added_at_range(spotify_track, added_at_range, expected_count):
+    response = {"items": [{"added_at": datetime(2023, 12, 12), "track": spotify_track}]}
+    with (
+        patch("chopin.client.endpoints._client.playlist_items", side_effect=[response, {"items": []}]),
+        patch("chopin.client.endpoints.TrackIndex") as mock_index,
+    ):
+        result = get_playlist_tracks("playlist_id", added_at_range=added_at_range)
+    assert len(result) == expected_count
+    # Fetched pages are filtered once, without an index.
+    mock_index.assert_not_called()
+
+
+def test_get_playlist_tracks_from_cache_reuses_index(tmp_path, spotify_track):
+    response = {"items": [{"added_at": None, "track": spotify_track}], "total": 1}
+    enable_cache(path=tmp_path / "cache.sqlite")
+    try:
+        with (
+            patch("chopin.client.endpoints._client.playlist", return_value={"snapshot_id": "snapshot"}),
+            patch("chopin.client.endpoints._client.playlist_items", return_value=response),
+        ):
+            get_playlist_tracks("playlist_id")
+            with patch("chopin.client.cache.PlaylistCache.get") as mock_get:
+                recent = get_playlist_tracks("playlist_id", release_date_range=(datetime(2000, 1, 1), datetime.now()))
+                old = get_playlist_tracks(
+                    "playlist_id", release_date_range=(datetime(1980, 1, 1), datetime(1990, 1, 1))
+                )
+    finally:
+        disable_cache()
+    mock_get.assert_not_called()
+    assert recent == []
+    assert len(old) == 1
+
+
+def _paginated_playlist(spotify_track, total, invalid=()):
+    def _page(playlist_id, offset, **kwargs):
+        items = [
+            {"added_at": None, "track": {} if offset + i in invalid else dict(spotify_track, id=f"{offset + i}")}
+            for i in range(min(100, total - offset))
+        ]
+        return {"items": items, "total": total}
+
+    return _page
+
+
+def test_get_playlist_tracks_sample_fetches_sampled_pages(spotify_track):
+    with (
+        patch("random.sample", side_effect=lambda population, k: list(population)[::-1][:k]),
+        patch(
+            "chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 250)
+        ) as mock_items,
+    ):
+        result = get_playlist_tracks("playlist_id", limit=10, sample=True)
+    assert [track.id for track in result] == [str(i) for i in range(249, 239, -1)]
+    assert sorted(call.kwargs["offset"] for call in mock_items.call_args_list) == [0, 200]
+
+
+def test_get_playlist_tracks_sample_draws_the_needed_positions(spotify_track):
+    with (
+        patch("random.sample", wraps=random.sample) as mock_sample,
+        patch("chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 250)),
+    ):
+        result = get_playlist_tracks("playlist_id", limit=10, sample=True)
+    assert len({track.id for track in result}) == 10
+    # The playlist is not permuted: only 10 positions are drawn.
+    assert [call.args[1] for call in mock_sample.call_args_list] == [10]
+
+
+def test_get_playlist_tracks_sample_tops_up_invalid_tracks(spotify_track):
+    page = _paginated_playlist(spotify_track, 250, invalid={249, 248})
+    with (
+        patch("random.sample", side_effect=lambda population, k: list(population)[::-1][:k]),
+        patch("chopin.client.endpoints._client.playlist_items", side_effect=page),
+    ):
+        result = get_playlist_tracks("playlist_id", limit=10, sample=True)
+    assert [track.id for track in result] == [str(i) for i in range(247, 237, -1)]
+
+
+def test_get_playlist_tracks_sample_whole_playlist(spotify_track):
+    with patch("chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 150)):
+        result = get_playlist_tracks("playlist_id", limit=500, sample=True)
+    assert sorted(int(track.id) for track in result) == list(range(150))
+
+
+def test_get_playlist_tracks_first_tracks_stops_early(spotify_track):
+    with patch(
+        "chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 250)
+    ) as mock_items:
+        result = get_playlist_tracks("playlist_id", limit=10)
+    assert mock_items.call_count == 1
+    assert [track.id for track in result] == [str(i) for i in range(10)]
+
+
+def test_get_playlist_tracks_limit_from_cache(tmp_path, spotify_track):
+    enable_cache(path=tmp_path / "cache.sqlite")
+    try:
+        with (
+            patch("chopin.client.endpoints._client.playlist", return_value={"snapshot_id": "snapshot"}),
+            patch(
+                "chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 150)
+            ) as mock_items,
+        ):
+            get_playlist_tracks("playlist_id")
+            first = get_playlist_tracks("playlist_id", limit=5)
+            sampled = get_playlist_tracks("playlist_id", limit=5, sample=True)
+    finally:
+        disable_cache()
+    assert mock_items.call_count == 2
+    assert [track.id for track in first] == [str(i) for i in range(5)]
+    assert len({track.id for track in sampled}) == 5
+
+
+def test_iter_playlist_tracks_reads_ahead_a_bounded_number_of_pages(spotify_track):
+    with patch(
+        "chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 1000)
+    ) as mock_items:
+        tracks = iter_playlist_tracks("playlist_id", read_ahead=2)
+        first_tracks = list(itertools.islice(tracks, 101))
+        tracks.close()
+    assert [track.id for track in first_tracks] == [str(i) for i in range(101)]
+    assert mock_items.call_count <= 4
+
+
+def test_iter_playlist_tracks_caches_complete_iterations(tmp_path, spotify_track):
+    enable_cache(path=tmp_path / "cache.sqlite")
+    try:
+        with (
+            patch("chopin.client.endpoints._client.playlist", return_value={"snapshot_id": "snapshot"}),
+            patch(
+                "chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 150)
+            ) as mock_items,
+        ):
+            next(iter_playlist_tracks("playlist_id"))
+            assert len(list(iter_playlist_tracks("playlist_id"))) == 150
+            assert len(list(iter_playlist_tracks("playlist_id"))) == 150
+    finally:
+        disable_cache()
+    assert mock_items.call_count == 3
+
+
+def test_get_playlist_tracks_preselect_validates_ranked_items(spotify_track):
+    page = _paginated_playlist(spotify_track, 250, invalid={249})
+    with (
+        patch("chopin.client.endpoints._client.playlist_items", side_effect=page),
+        patch("chopin.client.endpoints._validate_tracks", wraps=_validate_tracks) as mock_validate,
+    ):
+        result = get_playlist_tracks("playlist_id", limit=3, preselect=lambda items: list(items)[::-1])
+    assert [track.id for track in result] == ["248", "247", "246"]
+    assert sum(len(call.args[0]) for call in mock_validate.call_args_list) == 4
+
+
+def test_get_playlist_tracks_preselect_caches_the_playlist(tmp_path, spotify_track):
+    enable_cache(path=tmp_path / "cache.sqlite")
+    try:
+        with (
+            patch("chopin.client.endpoints._client.playlist", return_value={"snapshot_id": "snapshot"}),
+            patch(
+                "chopin.client.endpoints._client.playlist_items",
+                side_effect=_paginated_playlist(spotify_track, 150, invalid={149}),
+            ) as mock_items,
+        ):
+            first = get_playlist_tracks("playlist_id", limit=3, preselect=lambda items: list(items)[::-1])
+            second = get_playlist_tracks("playlist_id", limit=3, preselect=lambda items: list(items)[::-1])
+            cached = list(iter_playlist_tracks("playlist_id"))
+    finally:
+        disable_cache()
+    assert mock_items.call_count == 2
+    # A miss ranks the items of the validated playlist; a hit has no raw items, and is returned whole.
+    assert [track.id for track in first] == ["148", "147", "146"]
+    assert len(second) == len(cached) == 149
+
+
+def test_get_playlist_tracks_coalesces_identical_requests(spotify_track):
+    release = threading.Event()
+    page = _paginated_playlist(spotify_track, 150)
+
+    def _slow_page(playlist_id, offset, **kwargs):
+        release.wait(timeout=5)
+        return page(playlist_id, offset)
+
+    before = get_coalescing_stats()
+    with (
+        patch("chopin.client.endpoints._client.playlist_items", side_effect=_slow_page) as mock_items,
+        ThreadPoolExecutor(max_workers=2) as executor,
+    ):
+        futures = [executor.submit(get_playlist_tracks, "playlist_id") for _ in range(2)]
+        deadline = time.monotonic() + 5
+        while get_coalescing_stats().hits == before.hits and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        results = [future.result() for future in futures]
+    assert results[0] == results[1]
+    assert len(results[0]) == 150
+    assert mock_items.call_count < 4
+    assert get_coalescing_stats().hits > before.hits
+
+
+def test_sync_library(tmp_path, spotify_track):
+    def _playlists(snapshots):
+        items = [
+            {"name": f"P {id_}", "uri": f"spotify:playlist:{id_}", "id": id_, "snapshot_id": snapshot}
+            for id_, snapshot in snapshots.items()
+        ]
+        return {"items": items, "total": len(items)}
+
+    mirror = LibraryMirror(path=tmp_path / "library.sqlite")
+    with (
+        patch("chopin.client.endpoints._client.current_user_playlists", return_value=_playlists({"a": "1", "b": "1"})),
+        patch(
+            "chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 150)
+        ) as mock_items,
+    ):
+        assert {playlist.id for playlist in sync_library(mirror)} == {"a", "b"}
+        assert mock_items.call_count == 4
+
+    with (
+        patch("chopin.client.endpoints._client.current_user_playlists", return_value=_playlists({"a": "2"})),
+        patch(
+            "chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 50)
+        ) as mock_items,
+    ):
+        assert [playlist.id for playlist in sync_library(mirror)] == ["a"]
+        assert mock_items.call_count == 1
+    assert mirror.snapshots() == {"a": "2"}
+
+    enable_mirror(path=tmp_path / "library.sqlite")
+    try:
+        with patch("chopin.client.endpoints._client.playlist_items") as mock_items:
+            get_user_playlists.cache_clear()
+            assert [playlist.id for playlist in get_user_playlists()] == ["a"]
+            assert len(get_playlist_tracks("a")) == 50
+            assert len(get_playlist_tracks("spotify:playlist:a", limit=10)) == 10
+        mock_items.assert_not_called()
+    finally:
+        disable_mirror()
+        get_user_playlists.cache_clear()
+
+
+def test_sync_library_invalidates_failed_playlists(tmp_path, spotify_track):
+    playlists = {
+        "items": [{"name": "A", "uri": "spotify:playlist:a", "id": "a", "snapshot_id": "1"}],
+        "total": 1,
+    }
+    mirror = LibraryMirror(path=tmp_path / "library.sqlite")
+    with (
+        patch("chopin.client.endpoints._client.current_user_playlists", return_value=playlists),
+        patch("chopin.client.endpoints._client.playlist_items", side_effect=_paginated_playlist(spotify_track, 50)),
+    ):
+        sync_library(mirror)
+    assert mirror.nb_tracks("a") == 50
+
+    playlists["items"][0]["snapshot_id"] = "2"
+    with (
+        patch("chopin.client.endpoints._client.current_user_playlists", return_value=playlists),
+        patch("chopin.client.endpoints._client.playlist_items", side_effect=RuntimeError("unavailable")),
+    ):
+        assert sync_library(mirror) == []
+    # The mirror is fresh, but the outdated tracks of the failed playlist are not read.
+    assert mirror.is_fresh()
+    assert mirror.tracks("a") is None
+    assert mirror.snapshots() == {}
+
+
 def test_create_user_playlist():
     api_response = {"name": "My Playlist", "uri": "spotify:playlist:id", "id": "id"}
     with patch("chopin.client.endpoints._client.user_playlist_create", return_value=api_response):
@@ -354,16 +712,35 @@ def test_add_tracks_to_playlist(num_tracks, expected_calls):
     assert mock_add.call_count == expected_calls
 
 
-def test_replace_tracks_in_playlist(playlist_1_tracks):
-    new_ids = ["new_1", "new_2"]
+@pytest.mark.parametrize(
+    "new_ids, expected_replace, expected_add",
+    [
+        # Same content: no write call
+        ([f"p_{i}" for i in range(50)], None, []),
+        # Tracks appended: only the missing tracks are added
+        ([f"p_{i}" for i in range(50)] + ["new_1"], None, [["new_1"]]),
+        # Different content: the playlist content is replaced
+        (["new_1", "new_2"], ["new_1", "new_2"], []),
+        (
+            [f"new_{i}" for i in range(150)],
+            [f"new_{i}" for i in range(100)],
+            [[f"new_{i}" for i in range(100, 150)]],
+        ),
+        ([], [], []),
+    ],
+)
+def test_replace_tracks_in_playlist(playlist_1_tracks, new_ids, expected_replace, expected_add):
     with (
         patch("chopin.client.endpoints.get_playlist_tracks", return_value=playlist_1_tracks),
-        patch("chopin.client.endpoints._client.playlist_remove_all_occurrences_of_items") as mock_remove,
+        patch("chopin.client.endpoints._client.playlist_replace_items") as mock_replace,
         patch("chopin.client.endpoints._client.playlist_add_items") as mock_add,
     ):
         replace_tracks_in_playlist("playlist_id", new_ids)
-    mock_remove.assert_called()
-    mock_add.assert_called_with("playlist_id", new_ids)
+    if expected_replace is None:
+        mock_replace.assert_not_called()
+    else:
+        mock_replace.assert_called_once_with("playlist_id", expected_replace)
+    assert [call.args[1] for call in mock_add.call_args_list] == expected_add
 
 
 # ---------------------------------------------------------------------------
@@ -387,6 +764,42 @@ def test_get_likes(spotify_track):
     assert isinstance(result[0], TrackData)
 
 
+def test_get_likes_reads_through_the_likes_store(tmp_path, spotify_track):
+    response = {"items": [{"added_at": "2024-01-01T00:00:00Z", "track": spotify_track}], "total": 1}
+    enable_cache(path=tmp_path / "cache.sqlite")
+    try:
+        with patch("chopin.client.endpoints._client.current_user_saved_tracks", return_value=response) as mock_saved:
+            assert [track.id for track in get_likes()] == [spotify_track["id"]]
+            assert [track.id for track in get_likes()] == [spotify_track["id"]]
+    finally:
+        disable_cache()
+    # The first call fully synchronizes the store, the second only reads the first page, to find new likes.
+    assert mock_saved.call_count == 2
+    assert mock_saved.call_args.kwargs["offset"] == 0
+
+
+def test_sync_likes(tmp_path, spotify_track):
+    def _liked(id_, added_at):
+        return {"added_at": added_at, "track": dict(spotify_track, id=id_)}
+
+    store = LikesStore(path=tmp_path / "cache.sqlite")
+    full_response = {"items": [_liked("b", "2024-02-01")], "total": 2}
+    next_response = {"items": [_liked("a", "2024-01-01")], "total": 2}
+    with patch("chopin.client.endpoints._client.current_user_saved_tracks", side_effect=[full_response, next_response]):
+        assert [track.id for track in sync_likes(store)] == ["b", "a"]
+    assert len(full_response["items"]) == 1
+
+    incremental_response = {
+        "items": [_liked("c", "2024-03-01"), _liked("b", "2024-02-01"), _liked("a", "2024-01-01")],
+        "next": "next_page",
+    }
+    with patch(
+        "chopin.client.endpoints._client.current_user_saved_tracks", return_value=incremental_response
+    ) as mock_saved:
+        assert [track.id for track in sync_likes(store)] == ["c", "b", "a"]
+    mock_saved.assert_called_once()
+
+
 def test_add_to_queue(playlist_1_tracks):
     track = playlist_1_tracks[0]
     with patch("chopin.client.endpoints._client.add_to_queue") as mock_add:
@@ -442,3 +855,35 @@ def test_get_album_tracks(spotify_track):
         result = get_album_tracks("album_id")
     assert len(result) == 1
     assert isinstance(result[0], TrackData)
+
+
+def test_get_album_tracks_paginates(spotify_track):
+    pages = []
+
+    def _page(album_id, limit, offset):
+        items = [dict(spotify_track, id=f"{offset + i}") for i in range(min(limit, 60 - offset))]
+        pages.append({"items": items, "total": 60})
+        return pages[-1]
+
+    with patch("chopin.client.endpoints._client.album_tracks", side_effect=_page):
+        result = get_album_tracks("album_id")
+    assert [track.id for track in result] == [str(i) for i in range(60)]
+    # Pages may be shared by coalesced calls: they are left as received.
+    assert [len(page["items"]) for page in pages] == [50, 10]
+
+
+def test_get_albums_tracks(tmp_path, spotify_track):
+    def _albums(album_ids):
+        return {"albums": [{"id": id_, "tracks": {"items": [spotify_track], "total": 1}} for id_ in album_ids] + [None]}
+
+    album_ids = [f"album_{i}" for i in range(30)]
+    enable_cache(path=tmp_path / "cache.sqlite")
+    try:
+        with patch("chopin.client.endpoints._client.albums", side_effect=_albums) as mock_albums:
+            result = get_albums_tracks(album_ids + album_ids[:5])
+            get_albums_tracks(album_ids)
+    finally:
+        disable_cache()
+    assert mock_albums.call_count == 2
+    assert sorted(len(call.args[0]) for call in mock_albums.call_args_list) == [10, 20]
+    assert list(result) == album_ids
@@ -0,0 +1,124 @@
+"""Tests for chopin.client.identity."""
+
+import threading
+from contextvars import copy_context
+from datetime import date
+
+import pytest
+
+from chopin.client.identity import (
+    IdentityMap,
+    disable_identity_map,
+    enable_identity_map,
+    get_identity_map,
+    interning,
+)
+from tests.conftest import album_data, artist_data, track_data
+
+
+@pytest.fixture(autouse=True)
+def no_identity_map():
+    disable_identity_map()
+    yield
+    disable_identity_map()
+
+
+def _payload(track_id, added_at=None):
+    return {"id": track_id, "added_at": added_at}
+
+
+def test_identity_map_interns_tracks():
+    identity_map = IdentityMap()
+    assert identity_map.lookup(_payload("a")) is None
+    track = track_data("a")
+    assert identity_map.intern(_payload("a"), track) is track
+    assert identity_map.lookup(_payload("a")) is track
+    assert identity_map.intern(_payload("a"), track_data("a")) is track
+    assert (identity_map.tracks.hits, identity_map.tracks.misses) == (2, 1)
+    assert len(identity_map) == 1
+
+
+def test_identity_map_shares_tracks_added_at_other_dates():
+    identity_map = IdentityMap()
+    track = track_data("a")
+    track.album, track.artists = album_data("album"), [artist_data("artist")]
+    identity_map.intern(_payload("a"), track)
+    # A track added to another playlist at another date only differs by its date.
+    other = identity_map.lookup(_payload("a", "2024-01-01T00:00:00Z"))
+    assert other.added_at == date(2024, 1, 1) and track.added_at is None
+    assert other.album is track.album and other.artists is track.artists
+    assert identity_map.intern(_payload("a", "2024-02-01T00:00:00Z"), track_data("a")).added_at == date(2024, 2, 1)
+    assert (identity_map.tracks.hits, identity_map.tracks.misses) == (2, 1)
+    assert len(identity_map) == 1
+
+
+def test_identity_map_shares_albums_and_artists():
+    identity_map = IdentityMap()
+    tracks = [track_data(f"t_{i}") for i in range(4)]
+    for track in tracks:
+        track.album, track.artists = album_data("album"), [artist_data("artist"), artist_data("other")]
+    interned = [identity_map.intern(_payload(track.id), track) for track in tracks]
+    assert all(track.album is interned[0].album for track in interned)
+    assert all(track.artists[1] is interned[0].artists[1] for track in interned)
+    assert identity_map.albums.hit_rate == 0.75
+    assert (identity_map.artists.hits, identity_map.artists.misses) == (6, 2)
+    assert identity_map.report() == (
+        "tracks: 0% hits out of 4 reads, albums: 75% hits out of 4 reads, artists: 75% hits out of 8 reads"
+    )
+
+
+def test_identity_map_clear():
+    identity_map = IdentityMap()
+    identity_map.intern(_payload("a"), track_data("a"))
+    identity_map.clear()
+    assert identity_map.lookup(_payload("a")) is None
+    assert identity_map.tracks.misses == 0
+
+
+def test_interning_is_scoped_to_a_run():
+    assert get_identity_map() is None
+    with interning() as identity_map:
+        assert get_identity_map() is identity_map
+        with interning() as nested:
+            assert nested is identity_map
+        # Worker threads share the map of the run when they run in a copy of its context.
+        seen = []
+        worker = threading.Thread(target=copy_context().run, args=(lambda: seen.append(get_identity_map()),))
+        worker.start()
+        worker.join()
+        assert seen == [identity_map]
+    assert get_identity_map() is None
+
+
+def test_concurrent_runs_use_their_own_map():
+    entered, exited = threading.Barrier(2), threading.Event()
+    seen = {}
+
+    def _run(name):
+        with interning() as identity_map:
+            entered.wait(timeout=5)
+            if name == "short":
+                seen["short"] = identity_map
+            else:
+                # The other run ends first: this run keeps its own map.
+                exited.wait(timeout=5)
+                seen["long"] = (identity_map, get_identity_map())
+        if name == "short":
+            exited.set()
+
+    workers = [threading.Thread(target=_run, args=(name,)) for name in ("short", "long")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    long_map, current = seen["long"]
+    assert current is long_map
+    assert long_map is not seen["short"]
+
+
+def test_interning_uses_the_process_wide_map():
+    enable_identity_map()
+    identity_map = get_identity_map()
+    with interning() as run_map:
+        assert run_map is identity_map
+    assert get_identity_map() is identity_map
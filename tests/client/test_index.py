@@ -0,0 +1,88 @@
+from datetime import date, datetime
+
+import pytest
+
+from chopin.client.index import TrackIndex, TrackIndexCache
+from tests.conftest import track_data
+
+
+@pytest.fixture
+def dated_tracks():
+    tracks = []
+    for i, (released, added) in enumerate(
+        [
+            (date(2020, 5, 1), date(2024, 1, 3)),
+            (date(1999, 1, 1), date(2024, 1, 1)),
+            (date(2021, 1, 1), None),
+            (date(2020, 1, 1), date(2024, 1, 2)),
+        ]
+    ):
+        track = track_data(str(i))
+        track.album.release_date = released
+        track.added_at = added
+        tracks.append(track)
+    return tracks
+
+
+def test_track_index_without_range(dated_tracks):
+    assert TrackIndex(dated_tracks).query() == dated_tracks
+
+
+@pytest.mark.parametrize(
+    "release_date_range, expected_ids",
+    [
+        ((datetime(2020, 1, 1), datetime(2020, 12, 31)), ["0", "3"]),
+        ((date(2020, 5, 1), date(2021, 1, 1)), ["0", "2"]),  # bounds are included
+        ((datetime(2022, 1, 1), datetime(2023, 1, 1)), []),
+    ],
+)
+def test_track_index_release_date_range(dated_tracks, release_date_range, expected_ids):
+    result = TrackIndex(dated_tracks).query(release_date_range=release_date_range)
+    assert [track.id for track in result] == expected_ids
+
+
+def test_track_index_added_at_range_skips_undated_tracks(dated_tracks):
+    result = TrackIndex(dated_tracks).query(added_at_range=(datetime(2024, 1, 2), datetime(2024, 12, 31)))
+    assert [track.id for track in result] == ["0", "3"]
+
+
+def test_track_index_combined_ranges_keep_playlist_order(dated_tracks):
+    result = TrackIndex(dated_tracks).query(
+        release_date_range=(date(2000, 1, 1), date(2030, 1, 1)), added_at_range=(date(2024, 1, 1), date(2024, 1, 3))
+    )
+    assert [track.id for track in result] == ["0", "3"]
+
+
+def test_track_index_cache_loads_each_version_once(dated_tracks):
+    cache = TrackIndexCache(max_size=2)
+    loads = []
+
+    def _load():
+        loads.append(1)
+        return dated_tracks
+
+    first = cache.get("playlist", "snapshot", _load)
+    assert cache.get("playlist", "snapshot", _load) is first
+    assert len(loads) == 1
+    assert cache.get("playlist", "new_snapshot", _load) is not first
+    assert len(loads) == 2
+
+
+def test_track_index_cache_unavailable_tracks():
+    assert TrackIndexCache().get("playlist", "snapshot", lambda: None) is None
+
+
+def test_track_index_cache_evicts_least_recently_used(dated_tracks):
+    cache = TrackIndexCache(max_size=2)
+    first = cache.get("a", 1, lambda: dated_tracks)
+    cache.get("b", 1, lambda: dated_tracks)
+    cache.get("a", 1, lambda: None)
+    cache.get("c", 1, lambda: dated_tracks)
+    assert cache.get("a", 1, lambda: None) is first
+    assert cache.get("b", 1, lambda: None) is None
+
+
+def test_track_index_reads_the_tracks_once(dated_tracks):
+    index = TrackIndex(iter(dated_tracks))
+    assert len(index) == 4
+    assert index.query() == dated_tracks
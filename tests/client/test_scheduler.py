@@ -0,0 +1,65 @@
+"""Tests for chopin.client.scheduler."""
+
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from spotipy import SpotifyException
+
+from chopin.client.scheduler import RequestScheduler, ScheduledClient
+
+
+def _throttled(retry_after: str = "2") -> SpotifyException:
+    return SpotifyException(429, -1, "Too many requests", headers={"Retry-After": retry_after})
+
+
+@pytest.fixture
+def scheduler():
+    return RequestScheduler(rate=1000, burst=1000, max_concurrency=8, max_retries=2)
+
+
+def test_scheduler_call(scheduler):
+    assert scheduler.call(lambda x: x + 1, 1) == 2
+    assert scheduler.stats.calls == 1
+    assert scheduler.stats.throttled == 0
+
+
+def test_scheduler_retries_throttled_calls(scheduler):
+    fn = MagicMock(side_effect=[_throttled("0.05"), "ok"])
+    start = time.monotonic()
+    assert scheduler.call(fn) == "ok"
+    assert time.monotonic() - start >= 0.05
+    stats = scheduler.stats
+    assert (stats.calls, stats.throttled, stats.retried) == (2, 1, 1)
+    assert stats.concurrency == 4
+
+
+def test_scheduler_gives_up_after_max_retries(scheduler):
+    fn = MagicMock(side_effect=_throttled("0"))
+    with pytest.raises(SpotifyException):
+        scheduler.call(fn)
+    assert fn.call_count == 3
+
+
+def test_scheduler_does_not_retry_other_errors(scheduler):
+    fn = MagicMock(side_effect=SpotifyException(404, -1, "Not found"))
+    with pytest.raises(SpotifyException):
+        scheduler.call(fn)
+    assert fn.call_count == 1
+    assert scheduler.stats.throttled == 0
+
+
+def test_scheduler_raises_concurrency_back(scheduler):
+    scheduler.call(MagicMock(side_effect=[_throttled("0"), "ok"]))
+    for _ in range(4):
+        scheduler.call(lambda: None)
+    assert scheduler.stats.concurrency == 5
+
+
+def test_scheduled_client(scheduler):
+    client = MagicMock()
+    client.playlist_items.return_value = {"items": []}
+    scheduled_client = ScheduledClient(lambda: client, scheduler)
+    assert scheduled_client.playlist_items("playlist_id") == {"items": []}
+    client.playlist_items.assert_called_once_with("playlist_id")
+    assert scheduler.stats.calls == 1
@@ -0,0 +1,79 @@
+"""Tests for chopin.client.settings."""
+
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import spotipy
+from spotipy import SpotifyException
+
+from chopin.client.settings import _requests_session
+
+
+class _SpotifyAPI(ThreadingHTTPServer):
+    """Local HTTP server answering the queued responses, as (status, headers), then 200."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.responses: list[tuple[int, dict[str, str]]] = []
+        self.nb_requests = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _SpotifyAPI
+
+    def do_GET(self):
+        self.server.nb_requests += 1
+        status, headers = self.server.responses.pop(0) if self.server.responses else (200, {})
+        body = b'{"error": {"status": %d, "message": "error"}}' % status if status >= 400 else b'{"id": "track"}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api() -> Iterator[_SpotifyAPI]:
+    server = _SpotifyAPI()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(api) -> spotipy.Spotify:
+    client = spotipy.Spotify(auth="token", requests_session=_requests_session(backoff_factor=0))
+    client.prefix = f"http://127.0.0.1:{api.server_address[1]}/"
+    return client
+
+
+def test_throttled_calls_are_not_retried_by_the_session(api, client):
+    api.responses = [(429, {"Retry-After": "7"})]
+    with pytest.raises(SpotifyException) as error:
+        client.track("track")
+    assert error.value.http_status == 429
+    assert error.value.headers["Retry-After"] == "7"
+    assert api.nb_requests == 1
+
+
+def test_server_errors_are_retried_by_the_session(api, client):
+    api.responses = [(503, {}), (502, {})]
+    assert client.track("track") == {"id": "track"}
+    assert api.nb_requests == 3
+
+
+def test_server_errors_keep_their_status_after_the_last_retry(api, client):
+    api.responses = [(503, {})] * 4
+    with pytest.raises(SpotifyException) as error:
+        client.track("track")
+    assert error.value.http_status == 503
+    assert api.nb_requests == 4
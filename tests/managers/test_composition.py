@@ -1,7 +1,10 @@
+from datetime import date
 from unittest.mock import patch
 
-from chopin.managers.composition import compose_playlist
+from chopin.client.identity import get_identity_map
+from chopin.managers.composition import compose_playlist, nb_candidates
 from chopin.schemas.composer import ComposerConfig, ComposerConfigItem, ComposerConfigListeningHistory
+from chopin.tools.dates import get_reference_date
 
 
 @patch("chopin.managers.playlist.get_playlist_tracks")
@@ -18,13 +21,38 @@ def test_playlist_compose_from_playlists(
         nb_songs=20, playlists=[ComposerConfigItem(name="p", weight=1), ComposerConfigItem(name="q", weight=1)]
     )
     mock_get_playlists.return_value = [playlist_1, playlist_2]
-    mock_get_tracks.side_effect = [playlist_1_tracks, playlist_2_tracks]
+    mock_get_tracks.side_effect = lambda playlist_id, **kwargs: {
+        playlist_1.id: playlist_1_tracks,
+        playlist_2.id: playlist_2_tracks,
+    }[playlist_id]
 
     tracks = compose_playlist(composition_config=configuration)
     assert len(tracks) == 20
     assert len([t for t in tracks if t.id.startswith("p")]) == len([t for t in tracks if t.id.startswith("q")]) == 10
 
 
+@patch("chopin.managers.playlist.get_playlist_tracks")
+@patch("chopin.managers.composition.get_user_playlists")
+def test_playlist_compose_items_share_an_identity_map(
+    mock_get_playlists, mock_get_tracks, playlist_1, playlist_2, playlist_1_tracks, playlist_2_tracks
+):
+    configuration = ComposerConfig(
+        nb_songs=20, playlists=[ComposerConfigItem(name="p", weight=1), ComposerConfigItem(name="q", weight=1)]
+    )
+    mock_get_playlists.return_value = [playlist_1, playlist_2]
+    identity_maps = []
+
+    def _get_tracks(playlist_id, **kwargs):
+        identity_maps.append(get_identity_map())
+        return {playlist_1.id: playlist_1_tracks, playlist_2.id: playlist_2_tracks}[playlist_id]
+
+    mock_get_tracks.side_effect = _get_tracks
+    compose_playlist(composition_config=configuration)
+    assert len(identity_maps) == 2
+    assert identity_maps[0] is not None and identity_maps[0] is identity_maps[1]
+    assert get_identity_map() is None
+
+
 @patch("chopin.managers.playlist.get_playlist_tracks")
 @patch("chopin.managers.composition.get_user_playlists")
 def test_playlist_compose_from_playlists_with_different_weights(
@@ -39,7 +67,10 @@ def test_playlist_compose_from_playlists_with_different_weights(
         nb_songs=20, playlists=[ComposerConfigItem(name="p", weight=1), ComposerConfigItem(name="q", weight=0.2)]
     )
     mock_get_playlists.return_value = [playlist_1, playlist_2]
-    mock_get_tracks.side_effect = [playlist_1_tracks, playlist_2_tracks]
+    mock_get_tracks.side_effect = lambda playlist_id, **kwargs: {
+        playlist_1.id: playlist_1_tracks,
+        playlist_2.id: playlist_2_tracks,
+    }[playlist_id]
 
     tracks = compose_playlist(composition_config=configuration)
     assert len(tracks) == 21
@@ -58,7 +89,7 @@ def test_playlist_compose_from_history(
     mock_get_history_tracks.side_effect = [playlist_1_tracks]
 
     tracks = compose_playlist(composition_config=configuration)
-    assert mock_get_history_tracks.call_args[1]["limit"] == 20
+    assert mock_get_history_tracks.call_args[1]["limit"] == nb_candidates(20)
     assert all([t.id.startswith("p") for t in tracks])
 
 
@@ -66,3 +97,140 @@ def test_playlist_compose_with_empty_playlists():
     configuration = ComposerConfig(nb_songs=20, playlists=[])
     tracks = compose_playlist(configuration)
     assert len(tracks) == 0
+
+
+@patch("chopin.managers.playlist.get_playlist_tracks")
+@patch("chopin.managers.composition.get_user_playlists")
+def test_playlist_compose_is_deterministic_given_a_seed(
+    mock_get_playlists,
+    mock_get_tracks,
+    playlist_1,
+    playlist_2,
+    playlist_1_tracks,
+    playlist_2_tracks,
+):
+    configuration = ComposerConfig(
+        nb_songs=20, playlists=[ComposerConfigItem(name="p", weight=1), ComposerConfigItem(name="q", weight=1)]
+    )
+    mock_get_playlists.return_value = [playlist_1, playlist_2]
+    mock_get_tracks.side_effect = lambda playlist_id, **kwargs: {
+        playlist_1.id: playlist_1_tracks,
+        playlist_2.id: playlist_2_tracks,
+    }[playlist_id]
+
+    compositions = [[track.id for track in compose_playlist(configuration, seed=42)] for _ in range(5)]
+    assert all(composition == compositions[0] for composition in compositions)
+    assert [track.id for track in compose_playlist(configuration, seed=43)] != compositions[0]
+
+    # The seed of the configuration is used when no seed is given.
+    configuration.seed = 42
+    assert [track.id for track in compose_playlist(configuration)] == compositions[0]
+
+
+@patch("chopin.managers.playlist.get_playlist_tracks")
+@patch("chopin.managers.composition.get_user_playlists")
+def test_playlist_compose_isolates_failing_items(
+    mock_get_playlists, mock_get_tracks, caplog, playlist_1, playlist_2, playlist_2_tracks
+):
+    configuration = ComposerConfig(
+        nb_songs=20, playlists=[ComposerConfigItem(name="p", weight=1), ComposerConfigItem(name="q", weight=1)]
+    )
+    mock_get_playlists.return_value = [playlist_1, playlist_2]
+
+    def _get_tracks(playlist_id, **kwargs):
+        if playlist_id == playlist_1.id:
+            raise RuntimeError("API error")
+        return playlist_2_tracks
+
+    mock_get_tracks.side_effect = _get_tracks
+
+    tracks = compose_playlist(configuration)
+    assert len(tracks) == 10
+    assert all(track.id.startswith("q") for track in tracks)
+    assert "API error" in caplog.text
+
+
+@patch("chopin.managers.playlist.get_playlist_tracks")
+@patch("chopin.managers.composition.get_user_playlists")
+def test_playlist_compose_backfills_duplicates(
+    mock_get_playlists, mock_get_tracks, playlist_1, playlist_2, playlist_1_tracks, playlist_2_tracks
+):
+    configuration = ComposerConfig(
+        nb_songs=20,
+        playlists=[
+            ComposerConfigItem(name="p", weight=1, selection_method="original"),
+            ComposerConfigItem(name="q", weight=1, selection_method="original"),
+        ],
+    )
+    mock_get_playlists.return_value = [playlist_1, playlist_2]
+    # The second playlist starts with the tracks the first one picks.
+    mock_get_tracks.side_effect = lambda playlist_id, **kwargs: {
+        playlist_1.id: playlist_1_tracks,
+        playlist_2.id: playlist_1_tracks[:5] + playlist_2_tracks,
+    }[playlist_id]
+
+    tracks = compose_playlist(composition_config=configuration)
+    assert len(tracks) == len({track.id for track in tracks}) == 20
+    assert {track.id for track in tracks if track.id.startswith("q")} == {t.id for t in playlist_2_tracks[:10]}
+
+
+@patch("chopin.managers.playlist.get_playlist_tracks")
+@patch("chopin.managers.composition.get_user_playlists")
+def test_playlist_compose_with_exhausted_candidates(mock_get_playlists, mock_get_tracks, playlist_1, playlist_1_tracks):
+    configuration = ComposerConfig(
+        nb_songs=20, playlists=[ComposerConfigItem(name="p", weight=1), ComposerConfigItem(name="p", weight=1)]
+    )
+    mock_get_playlists.return_value = [playlist_1]
+    mock_get_tracks.return_value = playlist_1_tracks[:12]
+
+    tracks = compose_playlist(composition_config=configuration)
+    assert sorted(track.id for track in tracks) == sorted(track.id for track in playlist_1_tracks[:12])
+
+
+@patch("chopin.managers.playlist.get_playlist_tracks")
+@patch("chopin.managers.composition.get_user_playlists")
+def test_playlist_compose_with_artist_limits(
+    mock_get_playlists, mock_get_tracks, playlist_1, playlist_2, playlist_1_tracks, playlist_2_tracks
+):
+    # Both playlists share their artists.
+    for i, track in enumerate(playlist_1_tracks + playlist_2_tracks):
+        track.artists[0].id = f"artist_{i % 5}"
+    configuration = ComposerConfig(
+        nb_songs=10,
+        max_per_artist=2,
+        playlists=[
+            ComposerConfigItem(name="p", weight=1, selection_method="original"),
+            ComposerConfigItem(name="q", weight=1, selection_method="original"),
+        ],
+    )
+    mock_get_playlists.return_value = [playlist_1, playlist_2]
+    mock_get_tracks.side_effect = lambda playlist_id, **kwargs: {
+        playlist_1.id: playlist_1_tracks,
+        playlist_2.id: playlist_2_tracks,
+    }[playlist_id]
+
+    tracks = compose_playlist(composition_config=configuration)
+    artists = [track.artists[0].id for track in tracks]
+    assert len(tracks) == 10
+    assert all(artists.count(artist) == 2 for artist in set(artists))
+
+
+@patch("chopin.managers.playlist.get_playlist_tracks")
+@patch("chopin.managers.composition.get_user_playlists")
+def test_playlist_compose_items_share_the_reference_date(
+    mock_get_playlists, mock_get_tracks, playlist_1, playlist_2, playlist_1_tracks
+):
+    configuration = ComposerConfig(
+        nb_songs=20, playlists=[ComposerConfigItem(name="p", weight=1), ComposerConfigItem(name="q", weight=1)]
+    )
+    mock_get_playlists.return_value = [playlist_1, playlist_2]
+    reference_dates = []
+
+    def _get_tracks(playlist_id, **kwargs):
+        reference_dates.append(get_reference_date())
+        return playlist_1_tracks
+
+    mock_get_tracks.side_effect = _get_tracks
+    compose_playlist(configuration, seed=42, reference_date=date(2020, 2, 29))
+    assert reference_dates == [date(2020, 2, 29)] * 2
+    assert get_reference_date() == date.today()
@@ -0,0 +1,143 @@
+from datetime import date
+
+import pytest
+
+from chopin.managers.engine import (
+    CandidatePool,
+    select_with_limits,
+    stream_first,
+    stream_sample,
+    stream_top,
+    stream_weighted_sample,
+)
+from chopin.tools.randomness import seeded
+
+
+@pytest.fixture
+def pool(playlist_1_tracks):
+    for i, track in enumerate(playlist_1_tracks):
+        track.popularity = i % 7
+        track.album.release_date = date(2000 + i % 11, 1, 1)
+    return CandidatePool(playlist_1_tracks)
+
+
+@pytest.mark.parametrize("nb_tracks", [0, 5, 1000])
+def test_candidate_pool_top_matches_a_stable_sort(pool, nb_tracks):
+    for keys, key in [
+        (pool.popularity, lambda track: track.popularity),
+        (pool.release_ordinal, lambda track: track.album.release_date),
+    ]:
+        assert pool.top(keys, nb_tracks) == sorted(pool.tracks, key=key, reverse=True)[:nb_tracks]
+
+
+def test_candidate_pool_named_selections(pool):
+    assert pool.most_popular(3) == pool.top(pool.popularity, 3)
+    assert pool.latest(3) == pool.top(pool.release_ordinal, 3)
+    assert pool.first(3) == pool.tracks[:3]
+
+
+def test_candidate_pool_missing_fields(playlist_1_tracks):
+    playlist_1_tracks[0].album = None
+    playlist_1_tracks[1].popularity = None
+    pool = CandidatePool(playlist_1_tracks[:2])
+    assert pool.release_ordinal[0] == 0
+    assert pool.popularity[1] == 0
+
+
+def test_candidate_pool_sample(pool):
+    with seeded(1):
+        first = pool.sample(10)
+    with seeded(1):
+        second = pool.sample(10)
+    assert first == second
+    assert len({track.id for track in first}) == 10
+    assert len(pool.sample(1000)) == len(pool)
+    assert pool.sample(0) == []
+
+
+def test_candidate_pool_empty():
+    pool = CandidatePool([])
+    assert pool.most_popular(5) == pool.sample(5) == pool.first(5) == []
+
+
+def _source(nb_items, fail_after=None):
+    for i in range(nb_items):
+        if i == fail_after:
+            raise AssertionError("item read after the selection was complete")
+        yield i
+
+
+@pytest.mark.parametrize("nb_items", [0, 3, 100])
+def test_stream_top_matches_a_stable_sort(nb_items):
+    assert (
+        stream_top(_source(20), nb_items, key=lambda i: i % 4)
+        == sorted(range(20), key=lambda i: i % 4, reverse=True)[:nb_items]
+    )
+
+
+def test_stream_sample():
+    with seeded(3):
+        first = stream_sample(_source(100), 10)
+    with seeded(3):
+        second = stream_sample(_source(100), 10)
+    assert first == second
+    assert len(set(first)) == 10
+    assert sorted(stream_sample(_source(5), 10)) == list(range(5))
+    assert stream_sample(_source(5), 0) == []
+
+
+def test_stream_sample_is_uniform():
+    counts = [0] * 10
+    with seeded(0):
+        for _ in range(2000):
+            for item in stream_sample(_source(10), 2):
+                counts[item] += 1
+    assert all(300 < count < 500 for count in counts)
+
+
+def test_stream_first_stops_reading():
+    assert stream_first(_source(100, fail_after=5), 5) == list(range(5))
+
+
+def test_stream_weighted_sample_favors_heavy_items():
+    counts = [0] * 4
+    with seeded(0):
+        for _ in range(2000):
+            for item in stream_weighted_sample(_source(4), 1, weight=lambda i: [1, 1, 2, 4][i]):
+                counts[item] += 1
+    # Expected frequencies: 1/8, 1/8, 2/8 and 4/8.
+    assert [count / 2000 for count in counts] == pytest.approx([0.125, 0.125, 0.25, 0.5], abs=0.05)
+
+
+def test_stream_weighted_sample_without_replacement():
+    with seeded(0):
+        selection = stream_weighted_sample(_source(10), 10, weight=lambda i: i)
+    assert sorted(selection) == list(range(10))
+    # The item with no weight is only selected last.
+    assert selection[-1] == 0
+
+
+def test_select_with_limits():
+    # Items are (key, artist), the first artist has the highest keys.
+    items = [(10 - i, "a" if i < 5 else "b") for i in range(10)]
+    selection = select_with_limits(
+        items, 4, key=lambda item: item[0], groups=lambda item: [("artist", item[1])], limits={"artist": 2}
+    )
+    assert selection == [(10, "a"), (9, "a"), (5, "b"), (4, "b")]
+
+
+def test_select_with_limits_ignores_unlimited_groups():
+    items = [(i % 3, i) for i in range(9)]
+    selection = select_with_limits(
+        items, 9, key=lambda item: item[0], groups=lambda item: [("album", "same")], limits={"artist": 1}
+    )
+    assert selection == sorted(items, key=lambda item: item[0], reverse=True)
+
+
+def test_select_with_limits_on_several_groups():
+    # A track counts for each of its artists.
+    items = [("ab", 3), ("a", 2), ("b", 1), ("c", 0)]
+    selection = select_with_limits(
+        items, 4, key=lambda item: item[1], groups=lambda item: [("artist", a) for a in item[0]], limits={"artist": 1}
+    )
+    assert selection == [("ab", 3), ("c", 0)]
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+import pytest
+
+from chopin.client.cache import (
+    disable_cache,
+    disable_mirror,
+    enable_cache,
+    enable_mirror,
+    get_library_mirror,
+    get_playlist_cache,
+)
+from chopin.managers.planning import _estimate_pages, plan_composition
+from chopin.managers.selection import SelectionMethod
+from chopin.schemas.composer import ComposerConfig, ComposerConfigItem, ComposerConfigListeningHistory
+
+
+@pytest.mark.parametrize(
+    "nb_tracks, nb_songs, selection_method, expected_pages",
+    [
+        (3000, 10, SelectionMethod.ORIGINAL, 1),
+        (3000, 150, SelectionMethod.ORIGINAL, 2),
+        (3000, 10, SelectionMethod.POPULARITY, 30),
+        (3000, 10, SelectionMethod.LATEST, 30),
+        (3000, 10, SelectionMethod.RANDOM, 10),
+        (3000, 1000, SelectionMethod.RANDOM, 30),
+        (50, 10, None, 1),
+        (0, 10, SelectionMethod.RANDOM, 1),
+    ],
+)
+def test_estimate_pages(nb_tracks, nb_songs, selection_method, expected_pages):
+    assert _estimate_pages(nb_tracks, nb_songs, selection_method) == expected_pages
+
+
+@patch("chopin.managers.planning.get_playlist_total")
+@patch("chopin.managers.planning.get_user_playlists")
+def test_plan_composition(mock_get_playlists, mock_get_total, playlist_1, playlist_2):
+    configuration = ComposerConfig(
+        nb_songs=30,
+        playlists=[
+            ComposerConfigItem(name="p", selection_method="popularity"),
+            ComposerConfigItem(name="unknown"),
+        ],
+        uris=[ComposerConfigItem(name="spotify:playlist:q", selection_method="original")],
+        history=[ComposerConfigListeningHistory(time_range="short_term")],
+    )
+    mock_get_playlists.return_value = [playlist_1, playlist_2]
+    mock_get_total.return_value = (950, "snapshot")
+
+    plan = plan_composition(configuration)
+
+    assert [(item.source, item.name, item.resolved, item.pages) for item in plan.items] == [
+        ("playlists", "p", True, 10),
+        ("playlists", "unknown", False, 0),
+        ("history", "short_term", True, 1),
+        ("uris", "spotify:playlist:q", True, 1),
+    ]
+    assert plan.calls == plan.pages == 12
+    assert plan.latency >= max(item.latency for item in plan.items)
+    assert "not found" in str(plan)
+    mock_get_total.assert_any_call("spotify:playlist:q")
+    assert mock_get_total.call_count == 2
+
+
+@patch("chopin.managers.planning.get_playlist_total", return_value=(950, "snapshot"))
+@patch("chopin.managers.planning.get_user_playlists")
+def test_plan_composition_with_cached_playlist(
+    mock_get_playlists, mock_get_total, tmp_path, playlist_1, playlist_1_tracks
+):
+    configuration = ComposerConfig(nb_songs=10, playlists=[ComposerConfigItem(name="p", selection_method="latest")])
+    mock_get_playlists.return_value = [playlist_1]
+    enable_cache(path=tmp_path / "cache.sqlite")
+    try:
+        get_playlist_cache().set(playlist_1.id, "snapshot", playlist_1_tracks)
+        plan = plan_composition(configuration)
+    finally:
+        disable_cache()
+    assert plan.items[0].cached
+    assert (plan.items[0].pages, plan.items[0].calls) == (0, 1)
+
+
+@patch("chopin.managers.planning.get_playlist_total", return_value=(950, "snapshot"))
+@patch("chopin.managers.planning.get_user_playlists")
+def test_plan_composition_with_mirrored_playlist(
+    mock_get_playlists, mock_get_total, tmp_path, playlist_1, playlist_2, playlist_1_tracks
+):
+    configuration = ComposerConfig(
+        nb_songs=10,
+        playlists=[
+            ComposerConfigItem(name="p", selection_method="latest"),
+            ComposerConfigItem(name="q", selection_method="latest"),
+        ],
+    )
+    mock_get_playlists.return_value = [playlist_1, playlist_2]
+    enable_cache(path=tmp_path / "cache.sqlite")
+    enable_mirror(path=tmp_path / "library.sqlite", max_staleness=3600)
+    try:
+        mirror = get_library_mirror()
+        mirror.set_playlists([playlist_1, playlist_2])
+        mirror.set_tracks(playlist_1.id, "snapshot", playlist_1_tracks)
+        mirror.mark_synced()
+        plan = plan_composition(configuration)
+    finally:
+        disable_mirror()
+        disable_cache()
+    mirrored, fetched = plan.items
+    assert mirrored.mirrored and mirrored.nb_tracks == len(playlist_1_tracks)
+    assert (mirrored.pages, mirrored.calls, mirrored.bytes, mirrored.latency) == (0, 0, 0, 0.0)
+    assert not fetched.mirrored and fetched.calls == 11
+    mock_get_total.assert_called_once_with(playlist_2.id)
+    assert "mirrored" in str(plan)
@@ -1,9 +1,21 @@
+from datetime import date
 from unittest.mock import patch
 
 import pytest
 
-from chopin.managers.playlist import create, create_playlist, doppelganger_playlist, dump, tracks_from_playlist_name
+from chopin.client.cache import disable_mirror, enable_mirror, get_library_mirror
+from chopin.managers.playlist import (
+    create,
+    create_playlist,
+    doppelganger_playlist,
+    dump,
+    fill,
+    shuffle_playlist,
+    tracks_from_playlist_name,
+    tracks_from_playlist_uri,
+)
 from chopin.schemas.playlist import PlaylistData, PlaylistSummary
+from chopin.schemas.selection import SelectionLimits
 
 
 @patch("chopin.managers.playlist.get_user_playlists")
@@ -60,13 +72,13 @@ def test_create_playlist(spotify_playlist, spotify_user):
 
 @patch("chopin.managers.playlist.get_named_playlist")
 @patch("chopin.managers.playlist.get_playlist_tracks")
-@patch("chopin.managers.playlist.get_album_tracks")
+@patch("chopin.managers.playlist.get_albums_tracks")
 @patch("chopin.managers.playlist.create")
 @patch("chopin.managers.playlist.fill")
 def test_doppelganger_playlist(
     mock_fill,
     mock_create,
-    mock_get_album_tracks,
+    mock_get_albums_tracks,
     mock_get_playlist_tracks,
     mock_get_named_playlist,
     playlist_1,
@@ -75,7 +87,7 @@ def test_doppelganger_playlist(
 ):
     mock_get_named_playlist.return_value = playlist_1
     mock_get_playlist_tracks.return_value = playlist_1_tracks
-    mock_get_album_tracks.return_value = album_tracks
+    mock_get_albums_tracks.side_effect = lambda album_ids: {album_id: album_tracks for album_id in album_ids}
 
     doppelganger_playlist(source_playlist="Playlist 1", new_playlist="Playlist 2")
 
@@ -103,3 +115,105 @@ def test_doppelganger_playlist_empty(mock_create, mock_get_playlist_tracks, mock
     mock_get_named_playlist.assert_called_once_with("Playlist 1")
     mock_get_playlist_tracks.assert_called_once_with(playlist_1.id)
     mock_create.assert_not_called()
+
+
+@patch("chopin.managers.playlist.add_tracks_to_playlist")
+def test_fill_removes_duplicates_and_keeps_order(mock_add_tracks, playlist_1_tracks):
+    tracks = playlist_1_tracks[:3] + playlist_1_tracks[1:2] + playlist_1_tracks[:1]
+    fill(uri="uri", tracks=tracks)
+    mock_add_tracks.assert_called_once_with("uri", [track.id for track in playlist_1_tracks[:3]])
+
+
+@patch("chopin.managers.playlist.get_named_playlist")
+@patch("chopin.managers.playlist.get_playlist_tracks")
+@patch("chopin.managers.playlist.get_albums_tracks")
+@patch("chopin.managers.playlist.create")
+@patch("chopin.managers.playlist.fill")
+def test_doppelganger_playlist_is_deterministic_given_a_seed(
+    mock_fill,
+    mock_create,
+    mock_get_albums_tracks,
+    mock_get_playlist_tracks,
+    mock_get_named_playlist,
+    playlist_1,
+    playlist_1_tracks,
+    album_tracks,
+):
+    mock_get_named_playlist.return_value = playlist_1
+    mock_get_playlist_tracks.return_value = playlist_1_tracks
+    mock_get_albums_tracks.side_effect = lambda album_ids: {album_id: album_tracks for album_id in album_ids}
+
+    selections = []
+    for seed in (1, 1, 2):
+        doppelganger_playlist(source_playlist="Playlist 1", new_playlist="Playlist 2", seed=seed)
+        selections.append([track.id for track in mock_fill.call_args[1]["tracks"]])
+    assert selections[0] == selections[1] != selections[2]
+
+
+@patch("chopin.managers.playlist.get_named_playlist")
+@patch("chopin.managers.playlist.get_playlist_tracks")
+@patch("chopin.managers.playlist.replace_tracks_in_playlist")
+def test_shuffle_playlist_is_deterministic_given_a_seed(
+    mock_replace_tracks, mock_get_playlist_tracks, mock_get_named_playlist, playlist_1, playlist_1_tracks
+):
+    mock_get_named_playlist.return_value = playlist_1
+    mock_get_playlist_tracks.return_value = playlist_1_tracks
+
+    shuffles = []
+    for seed in (1, 1, 2):
+        shuffle_playlist("Playlist 1", seed=seed)
+        shuffles.append(mock_replace_tracks.call_args[1]["track_ids"])
+    assert shuffles[0] == shuffles[1] != shuffles[2]
+    assert sorted(shuffles[0]) == sorted(track.id for track in playlist_1_tracks)
+
+
+@patch("chopin.managers.playlist.get_named_playlist")
+@patch("chopin.managers.playlist.replace_tracks_in_playlist")
+def test_shuffle_playlist_ignores_a_stale_mirror(
+    mock_replace_tracks, mock_get_named_playlist, tmp_path, spotify_track, playlist_1, playlist_1_tracks
+):
+    mock_get_named_playlist.return_value = playlist_1
+    enable_mirror(path=tmp_path / "library.sqlite", max_staleness=3600)
+    try:
+        # The mirror was synced before a third track was added to the playlist.
+        mirror = get_library_mirror()
+        mirror.set_playlists([playlist_1])
+        mirror.set_tracks(playlist_1.id, "snapshot", playlist_1_tracks[:2])
+        mirror.mark_synced()
+        items = [{"added_at": None, "track": dict(spotify_track, id=track.id)} for track in playlist_1_tracks[:3]]
+        with patch("chopin.client.endpoints._client.playlist_items", return_value={"items": items, "total": 3}):
+            shuffle_playlist("Playlist 1", seed=0)
+    finally:
+        disable_mirror()
+    assert sorted(mock_replace_tracks.call_args[1]["track_ids"]) == sorted(track.id for track in playlist_1_tracks[:3])
+
+
+@pytest.mark.parametrize(
+    "selection_method, selection_limits",
+    [("popularity", None), ("weighted", None), ("latest", SelectionLimits(max_per_album=1))],
+)
+def test_tracks_from_playlist_uri_with_a_release_range(spotify_track, selection_method, selection_limits):
+    # Out of range tracks are the most popular and the latest: a bounded preselection would only keep them.
+    def _page(playlist_id, offset, **kwargs):
+        items = []
+        for i in range(offset, min(offset + 100, 500)):
+            in_range = i % 2 == 0
+            album = dict(spotify_track["album"], id=f"album_{i}", release_date="2020-06" if in_range else "2024-06")
+            items.append(
+                {
+                    "added_at": None,
+                    "track": dict(spotify_track, id=f"{i}", popularity=i % 50 + 50 * (not in_range), album=album),
+                }
+            )
+        return {"items": items, "total": 500}
+
+    with patch("chopin.client.endpoints._client.playlist_items", side_effect=_page):
+        tracks = tracks_from_playlist_uri(
+            playlist_uri="playlist_id",
+            nb_tracks=10,
+            release_range=(date(2020, 1, 1), date(2020, 12, 31)),
+            selection_method=selection_method,
+            selection_limits=selection_limits,
+        )
+    assert len(tracks) == 10
+    assert all(int(track.id) % 2 == 0 for track in tracks)
@@ -3,13 +3,19 @@ from datetime import date
 import pytest
 
 from chopin.managers.selection import (
+    PRESELECTION_MAPPER,
     SELECTION_MAPPER,
     SelectionMethod,
     _select_latest_tracks,
     _select_original_tracks,
     _select_popular_tracks,
     _select_random_tracks,
+    preselect_items,
+    select_tracks,
 )
+from chopin.schemas.selection import SelectionLimits, SelectionWeights
+from chopin.schemas.track import TrackData
+from chopin.tools.randomness import seeded
 
 
 def test__select_random_tracks(playlist_1_tracks):
@@ -136,3 +142,127 @@ def test__select_original_tracks_empty_list():
 
 def test_all_methods_are_mapped():
     assert [key.name for key in SELECTION_MAPPER.keys()] == SelectionMethod._member_names_
+    assert [key.name for key in PRESELECTION_MAPPER.keys()] == SelectionMethod._member_names_
+
+
+def _raw_item(id_, popularity, release_date):
+    return {"track": {"id": id_, "popularity": popularity, "album": {"release_date": release_date}}}
+
+
+@pytest.mark.parametrize(
+    "selection_method, expected_ids",
+    [
+        (SelectionMethod.POPULARITY, ["b", "d", "a", "c"]),
+        (SelectionMethod.LATEST, ["c", "b", "d", "a"]),
+        (SelectionMethod.ORIGINAL, ["a", "b", "c", "d"]),
+    ],
+)
+def test_preselect_items(selection_method, expected_ids):
+    items = [
+        _raw_item("a", 10, "1999"),
+        _raw_item("b", 80, "2020-05"),
+        {"track": None},
+        _raw_item("c", None, "2020-05-02"),
+        _raw_item("d", 50, "2020"),
+    ]
+    ranked = preselect_items(items, selection_method)
+    assert [item["track"]["id"] for item in ranked] == expected_ids
+
+
+def test_preselect_items_random():
+    items = [_raw_item(str(i), 0, "2020") for i in range(20)]
+    ranked = preselect_items(items, None)
+    assert sorted(item["track"]["id"] for item in ranked) == sorted(str(i) for i in range(20))
+
+
+@pytest.mark.parametrize("selection_method", [SelectionMethod.POPULARITY, SelectionMethod.LATEST])
+def test_preselect_items_matches_selection(spotify_track, selection_method):
+    release_dates = ["2001", "2001-01", "2001-01-01", "1999-12-31", "2001-02", ""]
+    items = [
+        {
+            "track": dict(
+                spotify_track, id=str(i), popularity=i % 3, album=dict(spotify_track["album"], release_date=date)
+            )
+        }
+        for i, date in enumerate(release_dates)
+    ]
+    tracks = [TrackData.model_validate(item["track"]) for item in items]
+    ranked = preselect_items(items, selection_method)
+    expected = select_tracks(tracks, len(tracks), selection_method)
+    assert [item["track"]["id"] for item in ranked] == [track.id for track in expected]
+
+
+@pytest.mark.parametrize("selection_method", [SelectionMethod.POPULARITY, SelectionMethod.LATEST, None])
+def test_preselect_items_keeps_nb_items(selection_method):
+    items = [_raw_item(str(i), i % 10, f"{2000 + i % 13}") for i in range(50)]
+    ranked = preselect_items(iter(items), selection_method, nb_items=5)
+    assert len(ranked) == 5
+    if selection_method:
+        assert ranked == preselect_items(items, selection_method)[:5]
+
+
+@pytest.mark.parametrize("weights", [None, SelectionWeights(exponent=3), SelectionWeights(by="recency", exponent=3)])
+def test_select_weighted_tracks(playlist_1_tracks, weights):
+    for i, track in enumerate(playlist_1_tracks):
+        track.popularity = 100 if i < 5 else 0
+        track.album.release_date = date(2024, 1, 1) if i < 5 else date(1950, 1, 1)
+    with seeded(0):
+        selection = select_tracks(playlist_1_tracks, 5, SelectionMethod.WEIGHTED, weights=weights)
+    assert len({track.id for track in selection}) == 5
+    if weights:
+        assert sum(track.id in {f"p_{i}" for i in range(5)} for track in selection) >= 4
+
+
+def test_weighted_selections_are_seeded(playlist_1_tracks):
+    items = [{"track": {"id": track.id, "popularity": i}} for i, track in enumerate(playlist_1_tracks)]
+    with seeded(7):
+        first = (
+            select_tracks(playlist_1_tracks, 5, "weighted"),
+            preselect_items(iter(items), "weighted", nb_items=5, weights=SelectionWeights(by="recency")),
+        )
+    with seeded(7):
+        second = (
+            select_tracks(playlist_1_tracks, 5, "weighted"),
+            preselect_items(iter(items), "weighted", nb_items=5, weights=SelectionWeights(by="recency")),
+        )
+    assert first == second
+    assert all(len(selection) == 5 for selection in first)
+
+
+def _set_artists(tracks, nb_artists):
+    for i, track in enumerate(tracks):
+        track.popularity = 100 - i
+        track.artists[0].id = f"artist_{i % nb_artists}"
+    return tracks
+
+
+@pytest.mark.parametrize("selection_method", list(SelectionMethod))
+def test_select_tracks_with_limits(playlist_1_tracks, selection_method):
+    tracks = _set_artists(playlist_1_tracks, 5)
+    with seeded(0):
+        selection = select_tracks(tracks, 20, selection_method, limits=SelectionLimits(max_per_artist=3))
+    artists = [track.artists[0].id for track in selection]
+    assert len(selection) == 15
+    assert all(artists.count(artist) == 3 for artist in set(artists))
+
+
+def test_select_tracks_with_limits_keeps_the_method_order(playlist_1_tracks):
+    tracks = _set_artists(playlist_1_tracks, 5)
+    selection = select_tracks(tracks, 10, "popularity", limits=SelectionLimits(max_per_artist=1))
+    assert [track.id for track in selection] == [f"p_{i}" for i in range(5)]
+
+
+def test_select_tracks_with_album_limits(playlist_1_tracks):
+    for track in playlist_1_tracks:
+        track.album.id = "same_album"
+    selection = select_tracks(playlist_1_tracks, 10, "original", limits=SelectionLimits(max_per_album=4))
+    assert selection == playlist_1_tracks[:4]
+
+
+def test_preselect_items_with_limits():
+    items = [
+        {"track": dict(_raw_item(str(i), 100 - i, "2020")["track"], artists=[{"id": f"artist_{i % 3}"}])}
+        for i in range(12)
+    ]
+    ranked = preselect_items(iter(items), "popularity", nb_items=10, limits=SelectionLimits(max_per_artist=2))
+    assert [item["track"]["id"] for item in ranked] == ["0", "1", "2", "3", "4", "5"]
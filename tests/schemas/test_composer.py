@@ -5,6 +5,7 @@ from pydantic import ValidationError
 
 from chopin.managers.selection import SelectionMethod
 from chopin.schemas.composer import ComposerConfig, ComposerConfigItem
+from chopin.schemas.selection import SelectionLimits, SelectionWeights
 
 
 def test_fill_nb_songs():
@@ -73,7 +74,10 @@ def test_fill_nb_songs_with_history():
 )
 def test_composer_config_uri_item(uri_item, expected_item):
     out = ComposerConfigItem(**uri_item)
-    assert out.model_dump(exclude={"selection_method"}) == expected_item
+    assert (
+        out.model_dump(exclude={"selection_method", "selection_weights", "max_per_artist", "max_per_album"})
+        == expected_item
+    )
 
 
 @pytest.mark.parametrize(
@@ -109,3 +113,25 @@ def test_composer_config_parse_yaml():
     config = ComposerConfig.parse_yaml(path)
     assert config.name == "🤖 Musique Automatique"
     assert config.nb_songs == 160
+
+
+def test_composer_config_item_selection_weights():
+    item = ComposerConfigItem.model_validate(
+        {"name": "rock", "selection_method": "Weighted", "selection_weights": {"by": "recency", "exponent": 2}}
+    )
+    assert item.selection_method == SelectionMethod.WEIGHTED
+    assert item.selection_weights == SelectionWeights(by="recency", exponent=2)
+
+
+def test_composer_config_caps_item_limits():
+    config = ComposerConfig.model_validate(
+        {
+            "nb_songs": 10,
+            "max_per_artist": 2,
+            "playlists": [{"name": "rock", "max_per_artist": 5}, {"name": "jazz", "max_per_artist": 1}],
+            "uris": [{"name": "uri", "max_per_album": 3}],
+        }
+    )
+    assert [item.max_per_artist for item in config.playlists + config.uris] == [2, 1, 2]
+    assert config.uris[0].selection_limits == SelectionLimits(max_per_artist=2, max_per_album=3)
+    assert config.selection_limits.as_dict() == {"artist": 2}
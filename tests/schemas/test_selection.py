@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+import pytest
+from pydantic import ValidationError
+
+from chopin.schemas.selection import SelectionWeights
+
+
+def test_selection_weights_by_popularity():
+    weights = SelectionWeights(exponent=2)
+    assert weights.weight(popularity=9, release_date=None, reference_date=date(2024, 1, 1)) == 100
+    assert weights.weight(popularity=None, release_date=None, reference_date=date(2024, 1, 1)) == 1
+
+
+def test_selection_weights_by_recency():
+    weights = SelectionWeights(by="recency", exponent=1)
+    today = date(2024, 1, 1)
+    assert weights.weight(popularity=0, release_date=today, reference_date=today) == 1
+    assert weights.weight(popularity=0, release_date=today + timedelta(days=30), reference_date=today) == 1
+    ten_years_ago = today - timedelta(days=3653)
+    assert weights.weight(popularity=0, release_date=ten_years_ago, reference_date=today) == pytest.approx(
+        1 / 11, rel=1e-3
+    )
+    assert weights.weight(0, None, today) < weights.weight(0, ten_years_ago, today)
+    # The weight only depends on the age at the reference date.
+    assert weights.weight(0, ten_years_ago, today) == weights.weight(0, today, today + timedelta(days=3653))
+
+
+def test_selection_weights_exponent_zero_is_uniform():
+    weights = SelectionWeights(exponent=0)
+    assert (
+        weights.weight(popularity=0, release_date=None, reference_date=date(2024, 1, 1))
+        == weights.weight(popularity=100, release_date=None, reference_date=date(2024, 1, 1))
+        == 1
+    )
+
+
+def test_selection_weights_validation():
+    with pytest.raises(ValidationError):
+        SelectionWeights(by="energy")
+    with pytest.raises(ValidationError):
+        SelectionWeights(exponent=-1)
@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+
+from chopin.schemas.album import AlbumData
+from chopin.schemas.table import TrackTable
+from chopin.schemas.track import TrackData
+from tests.conftest import album_data, artist_data, track_data
+
+
+@pytest.fixture
+def tracks():
+    tracks = [track_data(f"t_{i}") for i in range(30)]
+    for i, track in enumerate(tracks):
+        # Tracks share 3 albums and 4 artists.
+        track.album = album_data(f"album_{i % 3}")
+        track.album.release_date = date(2000 + i % 3, 1, 1)
+        track.artists = [artist_data(f"artist_{i % 4}"), artist_data(f"artist_{(i + 1) % 4}")]
+        track.popularity = i % 7
+        track.added_at = date(2024, 1, 1 + i % 5)
+    return tracks
+
+
+def test_track_table_round_trip(tracks):
+    tracks[0].uri = "spotify:local:track"
+    tracks[1].album, tracks[1].artists, tracks[1].added_at = None, [], None
+    tracks[2].album = AlbumData(name="a", id="undated", uri="spotify:album:undated", release_date="")
+    table = TrackTable(tracks)
+    assert len(table) == len(tracks)
+    assert table.to_tracks() == tracks
+    assert table[-1] == tracks[-1]
+    assert table[5:8] == tracks[5:8]
+    assert [track.model_dump() for track in table] == [track.model_dump() for track in tracks]
+
+
+def test_track_table_stores_albums_and_artists_once(tracks):
+    table = TrackTable(tracks)
+    assert [album.id for album in table.albums] == ["album_0", "album_1", "album_2"]
+    assert len(table.artists) == 4
+    assert table[0].album is table[3].album
+
+
+def test_track_table_columns(tracks):
+    table = TrackTable(tracks)
+    assert list(table.popularities) == [track.popularity for track in tracks]
+    assert list(table.added_ordinals) == [track.added_at.toordinal() for track in tracks]
+    assert list(table.release_ordinals()) == [track.album.release_date.toordinal() for track in tracks]
+
+
+def test_track_table_is_empty():
+    table = TrackTable()
+    assert len(table) == 0
+    assert table.to_tracks() == []
+    table.append(TrackData(name="a", id="a", uri="spotify:track:a", duration_ms=1))
+    assert table.to_tracks() == [TrackData(name="a", id="a", uri="spotify:track:a", duration_ms=1, artists=[])]
@@ -0,0 +1,38 @@
+"""Guard the startup time of the chopin cli."""
+
+import os
+import subprocess
+import sys
+
+# Cumulative import time of `chopin.cli.main`, in microseconds.
+IMPORT_TIME_BUDGET = 250_000
+
+
+def _run_python(code: str, *args: str, cwd) -> subprocess.CompletedProcess:
+    env = {key: value for key, value in os.environ.items() if key not in ("client_id", "client_secret")}
+    env["PYTHONPATH"] = os.pathsep.join([os.getcwd(), env.get("PYTHONPATH", "")])
+    return subprocess.run(
+        [sys.executable, *args, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def test_cli_help_without_credentials(tmp_path):
+    code = (
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "from chopin.cli.main import app\n"
+        "result = CliRunner().invoke(app, ['--help'])\n"
+        "assert result.exit_code == 0, result.output\n"
+        "assert 'spotipy' not in sys.modules\n"
+    )
+    _run_python(code, cwd=tmp_path)
+
+
+def test_cli_import_time(tmp_path):
+    result = _run_python("import chopin.cli.main", "-X", "importtime", cwd=tmp_path)
+    cumulative_times = {
+        line.split("|")[2].strip(): int(line.split("|")[1])
+        for line in result.stderr.splitlines()[1:]
+        if line.startswith("import time:")
+    }
+    assert cumulative_times["chopin.cli.main"] < IMPORT_TIME_BUDGET
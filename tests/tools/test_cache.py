@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from chopin.tools.cache import singleflight, ttl_cache
+
+
+def test_ttl_cache():
+    calls = []
+
+    @ttl_cache(ttl=60)
+    def _cached(value):
+        calls.append(value)
+        return value
+
+    assert _cached(1) == _cached(1) == 1
+    assert _cached(2) == 2
+    assert calls == [1, 2]
+
+    _cached.cache_clear()
+    _cached(1)
+    assert calls == [1, 2, 1]
+
+
+def test_ttl_cache_expires():
+    calls = []
+
+    @ttl_cache(ttl=60)
+    def _cached():
+        calls.append(1)
+
+    with patch("chopin.tools.cache.time.monotonic", side_effect=[0, 30, 120, 120]):
+        _cached()
+        _cached()
+        _cached()
+    assert len(calls) == 2
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    calls = []
+    release = threading.Event()
+
+    @singleflight
+    def _fetch(value, offset=0):
+        calls.append(value)
+        release.wait(timeout=5)
+        return [value, offset]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(_fetch, 1), executor.submit(_fetch, 1, offset=0), executor.submit(_fetch, 1, 0)]
+        while _fetch.stats.hits + _fetch.stats.misses < 3:
+            pass
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert calls == [1]
+    assert results == [[1, 0]] * 3
+    assert (_fetch.stats.hits, _fetch.stats.misses) == (2, 1)
+
+    _fetch(1)
+    assert calls == [1, 1]
+
+
+def test_singleflight_shares_exceptions():
+    release = threading.Event()
+
+    @singleflight
+    def _fetch():
+        release.wait(timeout=5)
+        raise ValueError("failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(_fetch) for _ in range(2)]
+        while _fetch.stats.hits + _fetch.stats.misses < 2:
+            pass
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="failed"):
+                future.result()
+    assert _fetch.stats.misses == 1
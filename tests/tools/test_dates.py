@@ -1,8 +1,8 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 import pytest
 
-from chopin.tools.dates import parse_release_date, read_date
+from chopin.tools.dates import dated, get_reference_date, parse_release_date, read_date
 
 
 def test_read_date_with_valid_dates():
@@ -57,3 +57,10 @@ def test_parse_release_date(input, expected):
 def test_parse_release_date_invalid_date(input):
     with pytest.raises(ValueError):
         parse_release_date(input)
+
+
+def test_dated():
+    assert get_reference_date() == date.today()
+    with dated(date(2020, 2, 29)) as reference_date:
+        assert get_reference_date() == reference_date == date(2020, 2, 29)
+    assert get_reference_date() == date.today()
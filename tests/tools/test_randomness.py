@@ -0,0 +1,16 @@
+import random
+
+from chopin.tools.randomness import get_rng, seeded
+
+
+def test_get_rng_defaults_to_random_module():
+    assert get_rng() is random
+
+
+def test_seeded():
+    with seeded(42) as rng:
+        assert get_rng() is rng
+        first = [get_rng().random() for _ in range(3)]
+    with seeded(42):
+        assert [get_rng().random() for _ in range(3)] == first
+    assert get_rng() is random
@@ -0,0 +1,15 @@
+from unittest.mock import patch
+
+import pytest
+
+from chopin.tools.serialization import loads
+
+
+@pytest.mark.parametrize("data", [b'{"tracks": [1, 2], "name": "\xc3\xa9"}', '{"tracks": [1, 2], "name": "é"}'])
+def test_loads(data):
+    assert loads(data) == {"tracks": [1, 2], "name": "é"}
+
+
+def test_loads_without_orjson():
+    with patch("chopin.tools.serialization.orjson", None):
+        assert loads(b'{"tracks": [1, 2]}') == {"tracks": [1, 2]}
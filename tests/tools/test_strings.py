@@ -1,6 +1,12 @@
 import pytest
 
-from chopin.tools.strings import extract_uri_from_playlist_link, match_strings, owner_is_spotify, simplify_string
+from chopin.tools.strings import (
+    extract_uri_from_playlist_link,
+    match_strings,
+    owner_is_spotify,
+    playlist_id_from_uri,
+    simplify_string,
+)
 
 
 @pytest.mark.parametrize(
@@ -58,6 +64,18 @@ def test_extract_uri_from_playlist_link(input_link: str, expected_uri: str):
     assert extract_uri_from_playlist_link(input_link) == expected_uri
 
 
+@pytest.mark.parametrize(
+    "playlist_uri, expected_id",
+    [
+        ("spotify:playlist:37i9dQZF1DWWv8B5EWK7bn", "37i9dQZF1DWWv8B5EWK7bn"),
+        ("spotify:user:someone:playlist:2ZdqnoI2DcFMqTfIaLnbss", "2ZdqnoI2DcFMqTfIaLnbss"),
+        ("37i9dQZF1DWWv8B5EWK7bn", "37i9dQZF1DWWv8B5EWK7bn"),
+    ],
+)
+def test_playlist_id_from_uri(playlist_uri: str, expected_id: str):
+    assert playlist_id_from_uri(playlist_uri) == expected_id
+
+
 @pytest.mark.parametrize(
     "uri, expected_result",
     [